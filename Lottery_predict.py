@@ -1,62 +1,118 @@
 # -*- coding: utf-8 -*-
 import json
 import os
-from datetime import datetime, timedelta
-from TaiwanLottery import TaiwanLotteryCrawler
+from TaiwanLottery import TaiwanLotteryCrawler, utils
+from TaiwanLottery.archive import DrawArchive
+from TaiwanLottery.cache import ResponseCache
+from TaiwanLottery.llm_cache import PredictionCache
+from TaiwanLottery.prompt import PromptBuilder
+from TaiwanLottery.store import DrawStore
 import google.generativeai as genai
 from dotenv import load_dotenv
 
 # 載入 .env 檔案中的環境變數
 load_dotenv()
 
+# 本地開獎資料庫路徑，已結束月份的資料只需向 API 擷取一次
+LOTTERY_DB_PATH = os.getenv('LOTTERY_DB_PATH', 'taiwan_lottery.db')
+# 上游 API 回應的磁碟快取目錄，未設定時只使用記憶體快取
+LOTTERY_CACHE_DIR = os.getenv('LOTTERY_CACHE_DIR')
+# 欄式開獎歷史檔目錄 (選用)，以 mmap 載入完整歷史，新的開獎資料只附加在尾端
+LOTTERY_ARCHIVE_DIR = os.getenv('LOTTERY_ARCHIVE_DIR')
+# AI 預測結果的磁碟快取目錄，相同資料範圍的預測不再重複呼叫模型
+LLM_CACHE_DIR = os.getenv('LLM_CACHE_DIR', '.llm_cache')
+# 使用的模型與提示詞範本版本，修改 build_prediction_prompt 的範本時需遞增
+MODEL_NAME = 'gemini-2.5-flash'
+PROMPT_VERSION = 2
+# 提示詞的 token 上限，超過時較早的開獎紀錄改以彙總的頻率向量呈現
+PROMPT_TOKEN_BUDGET = int(os.getenv('LLM_PROMPT_TOKEN_BUDGET', '3000'))
+_draw_store = None
+_response_cache = None
+_prediction_cache = None
+_crawler = None
+_draw_archive = None
+
+
+def get_draw_store():
+    """取得共用的本地開獎資料庫"""
+    global _draw_store
+    if _draw_store is None:
+        _draw_store = DrawStore(LOTTERY_DB_PATH)
+    return _draw_store
+
+
+def get_response_cache():
+    """取得共用的上游 API 回應快取"""
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache(cache_dir=LOTTERY_CACHE_DIR)
+    return _response_cache
+
+
+def get_draw_archive():
+    """取得共用的欄式開獎歷史檔，未設定 LOTTERY_ARCHIVE_DIR 時回傳 None"""
+    global _draw_archive
+    if _draw_archive is None and LOTTERY_ARCHIVE_DIR:
+        _draw_archive = DrawArchive(LOTTERY_ARCHIVE_DIR)
+    return _draw_archive
+
+
+def get_crawler():
+    """取得共用的同步爬蟲，各次預測重複使用同一個連線池 (keep-alive)"""
+    global _crawler
+    if _crawler is None:
+        _crawler = TaiwanLotteryCrawler(store=get_draw_store(), cache=get_response_cache())
+    return _crawler
+
+
+def get_prediction_cache():
+    """取得共用的 AI 預測結果快取"""
+    global _prediction_cache
+    if _prediction_cache is None:
+        _prediction_cache = PredictionCache(LLM_CACHE_DIR)
+    return _prediction_cache
+
+
+def prediction_cache_key(lottery_data):
+    """AI 預測結果的快取鍵，由模型、提示詞版本、token 上限與資料期別範圍決定"""
+    return PredictionCache.key(MODEL_NAME, [PROMPT_VERSION, PROMPT_TOKEN_BUDGET], lottery_data)
+
 
 def get_six_months_lotto649_data():
     """
     擷取大樂透過去半年(6個月)的中獎號碼
     Returns: 包含所有中獎資料的 JSON 格式變數
     """
-    lottery = TaiwanLotteryCrawler()
-    all_data = []
-    
-    # 計算過去6個月的年月組合
-    current_date = datetime.now()
-    months_data = []
-    
-    for i in range(6):
-        # 計算要擷取的月份
-        target_date = current_date - timedelta(days=30 * i)
-        year = str(target_date.year)
-        month = str(target_date.month).zfill(2)
-        months_data.append([year, month])
-    
-    print("開始擷取大樂透過去半年的中獎號碼...")
-    
-    for year, month in months_data:
-        print(f"正在擷取 {year}-{month} 的大樂透資料...")
-        try:
-            monthly_result = lottery.lotto649([year, month])
-            if monthly_result:
-                all_data.extend(monthly_result)
-                print(f"成功擷取 {year}-{month} 共 {len(monthly_result)} 筆資料")
-            else:
-                print(f"{year}-{month} 無資料")
-        except Exception as e:
-            print(f"擷取 {year}-{month} 資料時發生錯誤: {e}")
-    
-    # 按期別降序排序 (最新的在前面)
-    all_data.sort(key=lambda x: x['期別'], reverse=True)
-    
+    # 計算過去6個月 (含本月) 的起訖月份，依日曆逐月計算避免重複或漏掉月份
+    end_month = utils.format_month([utils.get_current_year(), utils.get_current_month()])
+    start_month = utils.add_months(end_month, -5)
+
+    print(f"開始擷取大樂透 {start_month} 至 {end_month} 的中獎號碼...")
+
+    # 並行擷取各月份，依期別合併去重並按期別降序排序 (最新的在前面)
+    all_data = get_crawler().fetch_range('lotto649', start_month, end_month, skip_errors=True)
+
     print(f"總共擷取到 {len(all_data)} 筆大樂透中獎資料")
     return all_data
 
 
-def predict_lottery_numbers_with_ai(lottery_data):
+def build_prediction_prompt(lottery_data):
     """
-    使用 Google Gemini 2.5 Pro 模型分析大樂透資料並推薦號碼
+    依半年的大樂透中獎資料建構給 AI 的精簡提示詞
     Args:
-        lottery_data: 半年的大樂透中獎資料
+        lottery_data: 半年的大樂透中獎資料 (最新一期在前)
     Returns:
-        AI 推薦的兩組彩券號碼
+        提示詞文字
+    """
+    prompt, report = PromptBuilder(PROMPT_TOKEN_BUDGET).build(lottery_data)
+    print(f"提示詞約 {report['tokens']} tokens，較逐期列出節省 {report['saved_tokens']} tokens "
+          f"({report['detailed_draws']} 期逐期列出，{report['aggregated_draws']} 期彙總)")
+    return prompt
+
+
+def create_prediction_model():
+    """
+    建立 Google Gemini 模型，未設定 GOOGLE_AI_API_KEY 時回傳 None
     """
     # 設定 Google AI API Key (需要設定環境變數 GOOGLE_AI_API_KEY)
     api_key = os.getenv('GOOGLE_AI_API_KEY')
@@ -64,113 +120,46 @@ def predict_lottery_numbers_with_ai(lottery_data):
         print("警告: 請設定環境變數 GOOGLE_AI_API_KEY")
         print("範例: export GOOGLE_AI_API_KEY='your_api_key_here'")
         return None
-    
-    try:
-        # 配置 Google AI
-        genai.configure(api_key=api_key)
-        
-        # 建立模型
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        
-        # 準備資料摘要給 AI 分析
-        data_summary = "大樂透半年中獎資料分析:\n\n"
-        data_summary += f"總期數: {len(lottery_data)}\n"
-        data_summary += f"日期範圍: {lottery_data[-1]['開獎日期'][:10]} 至 {lottery_data[0]['開獎日期'][:10]}\n\n"
-        # print(f"data_summary_日期範圍: {data_summary}")
-        
-        # 加入所有期數的詳細資料
-        data_summary += f"所有{len(lottery_data)}期中獎號碼:\n"
-        for i, data in enumerate(lottery_data):
-            data_summary += f"第{data['期別']}期 ({data['開獎日期'][:10]}): 獎號 {data['獎號']} | 特別號 {data['特別號']}\n"
-            # print(f"data_summary_期別: {data_summary}")
-            
-        # 統計所有號碼出現頻率
-        number_frequency = {}
-        special_frequency = {}
-        
-        for data in lottery_data:
-            # 統計獎號頻率
-            for num in data['獎號']:
-                number_frequency[num] = number_frequency.get(num, 0) + 1
-            # 統計特別號頻率
-            special_frequency[data['特別號']] = special_frequency.get(data['特別號'], 0) + 1
-        
-        # 加入完整號碼頻率統計
-        data_summary += "\n完整獎號出現頻率統計 (1-49號碼):\n"
-        sorted_numbers = sorted(number_frequency.items(), key=lambda x: x[1], reverse=True)
-        for num, freq in sorted_numbers:
-            data_summary += f"號碼 {num}: {freq} 次\n"
-        
-        # 找出從未出現的號碼
-        all_possible_numbers = set(range(1, 50))
-        appeared_numbers = set(number_frequency.keys())
-        never_appeared = all_possible_numbers - appeared_numbers
-        if never_appeared:
-            data_summary += f"\n半年內從未出現的獎號: {sorted(never_appeared)}\n"
-        
-        data_summary += "\n完整特別號出現頻率統計:\n"
-        sorted_special = sorted(special_frequency.items(), key=lambda x: x[1], reverse=True)
-        for num, freq in sorted_special:
-            data_summary += f"特別號 {num}: {freq} 次\n"
-        
-        # 找出從未出現的特別號
-        appeared_special = set(special_frequency.keys())
-        never_appeared_special = all_possible_numbers - appeared_special
-        if never_appeared_special:
-            data_summary += f"\n半年內從未出現的特別號: {sorted(never_appeared_special)}\n"
-        
-        # 建構提示詞
-        prompt = f"""{data_summary}
-
-
-基於數學原理與數據分析，以下為具體選號策略，旨在增加與短期趨勢的吻合度，同時保持隨機性：
-
-均衡分佈：
-- 選擇3:3或2:4的單雙比組合。
-- 選擇和值在120–160之間的號碼組合。
-- 確保首尾差在30–40之間，避免過於集中或分散的號碼。
-
-包含同尾號與連號：
-- 至少包含1–2組同尾號，優先選擇3尾、5尾或7尾（如03, 13或05, 15）。
-- 包含1組2連號（如15, 16或36, 37），優先在1–20或30–49區間。
-
-分區選號：
-- 將1–49分為三區：1–16（低）、17–33（中）、34–49（高）。
-- 選擇2個低區、2個中區、2個高區的號碼，確保分佈均衡。例如：04, 15, 25, 33, 41, 46。
 
-熱門號碼與冷門號碼結合：
-- 選擇2–3個熱門號碼與3–4個其他號碼結合，避免全選熱門號碼。
-- 可考慮冷門號碼作為補充，因其可能在未來「回歸均值」。
+    # 配置 Google AI
+    genai.configure(api_key=api_key)
 
-大樂透玩法以及號碼選取技巧:
-- 大樂透獎號為6個號碼，範圍是1-49
-- 特別號為1個號碼，範圍是1-49，且不能與獎號重複
-- 請以清楚的格式回答，並簡單說明選號理由
-- 奇偶比分佈: 大樂透玩法中，奇、偶數號碼各5個。建議選擇奇偶比例接近 3:2 或 2:3 的組合，例如 3 個奇數 + 2 個偶數或 2 個奇數 + 3 個偶數，避免選擇 5 個奇數或 5 個偶數的極端組合。
-- 大小比分佈: 大樂透玩法的號碼分為小號碼和大小號碼，各 5 個。建議選擇介於 10~39 的小號碼 2~3 個，大號碼 40~49 2~3 個。避免選擇全部小號碼或全部大號碼的組合。
-- 避開連號和順序號: 建議避免選擇 3 個以上的連號，例如 1、2、3 或 4、5、6 等。此外，順序號，例如 1、11、21 等，中獎機率也不高，建議減少選擇此類組合。
-— 考慮遺漏號碼： 大樂透玩法中，每期開獎號碼皆不相同。追蹤遺漏號碼可以幫助玩家找出較久未開出的號碼。當號碼遺漏超過 5~10 期時，可以考慮將其納入選號組合，增加中獎機會。
-— 熱門號碼與冷門號碼搭配： 熱門號通常是指近期頻繁出現的號碼，冷門號是指較少出現的號碼。建議在選號時，適當地搭配熱門和冷門號碼，既能提高命中率，又能降低與其他彩民重複中獎的機率。
+    # 建立模型
+    return genai.GenerativeModel(MODEL_NAME)
 
-根據大樂透半年的中獎資料，請試著分析並且參照[選號策略]和［大樂透玩法以及號碼選取技巧］推薦出四組彩券號碼(包含特別號):
 
-請務必按照以下格式及pattern回答, 不要添加任何額外說明或文字，僅回覆符合格式的內容:
-# 主要匹配模式：第X組(類型): [數字列表] + 特別號: 數字
-pattern = r'第[X]組\(([^)]+)\):\s*\[([^\]]+)\]\s*\+\s*特別號:\s*(\d+)'
+def predict_lottery_numbers_with_ai(lottery_data, refresh=False):
+    """
+    使用 Google Gemini 2.5 Pro 模型分析大樂透資料並推薦號碼
+    Args:
+        lottery_data: 半年的大樂透中獎資料
+        refresh: 為 True 時忽略快取，重新呼叫模型
+    Returns:
+        AI 推薦的兩組彩券號碼
+    """
+    # 相同資料範圍的預測直接使用快取，不需等待模型也不消耗配額
+    cache_key = prediction_cache_key(lottery_data)
+    if not refresh:
+        cached = get_prediction_cache().get(cache_key)
+        if cached:
+            print("使用快取的 AI 預測結果")
+            return cached['text']
 
-根據以下主題，[冷門號碼組合、熱門號碼組合熱門 + 冷門 混合號碼組合、均衡組合]產生四組號碼組合，並說明選號理由:
-第[X]組([主題]): [號碼1, 號碼2, 號碼3, 號碼4, 號碼5, 號碼6] + 特別號: 號碼
-選號理由: ...
+    try:
+        model = create_prediction_model()
+        if model is None:
+            return None
 
-"""
+        # 建構提示詞
+        prompt = build_prediction_prompt(lottery_data)
 
-        
         print("\n正在使用 Google Gemini 2.5 分析資料並推薦號碼...")
         print("這可能需要幾秒鐘的時間...\n")
         
         # 發送請求給 AI 模型
         response = model.generate_content(prompt)
-        
+
+        get_prediction_cache().set(cache_key, response.text, model=MODEL_NAME, prompt_version=PROMPT_VERSION)
         return response.text
         
     except Exception as e:
@@ -178,6 +167,19 @@ pattern = r'第[X]組\(([^)]+)\):\s*\[([^\]]+)\]\s*\+\s*特別號:\s*(\d+)'
         return None
 
 
+def stream_lottery_numbers_with_ai(lottery_data, model):
+    """
+    以串流方式取得 AI 預測，模型每產生一段文字就 yield 一次
+    Args:
+        lottery_data: 半年的大樂透中獎資料
+        model: create_prediction_model 建立的模型 (或有相同 generate_content 介面的物件)
+    """
+    response = model.generate_content(build_prediction_prompt(lottery_data), stream=True)
+    for chunk in response:
+        if chunk.text:
+            yield chunk.text
+
+
 def main():
     """主程式執行函數"""
     # 擷取半年的大樂透資料
@@ -214,6 +216,13 @@ def main():
         f.write(lotto649_json_data)
     
     print(f"\nJSON資料已儲存至 'lotto649_six_months.json' 檔案")
+
+    # 同時附加到欄式開獎歷史檔，只會寫入尚未保存的期別
+    archive = get_draw_archive()
+    if archive is not None and lotto649_six_months_data:
+        added = archive.append('lotto649', lotto649_six_months_data)
+        print(f"開獎歷史檔新增 {added} 期大樂透資料: {LOTTERY_ARCHIVE_DIR}")
+
     print("程式執行完成！")
     
     # 回傳JSON格式的變數供其他程式使用
@@ -1,5 +1,8 @@
 # -*- coding: utf-8 -*-
 import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
 import urllib3
@@ -14,207 +17,331 @@ class TaiwanLotteryCrawler():
     NO_DATA = '查無資料'
     BASE_URL = 'https://api.taiwanlottery.com/TLCAPIWeB/Lottery'
     COUNT_OF_GROUP_1 = 6
+    # 各彩種的名稱、API 路徑、結果欄位與號碼欄位，split 表示號碼需拆成 (前 6 碼, 第 7 碼) 兩個欄位
+    # draw_days 為開獎的星期 (0 為星期一)，number_range / special_range 為號碼範圍 (含)，3星彩與4星彩為每位數 0-9
+    GAME_API = {
+        'super_lotto': {'title': '威力彩', 'path': 'SuperLotto638Result', 'result_key': 'superLotto638Res',
+                        'number_field': 'drawNumberSize', 'split': ('第一區', '第二區'), 'draw_days': (0, 3),
+                        'number_range': (1, 38), 'special_range': (1, 8)},
+        'lotto649': {'title': '大樂透', 'path': 'Lotto649Result', 'result_key': 'lotto649Res',
+                     'number_field': 'drawNumberSize', 'split': ('獎號', '特別號'), 'draw_days': (1, 4),
+                     'number_range': (1, 49), 'special_range': (1, 49)},
+        'daily_cash': {'title': '今彩539', 'path': 'Daily539Result', 'result_key': 'daily539Res',
+                       'number_field': 'drawNumberSize', 'split': None, 'draw_days': (0, 1, 2, 3, 4, 5),
+                       'number_range': (1, 39), 'special_range': None},
+        'lotto1224': {'title': '雙贏彩', 'path': 'Lotto1224Result', 'result_key': 'lotto1224Res',
+                      'number_field': 'drawNumberSize', 'split': None, 'draw_days': (0, 1, 2, 3, 4, 5),
+                      'number_range': (1, 24), 'special_range': None},
+        'lotto3d': {'title': '3星彩', 'path': '3DHistoryResult', 'result_key': 'lotto3DHistoryRes',
+                    'number_field': 'drawNumberAppear', 'split': None, 'draw_days': (0, 1, 2, 3, 4, 5),
+                    'number_range': (0, 9), 'special_range': None},
+        'lotto4d': {'title': '4星彩', 'path': '4DHistoryResult', 'result_key': 'lotto4DHistoryRes',
+                    'number_field': 'drawNumberAppear', 'split': None, 'draw_days': (0, 1, 2, 3, 4, 5),
+                    'number_range': (0, 9), 'special_range': None},
+        'lotto38m6': {'title': '38樂合彩', 'path': '38M6Result', 'result_key': 'm638Res',
+                      'number_field': 'drawNumberSize', 'split': None, 'draw_days': (0, 3),
+                      'number_range': (1, 38), 'special_range': None},
+        'lotto49m6': {'title': '49樂合彩', 'path': '49M6Result', 'result_key': 'm649Res',
+                      'number_field': 'drawNumberSize', 'split': None, 'draw_days': (1, 4),
+                      'number_range': (1, 49), 'special_range': None},
+        'lotto39m5': {'title': '39樂合彩', 'path': '39M5Result', 'result_key': 'm539Res',
+                      'number_field': 'drawNumberSize', 'split': None, 'draw_days': (0, 1, 2, 3, 4, 5),
+                      'number_range': (1, 39), 'special_range': None},
+    }
+    GAMES = tuple(GAME_API)
+
+    RETRY_STATUS = (500, 502, 503, 504)
+
+    def __init__(self, store=None, timeout=(5, 30), retries=3, backoff_factor=0.5, pool_connections=4, pool_maxsize=10, cache=None,
+                 session=None, compact=False):
+        """
+        Args:
+            store: TaiwanLottery.store.DrawStore，設定後已結束月份的資料會從本地資料庫讀取
+            timeout: (連線逾時, 讀取逾時) 秒數
+            retries: 遇到連線錯誤或 5xx 時的最多重試次數
+            backoff_factor: 指數退避的基準秒數，第 n 次重試最多等待 backoff_factor * 2 ** n 秒
+            pool_connections: 連線池快取的主機數
+            pool_maxsize: 每個主機保留的 keep-alive 連線數
+            cache: TaiwanLottery.cache.ResponseCache，快取上游 API 的月份查詢結果
+            session: 自訂的 HTTP session (例如測試用)，None 表示以 _create_session 建立
+            compact: 為 True 時開獎資料以 TaiwanLottery.records.Draw 回傳 (可用與 dict 相同的鍵讀取)，長期保存大量歷史時較省記憶體
+        """
+        self.store = store
+        self.cache = cache
+        self.compact = compact
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.session = session if session is not None else self._create_session(pool_connections, pool_maxsize)
+
+    def _create_session(self, pool_connections, pool_maxsize):
+        session = requests.Session()
+        session.verify = False
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.session.close()
 
     def get_lottery_result(self, url):
-        response = requests.get(url, verify=False)
-        return response.json()
-
-    # 威力彩
-    def super_lotto(self, back_time=[utils.get_current_year(), utils.get_current_month()]):
-        URL = "{}/SuperLotto638Result?period&month={}-{}&pageSize=31".format(self.BASE_URL, back_time[0], back_time[1])
-
-        title = '威力彩_' + str(back_time[0]) + '_' + str(back_time[1])
-        result = self.get_lottery_result(URL)
+        cached = self._get_cached(url)
+        if cached is not None:
+            return cached
+
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.session.get(url, timeout=self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt == self.retries:
+                    raise
+            else:
+                if response.status_code not in self.RETRY_STATUS or attempt == self.retries:
+                    response.raise_for_status()
+                    result = response.json()
+                    self._set_cached(url, result)
+                    return result
+            logging.warning('擷取失敗，第 {} 次重試: {}'.format(attempt + 1, url))
+            time.sleep(self._backoff(attempt))
+
+    def _get_cached(self, url):
+        if self.cache is None:
+            return None
+        return self.cache.get(url)
+
+    def _set_cached(self, url, result):
+        if self.cache is None:
+            return
+        draw_days = ()
+        for api in self.GAME_API.values():
+            if '/' + api['path'] + '?' in url:
+                draw_days = api['draw_days']
+        self.cache.set(url, result, draw_days)
+
+    # 清除指定月份的 API 快取，下一次查詢會重新向上游擷取 (例如開獎後確認新的一期)
+    def invalidate(self, game, back_time):
+        if self.cache is not None:
+            self.cache.discard(self._build_url(game, back_time))
+
+    # 指數退避加上隨機抖動，避免多個請求同時重試
+    def _backoff(self, attempt):
+        return random.uniform(0, self.backoff_factor * (2 ** attempt))
+
+    def _load_from_store(self, game, back_time):
+        if self.store is None:
+            return None
+        month = utils.format_month(back_time)
+        if not utils.is_past_month(month):
+            return None
+        return self.store.load_month(game, month)
+
+    def _save_to_store(self, game, back_time, datas):
+        if self.store is None:
+            return
+        month = utils.format_month(back_time)
+        # 上游暫時回傳空結果時不標記為已結束，之後仍會重新擷取
+        self.store.save(game, month, datas, closed=bool(datas) and utils.is_past_month(month))
+
+    # 同步本地資料庫，只擷取比資料庫中最新期別更新的開獎資料
+    def sync(self, game, back_time=None):
+        """
+        Args:
+            game: 彩種方法名稱，例如 'lotto649'
+            back_time: 資料庫尚無該彩種資料時，開始同步的 [年, 月]，預設為目前月份
+        Returns:
+            新增的開獎資料，依期別降序排列
+        """
+        latest, months = self._sync_plan(game, back_time)
+        new_datas = []
+        for month in months:
+            for data in self.crawl(game, month):
+                if latest is None or data['期別'] > latest[0]:
+                    new_datas.append(data)
+
+        new_datas.sort(key=lambda x: x['期別'], reverse=True)
+        return new_datas
+
+    # 以彩種名稱擷取單一月份的開獎資料，彩種的 API 路徑與欄位對應皆由 GAME_API 決定
+    def crawl(self, game, back_time=None):
+        """
+        Args:
+            game: 彩種方法名稱，例如 'lotto649'
+            back_time: [年, 月]，預設為目前月份
+        """
+        self._check_games([game])
+        return self._crawl(game, back_time or [utils.get_current_year(), utils.get_current_month()])
+
+    # 並行擷取起訖月份 (YYYY-MM，含) 內的開獎資料
+    def fetch_range(self, game, start_month, end_month, max_workers=6, skip_errors=False):
+        """
+        Args:
+            game: 彩種方法名稱，例如 'lotto649'
+            start_month: 起始月份 'YYYY-MM'
+            end_month: 結束月份 'YYYY-MM'
+            max_workers: 同時擷取的月份數上限
+            skip_errors: 為 True 時略過擷取失敗的月份並記錄警告，否則拋出例外
+        Returns:
+            依期別降序排列且不重複的開獎資料
+        """
+        return self.fetch_games([game], start_month, end_month, max_workers, skip_errors)[game]
+
+    # 並行擷取多個彩種在起訖月份 (YYYY-MM，含) 內的開獎資料，所有彩種共用 max_workers 個連線
+    def fetch_games(self, games, start_month, end_month, max_workers=6, skip_errors=False):
+        """
+        Returns:
+            {彩種: 依期別降序排列且不重複的開獎資料}，參數同 fetch_range
+        """
+        tasks = self._fetch_tasks(games, start_month, end_month)
+        if not tasks:
+            return {game: [] for game in games}
+
+        def fetch(task):
+            try:
+                return self._crawl(*task)
+            except Exception as e:
+                return self._fetch_failed(task, e, skip_errors)
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(tasks))) as executor:
+            results = list(executor.map(fetch, tasks))
+        return self._group_by_game(games, tasks, results)
+
+    @classmethod
+    def _check_games(cls, games):
+        for game in games:
+            if game not in cls.GAMES:
+                raise ValueError('未知的彩種: ' + game)
+
+    # 回傳 (彩種, [年, 月]) 的擷取清單
+    @classmethod
+    def _fetch_tasks(cls, games, start_month, end_month):
+        cls._check_games(games)
+        return [(game, month) for game in games for month in utils.month_range(start_month, end_month)]
+
+    @staticmethod
+    def _fetch_failed(task, error, skip_errors):
+        if not skip_errors:
+            raise error
+        game, back_time = task
+        logging.warning('擷取 {} {}-{} 資料時發生錯誤: {}'.format(game, back_time[0], back_time[1], error))
+        return []
+
+    @classmethod
+    def _group_by_game(cls, games, tasks, results):
+        monthly = {game: [] for game in games}
+        for (game, _), datas in zip(tasks, results):
+            monthly[game].append(datas)
+        return {game: cls._merge_periods(monthly_results) for game, monthly_results in monthly.items()}
+
+    # 以期別合併多個月份的資料，去除重複並依期別降序排列
+    @staticmethod
+    def _merge_periods(monthly_results):
+        merged = {}
+        for datas in monthly_results:
+            for data in datas:
+                merged[data['期別']] = data
+        return [merged[period] for period in sorted(merged, reverse=True)]
+
+    # 回傳資料庫最新一期與需要同步的月份清單
+    def _sync_plan(self, game, back_time):
+        if self.store is None:
+            raise ValueError('sync 需要先設定 store')
+        self._check_games([game])
+
+        latest = self.store.latest(game)
+        current_month = utils.format_month([utils.get_current_year(), utils.get_current_month()])
+        if latest:
+            start_month = latest[1][:7]
+        elif back_time:
+            start_month = utils.format_month(back_time)
+        else:
+            start_month = current_month
+        return latest, utils.month_range(start_month, current_month)
+
+    def _build_url(self, game, back_time):
+        return "{}/{}?period&month={}-{}&pageSize=31".format(self.BASE_URL, self.GAME_API[game]['path'], back_time[0], back_time[1])
+
+    # 將 API 回傳結果轉為開獎資料清單
+    def _parse_result(self, game, back_time, result):
+        api = self.GAME_API[game]
         total_size = result['content']['totalSize']
-        super_lotto638_result = result['content']['superLotto638Res']
+        game_result = result['content'][api['result_key']]
         datas = []
 
         for i in range(total_size):
-            datas.append({
-                "期別": super_lotto638_result[i]['period'],
-                "開獎日期": super_lotto638_result[i]['lotteryDate'],
-                "第一區": super_lotto638_result[i]['drawNumberSize'][0:self.COUNT_OF_GROUP_1],
-                "第二區": super_lotto638_result[i]['drawNumberSize'][self.COUNT_OF_GROUP_1]
-            })
+            data = {
+                "期別": game_result[i]['period'],
+                "開獎日期": game_result[i]['lotteryDate'],
+            }
+            numbers = game_result[i][api['number_field']]
+            if api['split']:
+                data[api['split'][0]] = numbers[0:self.COUNT_OF_GROUP_1]
+                data[api['split'][1]] = numbers[self.COUNT_OF_GROUP_1]
+            else:
+                data["獎號"] = numbers
+            datas.append(data)
 
         if len(datas) == 0:
+            title = api['title'] + '_' + str(back_time[0]) + '_' + str(back_time[1])
             logging.warning(self.NO_DATA + title)
 
         return datas
 
-    # 大樂透
-    def lotto649(self, back_time=[utils.get_current_year(), utils.get_current_month()]):
-        URL = "{}/Lotto649Result?period&month={}-{}&pageSize=31".format(self.BASE_URL, back_time[0], back_time[1])
+    # compact 時將 dict 格式的開獎資料轉為 Draw，本地資料庫與快取仍保存 dict / 原始回應
+    def _records(self, game, datas):
+        if not self.compact:
+            return datas
+        from TaiwanLottery.records import Draw
+        return Draw.from_dicts(datas, game)
 
-        title = '大樂透_' + str(back_time[0]) + '_' + str(back_time[1])
-        result = self.get_lottery_result(URL)
-        total_size = result['content']['totalSize']
-        lotto649_result = result['content']['lotto649Res']
-        datas = []
+    def _crawl(self, game, back_time):
+        stored = self._load_from_store(game, back_time)
+        if stored is not None:
+            return self._records(game, stored)
 
-        for i in range(total_size):
-            datas.append({
-                "期別": lotto649_result[i]['period'],
-                "開獎日期": lotto649_result[i]['lotteryDate'],
-                "獎號": lotto649_result[i]['drawNumberSize'][0:self.COUNT_OF_GROUP_1],
-                "特別號": lotto649_result[i]['drawNumberSize'][self.COUNT_OF_GROUP_1]
-            })
+        result = self.get_lottery_result(self._build_url(game, back_time))
+        datas = self._parse_result(game, back_time, result)
+        self._save_to_store(game, back_time, datas)
+        return self._records(game, datas)
 
-        if len(datas) == 0:
-            logging.warning(self.NO_DATA + title)
+    # 威力彩
+    def super_lotto(self, back_time=[utils.get_current_year(), utils.get_current_month()]):
+        return self._crawl('super_lotto', back_time)
 
-        return datas
+    # 大樂透
+    def lotto649(self, back_time=[utils.get_current_year(), utils.get_current_month()]):
+        return self._crawl('lotto649', back_time)
 
-    # # 今彩539
+    # 今彩539
     def daily_cash(self, back_time=[utils.get_current_year(), utils.get_current_month()]):
-        URL = "{}/Daily539Result?period&month={}-{}&pageSize=31".format(self.BASE_URL, back_time[0], back_time[1])
+        return self._crawl('daily_cash', back_time)
 
-        title = '今彩539_' + str(back_time[0]) + '_' + str(back_time[1])
-        result = self.get_lottery_result(URL)
-        total_size = result['content']['totalSize']
-        daily539_result = result['content']['daily539Res']
-        datas = []
-
-        for i in range(total_size):
-            datas.append({
-                "期別": daily539_result[i]['period'],
-                "開獎日期": daily539_result[i]['lotteryDate'],
-                "獎號": daily539_result[i]['drawNumberSize'],
-            })
-
-        if len(datas) == 0:
-            logging.warning(self.NO_DATA + title)
-
-        return datas
-
-    # # 雙贏彩
+    # 雙贏彩
     def lotto1224(self, back_time=[utils.get_current_year(), utils.get_current_month()]):
-        URL = "{}/Lotto1224Result?period&month={}-{}&pageSize=31".format(self.BASE_URL, back_time[0], back_time[1])
+        return self._crawl('lotto1224', back_time)
 
-        title = '雙贏彩_' + str(back_time[0]) + '_' + str(back_time[1])
-        result = self.get_lottery_result(URL)
-        total_size = result['content']['totalSize']
-        lotto1224_result = result['content']['lotto1224Res']
-        datas = []
-
-        for i in range(total_size):
-            datas.append({
-                "期別": lotto1224_result[i]['period'],
-                "開獎日期": lotto1224_result[i]['lotteryDate'],
-                "獎號": lotto1224_result[i]['drawNumberSize'],
-            })
-
-        if len(datas) == 0:
-            logging.warning(self.NO_DATA + title)
-
-        return datas
-
-    # # 3星彩
+    # 3星彩
     def lotto3d(self, back_time=[utils.get_current_year(), utils.get_current_month()]):
-        URL = "{}/3DHistoryResult?period&month={}-{}&pageSize=31".format(self.BASE_URL, back_time[0], back_time[1])
-
-        title = '3星彩_' + str(back_time[0]) + '_' + str(back_time[1])
-        result = self.get_lottery_result(URL)
-        total_size = result['content']['totalSize']
-        lotto_3d_history_result = result['content']['lotto3DHistoryRes']
-        datas = []
-
-        for i in range(total_size):
-            datas.append({
-                "期別": lotto_3d_history_result[i]['period'],
-                "開獎日期": lotto_3d_history_result[i]['lotteryDate'],
-                "獎號": lotto_3d_history_result[i]['drawNumberAppear'],
-            })
-
-        if len(datas) == 0:
-            logging.warning(self.NO_DATA + title)
-
-        return datas
+        return self._crawl('lotto3d', back_time)
 
     # 4星彩
     def lotto4d(self, back_time=[utils.get_current_year(), utils.get_current_month()]):
-        URL = "{}/4DHistoryResult?period&month={}-{}&pageSize=31".format(self.BASE_URL, back_time[0], back_time[1])
-
-        title = '4星彩_' + str(back_time[0]) + '_' + str(back_time[1])
-        result = self.get_lottery_result(URL)
-        total_size = result['content']['totalSize']
-        lotto_4d_history_result = result['content']['lotto4DHistoryRes']
-        datas = []
-
-        for i in range(total_size):
-            datas.append({
-                "期別": lotto_4d_history_result[i]['period'],
-                "開獎日期": lotto_4d_history_result[i]['lotteryDate'],
-                "獎號": lotto_4d_history_result[i]['drawNumberAppear'],
-            })
-
-        if len(datas) == 0:
-            logging.warning(self.NO_DATA + title)
-
-        return datas
+        return self._crawl('lotto4d', back_time)
 
     # 38樂合彩
     def lotto38m6(self, back_time=[utils.get_current_year(), utils.get_current_month()]):
-        URL = "{}/38M6Result?period&month={}-{}&pageSize=31".format(self.BASE_URL, back_time[0], back_time[1])
-
-        title = '38樂合彩_' + str(back_time[0]) + '_' + str(back_time[1])
-        result = self.get_lottery_result(URL)
-        total_size = result['content']['totalSize']
-        m638_result = result['content']['m638Res']
-        datas = []
-
-        for i in range(total_size):
-            datas.append({
-                "期別": m638_result[i]['period'],
-                "開獎日期": m638_result[i]['lotteryDate'],
-                "獎號": m638_result[i]['drawNumberSize'],
-            })
-
-        if len(datas) == 0:
-            logging.warning(self.NO_DATA + title)
-
-        return datas
+        return self._crawl('lotto38m6', back_time)
 
     # 49樂合彩
     def lotto49m6(self, back_time=[utils.get_current_year(), utils.get_current_month()]):
-        URL = "{}/49M6Result?period&month={}-{}&pageSize=31".format(self.BASE_URL, back_time[0], back_time[1])
-
-        title = '49樂合彩_' + str(back_time[0]) + '_' + str(back_time[1])
-        result = self.get_lottery_result(URL)
-        total_size = result['content']['totalSize']
-        m649_result = result['content']['m649Res']
-        datas = []
-
-        for i in range(total_size):
-            datas.append({
-                "期別": m649_result[i]['period'],
-                "開獎日期": m649_result[i]['lotteryDate'],
-                "獎號": m649_result[i]['drawNumberSize'],
-            })
-
-        if len(datas) == 0:
-            logging.warning(self.NO_DATA + title)
-
-        return datas
+        return self._crawl('lotto49m6', back_time)
 
     # 39樂合彩
     def lotto39m5(self, back_time=[utils.get_current_year(), utils.get_current_month()]):
-        URL = "{}/39M5Result?period&month={}-{}&pageSize=31".format(self.BASE_URL, back_time[0], back_time[1])
-
-        title = '39樂合彩_' + str(back_time[0]) + '_' + str(back_time[1])
-        result = self.get_lottery_result(URL)
-        total_size = result['content']['totalSize']
-        m539_result = result['content']['m539Res']
-        datas = []
-
-        for i in range(total_size):
-            datas.append({
-                "期別": m539_result[i]['period'],
-                "開獎日期": m539_result[i]['lotteryDate'],
-                "獎號": m539_result[i]['drawNumberSize'],
-            })
-
-        if len(datas) == 0:
-            logging.warning(self.NO_DATA + title)
-
-        return datas
+        return self._crawl('lotto39m5', back_time)
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import logging
+
+import httpx
+
+from TaiwanLottery import TaiwanLotteryCrawler, utils
+
+
+class AsyncTaiwanLotteryCrawler(TaiwanLotteryCrawler):
+    """
+    TaiwanLotteryCrawler 的非同步版本，使用 httpx.AsyncClient 擷取資料
+    各彩種方法與同步版本相同，但需以 await 呼叫，適合在 FastAPI 等事件迴圈中使用
+    本地資料庫與快取磁碟層的存取會阻塞 (且與執行緒池中的同步爬蟲共用鎖)，一律移到執行緒中執行
+    """
+
+    def __init__(self, store=None, timeout=(5, 30), retries=3, backoff_factor=0.5, pool_connections=4, pool_maxsize=10, cache=None,
+                 client=None, compact=False):
+        """
+        Args:
+            client: 自訂的 httpx.AsyncClient (例如測試用)，其餘參數與 TaiwanLotteryCrawler 相同
+        """
+        super().__init__(store, timeout, retries, backoff_factor, pool_connections, pool_maxsize, cache, session=client, compact=compact)
+
+    def _create_session(self, pool_connections, pool_maxsize):
+        return httpx.AsyncClient(
+            verify=False,
+            timeout=httpx.Timeout(self.timeout[1], connect=self.timeout[0]),
+            limits=httpx.Limits(max_connections=pool_maxsize, max_keepalive_connections=pool_maxsize),
+        )
+
+    @property
+    def client(self):
+        return self.session
+
+    @client.setter
+    def client(self, client):
+        self.session = client
+
+    def __enter__(self):
+        # httpx.AsyncClient 只能以 await aclose() 關閉，不支援同步的 with
+        raise TypeError('AsyncTaiwanLotteryCrawler 請使用 async with')
+
+    def __exit__(self, *exc_info):
+        raise TypeError('AsyncTaiwanLotteryCrawler 請使用 async with')
+
+    def close(self):
+        raise TypeError('AsyncTaiwanLotteryCrawler 請使用 await aclose()')
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def get_lottery_result(self, url):
+        cached = await asyncio.to_thread(self._get_cached, url)
+        if cached is not None:
+            return cached
+
+        for attempt in range(self.retries + 1):
+            try:
+                response = await self.client.get(url)
+            except httpx.TransportError:
+                if attempt == self.retries:
+                    raise
+            else:
+                if response.status_code not in self.RETRY_STATUS or attempt == self.retries:
+                    response.raise_for_status()
+                    result = response.json()
+                    await asyncio.to_thread(self._set_cached, url, result)
+                    return result
+            logging.warning('擷取失敗，第 {} 次重試: {}'.format(attempt + 1, url))
+            await asyncio.sleep(self._backoff(attempt))
+
+    async def _crawl(self, game, back_time):
+        stored = await asyncio.to_thread(self._load_from_store, game, back_time)
+        if stored is not None:
+            return self._records(game, stored)
+
+        result = await self.get_lottery_result(self._build_url(game, back_time))
+        datas = self._parse_result(game, back_time, result)
+        await asyncio.to_thread(self._save_to_store, game, back_time, datas)
+        return self._records(game, datas)
+
+    # 同步本地資料庫，只擷取比資料庫中最新期別更新的開獎資料
+    async def sync(self, game, back_time=None):
+        latest, months = await asyncio.to_thread(self._sync_plan, game, back_time)
+        new_datas = []
+        for month in months:
+            for data in await self.crawl(game, month):
+                if latest is None or data['期別'] > latest[0]:
+                    new_datas.append(data)
+
+        new_datas.sort(key=lambda x: x['期別'], reverse=True)
+        return new_datas
+
+    async def crawl(self, game, back_time=None):
+        self._check_games([game])
+        return await self._crawl(game, back_time or [utils.get_current_year(), utils.get_current_month()])
+
+    # 並行擷取起訖月份 (YYYY-MM，含) 內的開獎資料，max_workers 限制同時進行的請求數
+    async def fetch_range(self, game, start_month, end_month, max_workers=6, skip_errors=False):
+        return (await self.fetch_games([game], start_month, end_month, max_workers, skip_errors))[game]
+
+    # 並行擷取多個彩種在起訖月份內的開獎資料，所有彩種共用 max_workers 個同時進行的請求
+    async def fetch_games(self, games, start_month, end_month, max_workers=6, skip_errors=False):
+        tasks = self._fetch_tasks(games, start_month, end_month)
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def fetch(task):
+            async with semaphore:
+                try:
+                    return await self._crawl(*task)
+                except Exception as e:
+                    return self._fetch_failed(task, e, skip_errors)
+
+        results = await asyncio.gather(*[fetch(task) for task in tasks])
+        return self._group_by_game(games, tasks, results)
+
+    # 威力彩
+    async def super_lotto(self, back_time=[utils.get_current_year(), utils.get_current_month()]):
+        return await self._crawl('super_lotto', back_time)
+
+    # 大樂透
+    async def lotto649(self, back_time=[utils.get_current_year(), utils.get_current_month()]):
+        return await self._crawl('lotto649', back_time)
+
+    # 今彩539
+    async def daily_cash(self, back_time=[utils.get_current_year(), utils.get_current_month()]):
+        return await self._crawl('daily_cash', back_time)
+
+    # 雙贏彩
+    async def lotto1224(self, back_time=[utils.get_current_year(), utils.get_current_month()]):
+        return await self._crawl('lotto1224', back_time)
+
+    # 3星彩
+    async def lotto3d(self, back_time=[utils.get_current_year(), utils.get_current_month()]):
+        return await self._crawl('lotto3d', back_time)
+
+    # 4星彩
+    async def lotto4d(self, back_time=[utils.get_current_year(), utils.get_current_month()]):
+        return await self._crawl('lotto4d', back_time)
+
+    # 38樂合彩
+    async def lotto38m6(self, back_time=[utils.get_current_year(), utils.get_current_month()]):
+        return await self._crawl('lotto38m6', back_time)
+
+    # 49樂合彩
+    async def lotto49m6(self, back_time=[utils.get_current_year(), utils.get_current_month()]):
+        return await self._crawl('lotto49m6', back_time)
+
+    # 39樂合彩
+    async def lotto39m5(self, back_time=[utils.get_current_year(), utils.get_current_month()]):
+        return await self._crawl('lotto39m5', back_time)
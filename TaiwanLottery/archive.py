@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+import argparse
+import json
+import os
+
+import numpy as np
+
+from TaiwanLottery import TaiwanLotteryCrawler, utils
+from TaiwanLottery.matrix import DrawMatrix
+
+ARCHIVE_VERSION = 1
+META_FILE = 'meta.json'
+# 各欄位的檔名與資料型別，numbers 每列為 pick 個號碼
+COLUMNS = {
+    'periods': np.dtype(np.int64),
+    'dates': np.dtype('datetime64[s]'),
+    'numbers': np.dtype(np.uint8),
+    'specials': np.dtype(np.uint8),
+}
+
+
+class DrawArchive():
+    """
+    多個彩種完整開獎歷史的欄式二進位檔，每個彩種一個目錄，periods / dates / numbers / specials 各為一個
+    原始陣列檔 (依期別升序)，載入時以 mmap 唯讀對應為 DrawMatrix，不需解析 JSON
+    附加資料時只在各欄位檔案尾端寫入比最新一期更新的開獎資料，最後才更新 meta.json 的筆數，
+    寫入中斷時尾端未完成的資料會被忽略並於下一次附加時截斷
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def games(self):
+        """已有資料的彩種"""
+        return [game for game in TaiwanLotteryCrawler.GAMES if self.meta(game) is not None]
+
+    def meta(self, game):
+        try:
+            with open(os.path.join(self.path, game, META_FILE), encoding='utf-8') as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return None
+        if meta['version'] != ARCHIVE_VERSION:
+            raise ValueError('開獎歷史檔版本不符，請重新建立: ' + os.path.join(self.path, game))
+        return meta
+
+    def latest_period(self, game):
+        meta = self.meta(game)
+        return meta['latest_period'] if meta else None
+
+    def append(self, game, datas):
+        """
+        附加開獎資料 (任意順序)，只寫入期別大於目前最新一期的資料
+        Returns:
+            實際附加的期數
+        """
+        matrix = DrawMatrix.from_draws(datas, game).sort(descending=False)
+        meta = self.meta(game)
+        if meta is not None:
+            matrix = matrix.take(matrix.periods > meta['latest_period'])
+        if not len(matrix):
+            return 0
+
+        pick = matrix.numbers.shape[1]
+        if meta is not None and meta['pick'] != pick:
+            raise ValueError('{} 每期號碼數 ({}) 與開獎歷史檔 ({}) 不同'.format(game, pick, meta['pick']))
+        count = meta['count'] if meta else 0
+        columns = {'periods': matrix.periods, 'dates': matrix.dates, 'numbers': matrix.numbers}
+        if matrix.specials is not None:
+            columns['specials'] = matrix.specials
+
+        os.makedirs(os.path.join(self.path, game), exist_ok=True)
+        for name, values in columns.items():
+            path = self._column_path(game, name)
+            size = count * COLUMNS[name].itemsize * (pick if name == 'numbers' else 1)
+            with open(path, 'ab') as f:
+                # 截斷上一次中斷時多寫入的尾端
+                if f.tell() != size:
+                    f.truncate(size)
+                f.write(np.ascontiguousarray(values, dtype=COLUMNS[name]).tobytes())
+
+        meta = {
+            'version': ARCHIVE_VERSION,
+            'game': game,
+            'count': count + len(matrix),
+            'pick': pick,
+            'latest_period': int(matrix.periods[-1]),
+            'latest_date': str(matrix.dates[-1]),
+        }
+        temp_path = os.path.join(self.path, game, META_FILE + '.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(temp_path, os.path.join(self.path, game, META_FILE))
+        return len(matrix)
+
+    def load(self, game):
+        """以 mmap 載入某彩種的完整歷史 (最新一期在前)，沒有資料時回傳空的 DrawMatrix"""
+        meta = self.meta(game)
+        if meta is None:
+            has_special = TaiwanLotteryCrawler.GAME_API[game]['split'] is not None
+            return DrawMatrix(game, [], [], [], [] if has_special else None)
+
+        count, pick = meta['count'], meta['pick']
+        columns = {}
+        for name, dtype in COLUMNS.items():
+            path = self._column_path(game, name)
+            if name == 'specials' and not os.path.exists(path):
+                columns[name] = None
+                continue
+            shape = (count, pick) if name == 'numbers' else (count, )
+            # 反向切片不會複製資料，仍然對應到同一個 mmap
+            columns[name] = np.memmap(path, dtype=dtype, mode='r', shape=shape)[::-1] if count else np.zeros(shape, dtype=dtype)
+        return DrawMatrix(game, columns['periods'], columns['dates'], columns['numbers'], columns['specials'])
+
+    def _column_path(self, game, name):
+        return os.path.join(self.path, game, name + '.bin')
+
+
+def save_npz(filename, matrix):
+    """將 DrawMatrix 存成單一的壓縮 .npz 檔 (方便傳遞與備份，載入時需解壓縮，無法 mmap)"""
+    columns = {'game': np.array(matrix.game), 'periods': matrix.periods, 'dates': matrix.dates, 'numbers': matrix.numbers}
+    if matrix.specials is not None:
+        columns['specials'] = matrix.specials
+    np.savez_compressed(filename, **columns)
+
+
+def load_npz(filename):
+    """讀取 save_npz 存成的 .npz 檔，回傳 DrawMatrix"""
+    with np.load(filename) as npz:
+        specials = npz['specials'] if 'specials' in npz.files else None
+        return DrawMatrix(str(npz['game']), npz['periods'], npz['dates'], npz['numbers'], specials)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='將開獎資料同步到欄式開獎歷史檔')
+    parser.add_argument('path', help='開獎歷史檔目錄')
+    parser.add_argument('--games', nargs='+', default=list(TaiwanLotteryCrawler.GAMES), choices=TaiwanLotteryCrawler.GAMES)
+    parser.add_argument('--start-month', default='2014-01', help='開獎歷史檔尚無該彩種資料時的起始月份 YYYY-MM')
+    args = parser.parse_args()
+
+    archive = DrawArchive(args.path)
+    current_month = utils.format_month([utils.get_current_year(), utils.get_current_month()])
+    with TaiwanLotteryCrawler() as crawler:
+        for game in args.games:
+            latest = archive.meta(game)
+            # 已有資料時從最新一期所在月份開始擷取，已寫入的期別不會重複附加
+            start_month = latest['latest_date'][:7] if latest else args.start_month
+            datas = crawler.fetch_range(game, start_month, current_month, skip_errors=True)
+            print('{}: 新增 {} 期'.format(game, archive.append(game, datas)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from TaiwanLottery import TaiwanLotteryCrawler, utils
+from TaiwanLottery.generator import THEMES, CandidateGenerator, SelectionRules
+from TaiwanLottery.matrix import DrawMatrix
+from TaiwanLottery.prizes import POSITIONAL_GAMES, PrizeTable, popcount, to_bitmask
+from TaiwanLottery.stats import DrawStatistics
+
+# 內建策略: random 為均勻隨機選號的對照組，其餘對應 CandidateGenerator 的主題
+STRATEGIES = ('random', ) + tuple(THEMES)
+
+# 每個 worker 行程的回測狀態，由 _init_worker 設定一次，避免每個工作重複傳送開獎歷史
+_worker_state = {}
+
+
+def random_strategy(statistics, rng, count, pick, rules):
+    """均勻隨機選號 (不套用選號規則)，作為其他策略的比較基準；3星彩、4星彩每位數各自隨機且保留順序"""
+    if statistics.matrix.game in POSITIONAL_GAMES:
+        return rng.choice(statistics.number_axis, size=(count, pick)), None
+    numbers = np.sort(np.stack([rng.choice(statistics.number_axis, size=pick, replace=False) for _ in range(count)]), axis=1)
+    specials = None if statistics.special_axis is None else rng.choice(statistics.special_axis, size=count)
+    return numbers, specials
+
+
+def theme_strategy(theme):
+    """以 CandidateGenerator 的主題產生號碼的策略"""
+    def strategy(statistics, rng, count, pick, rules):
+        generator = CandidateGenerator(statistics, rules, pick=pick, seed=rng, batch_size=256)
+        numbers = generator.generate(theme, count)
+        specials = None
+        if statistics.special_axis is not None:
+            specials = np.array([generator.special_number(theme, row) for row in numbers.tolist()], dtype=np.int64)
+        return numbers, specials
+    return strategy
+
+
+class Backtester():
+    """
+    歷史回測: 對每一期只用該期之前的開獎資料產生推薦號碼，再依獎項規則與實際開獎結果比對
+    開獎歷史依期數分段，以 ProcessPoolExecutor 平行回測，同一期的統計只計算一次並由所有策略共用；
+    每期的亂數種子由 (seed, 策略, 期數索引) 決定，結果與 worker 數量及分段方式無關
+    """
+
+    def __init__(self, matrix, strategies=None, window=100, min_history=30, tickets=1, seed=0, rules=None, estimates=None):
+        """
+        Args:
+            matrix: DrawMatrix 開獎歷史
+            strategies: 策略名稱 (STRATEGIES) 或自訂策略函式 f(statistics, rng, count, pick, rules) -> (號碼陣列, 第二區陣列或 None)，
+                自訂函式必須定義在模組層級才能傳給其他行程；預設為全部內建策略，
+                3星彩、4星彩 (POSITIONAL_GAMES) 的主題策略無法產生可重複的位數，預設只有 random 且不接受主題策略
+            window: 產生推薦時使用的歷史期數
+            min_history: 歷史期數不足時不回測
+            tickets: 每期每個策略的注數
+            seed: 亂數種子
+            rules: SelectionRules，預設大樂透使用選號策略規則，其他彩種不限制
+            estimates: 浮動獎金估計值，參考 PrizeTable.for_game
+        """
+        self.matrix = matrix.sort(descending=False)
+        positional = matrix.game in POSITIONAL_GAMES
+        if strategies is None:
+            strategies = ('random', ) if positional else STRATEGIES
+        themes = [strategy for strategy in strategies if isinstance(strategy, str) and strategy in THEMES]
+        if positional and themes:
+            raise ValueError('{} 依位置比對號碼，不支援主題策略: {}'.format(matrix.game, ', '.join(themes)))
+        self.strategies = list(strategies)
+        self.window = window
+        self.min_history = min_history
+        self.tickets = tickets
+        self.seed = seed
+        pick = self.matrix.numbers.shape[1]
+        self.table = PrizeTable.for_game(matrix.game, pick, estimates)
+        statistics = DrawStatistics(self.matrix)
+        self.rules = rules or (SelectionRules() if matrix.game == 'lotto649' else
+                               SelectionRules.unrestricted(pick, statistics.zone_bounds, statistics.high_threshold, self.matrix.max_number))
+
+    @classmethod
+    def from_draws(cls, datas, game, **kwargs):
+        return cls(DrawMatrix.from_draws(datas, game), **kwargs)
+
+    def run(self, max_workers=None, chunk_size=250):
+        """
+        Args:
+            max_workers: 行程數，1 表示在目前行程中執行
+            chunk_size: 每個工作回測的期數
+        Returns:
+            {'game', 'draws', 'window', 'tickets', 'ticket_price', 'strategies': {策略: 結果}}
+        """
+        pick = self.table.pick
+        state = {
+            'matrix': self.matrix,
+            'strategies': self.strategies,
+            'window': self.window,
+            'tickets': self.tickets,
+            'seed': self.seed,
+            'rules': self.rules,
+            'pick': pick,
+            'table': self.table,
+        }
+        starts = range(self.min_history, len(self.matrix), chunk_size)
+        jobs = [(start, min(start + chunk_size, len(self.matrix))) for start in starts]
+
+        if max_workers == 1:
+            _init_worker(state)
+            results = [_backtest_chunk(*job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(state, )) as executor:
+                results = list(executor.map(_backtest_chunk, *zip(*jobs))) if jobs else []
+
+        tier_counts = sum((result[0] for result in results), np.zeros((len(self.strategies), self.table.no_prize + 1), dtype=np.int64))
+        hit_counts = sum((result[1] for result in results), np.zeros((len(self.strategies), pick + 1), dtype=np.int64))
+
+        return {
+            'game': self.matrix.game,
+            'draws': max(len(self.matrix) - self.min_history, 0),
+            'window': self.window,
+            'tickets': self.tickets,
+            'ticket_price': self.table.ticket_price,
+            'strategies': {_strategy_name(strategy): self._summary(tier_counts[i], hit_counts[i]) for i, strategy in enumerate(self.strategies)},
+        }
+
+    def _summary(self, tier_counts, hit_counts):
+        tickets = int(tier_counts.sum())
+        winners = tickets - int(tier_counts[self.table.no_prize])
+        cost = tickets * self.table.ticket_price
+        payout = float(tier_counts @ self.table.amounts)
+        return {
+            'tickets': tickets,
+            'tier_counts': self.table.tier_counts(tier_counts),
+            'prize_rate': winners / tickets if tickets else 0.0,
+            'hit_distribution': {hits: int(count) for hits, count in enumerate(hit_counts.tolist())},
+            'mean_hits': float(hit_counts @ np.arange(len(hit_counts))) / tickets if tickets else 0.0,
+            'cost': cost,
+            'payout': payout,
+            'return_rate': payout / cost if cost else None,
+        }
+
+
+def _strategy_name(strategy):
+    return strategy if isinstance(strategy, str) else strategy.__name__
+
+
+def _resolve_strategy(strategy):
+    if not isinstance(strategy, str):
+        return strategy
+    if strategy == 'random':
+        return random_strategy
+    if strategy in THEMES:
+        return theme_strategy(strategy)
+    raise ValueError('未知的策略: ' + strategy)
+
+
+def _init_worker(state):
+    _worker_state.clear()
+    _worker_state.update(state)
+    _worker_state['functions'] = [_resolve_strategy(strategy) for strategy in state['strategies']]
+
+
+def _backtest_chunk(start, end):
+    """回測第 start 到 end - 1 期 (舊到新的索引)，回傳 ((策略數, 獎項數) 注數, (策略數, 中獎數) 注數)"""
+    matrix = _worker_state['matrix']
+    table = _worker_state['table']
+    pick = _worker_state['pick']
+    functions = _worker_state['functions']
+    draw_numbers = matrix.numbers[start:end]
+    draw_masks = to_bitmask(draw_numbers)
+    draw_specials = matrix.specials[start:end] if matrix.specials is not None else np.zeros(end - start, dtype=np.uint8)
+    tier_counts = np.zeros((len(functions), table.no_prize + 1), dtype=np.int64)
+    hit_counts = np.zeros((len(functions), pick + 1), dtype=np.int64)
+
+    for index in range(start, end):
+        statistics = DrawStatistics(matrix.take(slice(max(0, index - _worker_state['window']), index)))
+        draw = slice(index - start, index - start + 1)
+        for strategy_index, strategy in enumerate(functions):
+            rng = np.random.default_rng([_worker_state['seed'], strategy_index, index])
+            numbers, specials = strategy(statistics, rng, _worker_state['tickets'], pick, _worker_state['rules'])
+            if not len(numbers):
+                continue
+            if table.positional:
+                tiers, hits = table.score_positional(numbers, draw_numbers[draw])
+            else:
+                ticket_masks = to_bitmask(numbers)
+                tiers = table.score_tickets(ticket_masks, specials, draw_masks[draw], draw_specials[draw])
+                hits = popcount(ticket_masks & draw_masks[draw])
+            tier_counts[strategy_index] += np.bincount(tiers.ravel(), minlength=table.no_prize + 1)
+            hit_counts[strategy_index] += np.bincount(hits.ravel(), minlength=pick + 1)
+    return tier_counts, hit_counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='以歷史開獎資料回測選號策略')
+    parser.add_argument('game', choices=TaiwanLotteryCrawler.GAMES)
+    parser.add_argument('--from', dest='start_month', required=True, help='起始月份 YYYY-MM')
+    parser.add_argument('--to', dest='end_month', default=utils.format_month([utils.get_current_year(), utils.get_current_month()]))
+    parser.add_argument('--strategies', nargs='+', default=None, choices=list(STRATEGIES), help='預設為全部內建策略 (3星彩、4星彩只有 random)')
+    parser.add_argument('--window', type=int, default=100)
+    parser.add_argument('--tickets', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    from TaiwanLottery.store import DrawStore
+    with TaiwanLotteryCrawler(store=DrawStore(os.getenv('LOTTERY_DB_PATH', 'taiwan_lottery.db'))) as crawler:
+        datas = crawler.fetch_range(args.game, args.start_month, args.end_month, skip_errors=True)
+    backtester = Backtester.from_draws(datas, args.game, strategies=args.strategies, window=args.window, tickets=args.tickets, seed=args.seed)
+    print(json.dumps(backtester.run(max_workers=args.workers), ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
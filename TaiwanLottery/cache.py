@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+import datetime
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from TaiwanLottery import utils
+
+MONTH_PATTERN = re.compile(r'month=(\d{4})-(\d{1,2})')
+
+
+def is_empty_result(result):
+    """API 結果是否沒有任何開獎資料 (缺少 content 或 totalSize 為 0)"""
+    content = result.get('content') if isinstance(result, dict) else None
+    return not isinstance(content, dict) or not content.get('totalSize')
+
+
+class ResponseCache():
+    """
+    上游 API 月份查詢結果的快取，分為記憶體 LRU 與選用的磁碟兩層
+    已結束月份的資料不會再變動，永久保存；目前月份的資料依是否為開獎日套用不同的 TTL
+    沒有開獎資料的結果可能是上游暫時性的錯誤，即使是已結束的月份也套用目前月份的 TTL，且不寫入磁碟
+    """
+
+    def __init__(self, max_entries=256, max_bytes=32 * 1024 * 1024, cache_dir=None, current_month_ttl=3600, draw_day_ttl=300):
+        """
+        Args:
+            max_entries: 記憶體層最多保留的筆數
+            max_bytes: 記憶體層最多保留的 JSON 位元組數
+            cache_dir: 磁碟層目錄，None 表示不使用磁碟層 (只儲存已結束的月份)
+            current_month_ttl: 非開獎日時，目前月份資料的有效秒數
+            draw_day_ttl: 開獎日時，目前月份資料的有效秒數
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.current_month_ttl = current_month_ttl
+        self.draw_day_ttl = draw_day_ttl
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def get(self, url):
+        """回傳快取的 API 結果，未命中或已過期時回傳 None"""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                text, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(url)
+                    self.hits += 1
+                    return json.loads(text)
+                self._remove(url)
+
+            text = self._read_disk(url)
+            if text is not None:
+                self._put(url, text, None)
+                self.hits += 1
+                self.disk_hits += 1
+                return json.loads(text)
+
+            self.misses += 1
+            return None
+
+    def set(self, url, result, draw_days=()):
+        """
+        Args:
+            url: 查詢網址，需包含 month=YYYY-MM
+            result: API 回傳的 JSON 結果
+            draw_days: 該彩種的開獎星期 (0 為星期一)，用於決定目前月份的 TTL
+        """
+        text = json.dumps(result, ensure_ascii=False)
+        ttl = self.ttl(url, draw_days)
+        if ttl is None and is_empty_result(result):
+            ttl = self.current_ttl(draw_days)
+        with self._lock:
+            self._put(url, text, None if ttl is None else time.monotonic() + ttl)
+            if ttl is None:
+                self._write_disk(url, text)
+
+    def ttl(self, url, draw_days=()):
+        """已結束的月份回傳 None (永不過期)，否則回傳有效秒數"""
+        match = MONTH_PATTERN.search(url)
+        if match and utils.is_past_month(utils.format_month(match.groups())):
+            return None
+        return self.current_ttl(draw_days)
+
+    def current_ttl(self, draw_days=()):
+        """目前月份資料的有效秒數 (開獎日較短)"""
+        if datetime.datetime.now().weekday() in draw_days:
+            return self.draw_day_ttl
+        return self.current_month_ttl
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+            }
+
+    def discard(self, url):
+        """移除記憶體層中的資料 (已結束月份的磁碟資料不受影響)"""
+        with self._lock:
+            if url in self._entries:
+                self._remove(url)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _put(self, url, text, expires_at):
+        if url in self._entries:
+            self._remove(url)
+        self._entries[url] = (text, expires_at)
+        self._bytes += len(text)
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, url):
+        text, _ = self._entries.pop(url)
+        self._bytes -= len(text)
+
+    def _disk_path(self, url):
+        return os.path.join(self.cache_dir, hashlib.sha1(url.encode('utf-8')).hexdigest() + '.json')
+
+    def _read_disk(self, url):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._disk_path(url), encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _write_disk(self, url, text):
+        if not self.cache_dir:
+            return
+        path = self._disk_path(url)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+import argparse
+import itertools
+import json
+import math
+import os
+
+import numpy as np
+
+from TaiwanLottery.stats import combination_features
+
+# 預先建立索引的彩種設定: 大樂透 49 選 6、威力彩第一區 38 選 6
+INDEX_GAMES = {
+    'lotto649': {'max_number': 49, 'pick': 6, 'zone_bounds': (16, 33), 'high_threshold': 25},
+    'super_lotto': {'max_number': 38, 'pick': 6, 'zone_bounds': (12, 25), 'high_threshold': 20},
+}
+
+# 各特徵欄位的資料型別，皆以 .npy 檔案儲存，zone_counts 為 (組數, 3)
+FEATURE_DTYPES = {
+    'sums': np.uint16,
+    'spans': np.uint8,
+    'odd_counts': np.uint8,
+    'high_counts': np.uint8,
+    'zone_counts': np.uint8,
+    'same_tail_groups': np.uint8,
+    'consecutive_pairs': np.uint8,
+    'longest_runs': np.uint8,
+}
+META_FILE = 'meta.json'
+INDEX_VERSION = 1
+
+
+class CombinationIndex():
+    """
+    所有 C(max_number, pick) 號碼組合與其選號特徵的欄式索引，依字典序排列 (列索引即組合序號)
+    每個欄位為獨立的 .npy 檔案並以 mmap 唯讀載入，多個 worker 行程可共用作業系統的快取頁面
+    """
+
+    def __init__(self, path):
+        with open(os.path.join(path, META_FILE), encoding='utf-8') as f:
+            self.meta = json.load(f)
+        if self.meta['version'] != INDEX_VERSION:
+            raise ValueError('索引版本不符，請重新建立: ' + path)
+        self.path = path
+        self.max_number = self.meta['max_number']
+        self.pick = self.meta['pick']
+        self.zone_bounds = tuple(self.meta['zone_bounds'])
+        self.high_threshold = self.meta['high_threshold']
+        self.numbers = np.load(os.path.join(path, 'numbers.npy'), mmap_mode='r')
+        self.features = {name: np.load(os.path.join(path, name + '.npy'), mmap_mode='r') for name in FEATURE_DTYPES}
+
+    @classmethod
+    def build(cls, path, max_number=49, pick=6, zone_bounds=(16, 33), high_threshold=25, chunk_size=1000000):
+        """
+        列舉所有組合並分批計算特徵寫入 path 目錄，記憶體用量只與 chunk_size 有關
+        Returns:
+            建立完成的 CombinationIndex
+        """
+        os.makedirs(path, exist_ok=True)
+        total = math.comb(max_number, pick)
+        numbers_file = np.lib.format.open_memmap(os.path.join(path, 'numbers.npy'), mode='w+', dtype=np.uint8, shape=(total, pick))
+        feature_files = {}
+        for name, dtype in FEATURE_DTYPES.items():
+            shape = (total, len(zone_bounds) + 1) if name == 'zone_counts' else (total, )
+            feature_files[name] = np.lib.format.open_memmap(os.path.join(path, name + '.npy'), mode='w+', dtype=dtype, shape=shape)
+
+        combinations = itertools.combinations(range(1, max_number + 1), pick)
+        for start in range(0, total, chunk_size):
+            size = min(chunk_size, total - start)
+            flat = itertools.chain.from_iterable(itertools.islice(combinations, size))
+            numbers = np.fromiter(flat, dtype=np.uint8, count=size * pick).reshape(size, pick)
+            numbers_file[start:start + size] = numbers
+            for name, values in combination_features(numbers, zone_bounds, high_threshold).items():
+                feature_files[name][start:start + size] = values
+
+        for memmap in [numbers_file] + list(feature_files.values()):
+            memmap.flush()
+        del numbers_file, feature_files
+
+        meta = {
+            'version': INDEX_VERSION,
+            'max_number': max_number,
+            'pick': pick,
+            'zone_bounds': list(zone_bounds),
+            'high_threshold': high_threshold,
+            'count': total,
+        }
+        with open(os.path.join(path, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        return cls(path)
+
+    @classmethod
+    def build_game(cls, path, game, chunk_size=1000000):
+        """建立 INDEX_GAMES 中預設彩種的索引"""
+        return cls.build(path, chunk_size=chunk_size, **INDEX_GAMES[game])
+
+    def __len__(self):
+        return len(self.numbers)
+
+    def mask(self, rules, chunk_size=2000000):
+        """
+        以 SelectionRules 分批向量化掃描所有組合
+        Returns:
+            (組數,) 布林遮罩
+        """
+        if tuple(rules.zone_bounds) != self.zone_bounds or rules.high_threshold != self.high_threshold:
+            raise ValueError('規則的分區或大號界線與索引不同')
+        mask = np.empty(len(self), dtype=bool)
+        for start in range(0, len(self), chunk_size):
+            end = min(start + chunk_size, len(self))
+            mask[start:end] = rules.mask({name: values[start:end] for name, values in self.features.items()})
+        return mask
+
+    def count(self, rules):
+        """符合規則的組合數"""
+        return int(np.count_nonzero(self.mask(rules)))
+
+    def query(self, rules, limit=None, offset=0):
+        """回傳符合規則的組合 (依字典序)，limit 為 None 時回傳全部"""
+        rows = np.flatnonzero(self.mask(rules))
+        rows = rows[offset:] if limit is None else rows[offset:offset + limit]
+        return np.asarray(self.numbers[rows])
+
+    def sample(self, rules, count, seed=None):
+        """從符合規則的組合中均勻抽出 count 組不重複組合"""
+        rows = np.flatnonzero(self.mask(rules))
+        rng = np.random.default_rng(seed)
+        chosen = rng.choice(rows, size=min(count, len(rows)), replace=False)
+        return np.asarray(self.numbers[np.sort(chosen)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='建立號碼組合特徵索引')
+    parser.add_argument('path', help='索引輸出目錄，各彩種會建立在子目錄中')
+    parser.add_argument('--games', nargs='+', default=list(INDEX_GAMES), choices=list(INDEX_GAMES))
+    args = parser.parse_args()
+    for game in args.games:
+        index = CombinationIndex.build_game(os.path.join(args.path, game), game)
+        print('{}: {} 組'.format(game, len(index)))
+
+
+if __name__ == '__main__':
+    main()
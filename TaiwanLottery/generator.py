@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from TaiwanLottery.stats import combination_features
+
+# 主題代號與顯示名稱，名稱與 AI 推薦的 recommended_sets 相同
+THEMES = {
+    'cold': '冷門號碼組合',
+    'hot': '熱門號碼組合',
+    'mixed': '熱門 + 冷門 混合號碼組合',
+    'balanced': '均衡組合',
+}
+
+
+class SelectionRules():
+    """
+    選號策略的硬性規則，預設值對應 predict_lottery_numbers_with_ai 提示詞中的選號策略
+        odd_counts: 允許的奇數個數 (3:3 或 2:4 單雙比)
+        sum_range: 和值範圍 (含)
+        span_range: 首尾差範圍 (含)
+        zone_counts: 低、中、高區個數，None 表示不限制
+        zone_bounds: 低區與中區的上界 (含)
+        min_same_tail_groups: 至少包含的同尾號組數
+        max_consecutive_pairs: 最多的連號組數
+        max_run: 最長連號長度 (2 表示不允許 3 連號)
+    """
+
+    def __init__(self, odd_counts=(2, 3, 4), sum_range=(120, 160), span_range=(30, 40), zone_counts=(2, 2, 2), zone_bounds=(16, 33),
+                 min_same_tail_groups=1, max_consecutive_pairs=1, max_run=2, high_threshold=25):
+        self.odd_counts = odd_counts
+        self.sum_range = sum_range
+        self.span_range = span_range
+        self.zone_counts = zone_counts
+        self.zone_bounds = zone_bounds
+        self.min_same_tail_groups = min_same_tail_groups
+        self.max_consecutive_pairs = max_consecutive_pairs
+        self.max_run = max_run
+        self.high_threshold = high_threshold
+
+    @classmethod
+    def unrestricted(cls, pick, zone_bounds, high_threshold, max_number=49):
+        """不限制任何特徵的規則，供沒有選號策略的彩種 (威力彩、今彩539 等) 使用"""
+        return cls(odd_counts=tuple(range(pick + 1)), sum_range=(0, max_number * pick), span_range=(0, max_number), zone_counts=None,
+                   zone_bounds=zone_bounds, min_same_tail_groups=0, max_consecutive_pairs=pick, max_run=pick, high_threshold=high_threshold)
+
+    def mask(self, features):
+        """回傳符合所有規則的布林遮罩"""
+        mask = np.isin(features['odd_counts'], self.odd_counts)
+        mask &= (features['sums'] >= self.sum_range[0]) & (features['sums'] <= self.sum_range[1])
+        mask &= (features['spans'] >= self.span_range[0]) & (features['spans'] <= self.span_range[1])
+        if self.zone_counts is not None:
+            mask &= (features['zone_counts'] == np.asarray(self.zone_counts)).all(axis=1)
+        mask &= features['same_tail_groups'] >= self.min_same_tail_groups
+        mask &= features['consecutive_pairs'] <= self.max_consecutive_pairs
+        mask &= features['longest_runs'] <= self.max_run
+        return mask
+
+    def check(self, numbers):
+        """檢查單組號碼是否符合規則"""
+        features = combination_features(np.sort(np.asarray([numbers]), axis=1), self.zone_bounds, self.high_threshold)
+        return bool(self.mask(features)[0])
+
+
+class CandidateGenerator():
+    """
+    以向量化抽樣產生符合選號規則的號碼組合
+    每批以 Gumbel top-k 依主題權重一次抽出數千組不重複號碼，再以規則遮罩過濾，
+    並以 bitmask 去除重複組合，通常數毫秒即可完成
+    """
+
+    def __init__(self, statistics, rules=None, pick=6, hot_size=10, seed=None, batch_size=2000, max_batches=200):
+        """
+        Args:
+            statistics: TaiwanLottery.stats.DrawStatistics，提供熱門、冷門號碼與特別號頻率
+            rules: SelectionRules，預設為提示詞中的選號策略
+            pick: 每組號碼數
+            hot_size: 熱門號碼與冷門號碼各取前幾名
+            seed: 亂數種子
+        """
+        self.statistics = statistics
+        self.rules = rules or SelectionRules()
+        self.pick = pick
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self.rng = np.random.default_rng(seed)
+        self.number_axis = statistics.number_axis
+        frequency = statistics.number_frequency.astype(np.float64)
+        order = np.argsort(-frequency, kind='stable')
+        self.hot_mask = np.zeros(len(frequency), dtype=bool)
+        self.hot_mask[order[:hot_size]] = True
+        self.cold_mask = np.zeros(len(frequency), dtype=bool)
+        self.cold_mask[order[-hot_size:]] = True
+        self.weights = {
+            'hot': (frequency + 1) ** 2,
+            'cold': 1 / (frequency + 1) ** 2,
+            'mixed': np.ones(len(frequency)),
+            'balanced': np.ones(len(frequency)),
+        }
+
+    def generate(self, theme, count=1):
+        """回傳 (count, pick) 的號碼陣列，找不到足夠組合時回傳較少的列"""
+        log_weights = np.log(self.weights[theme] / self.weights[theme].sum())
+        found = np.zeros((0, self.pick), dtype=np.int16)
+        seen = set()
+        for _ in range(self.max_batches):
+            keys = log_weights + self.rng.gumbel(size=(self.batch_size, len(log_weights)))
+            columns = np.argpartition(-keys, self.pick - 1, axis=1)[:, :self.pick]
+            numbers = np.sort(self.number_axis[columns], axis=1).astype(np.int16)
+            mask = self.rules.mask(combination_features(numbers, self.rules.zone_bounds, self.rules.high_threshold))
+            if theme == 'mixed':
+                hot_counts = self.hot_mask[columns].sum(axis=1)
+                mask &= (hot_counts >= 2) & (hot_counts <= 3) & (self.cold_mask[columns].sum(axis=1) >= 2)
+            candidates = numbers[mask]
+            bitmasks = (np.uint64(1) << candidates.astype(np.uint64)).sum(axis=1, dtype=np.uint64)
+            _, first = np.unique(bitmasks, return_index=True)
+            for index in np.sort(first):
+                if int(bitmasks[index]) not in seen:
+                    seen.add(int(bitmasks[index]))
+                    found = np.vstack([found, candidates[index]])
+                    if len(found) == count:
+                        return found
+        return found
+
+    def special_number(self, theme, regular_numbers):
+        """依主題權重選出不與獎號重複的特別號，彩種沒有特別號時回傳 None"""
+        if self.statistics.special_frequency is None:
+            return None
+        frequency = self.statistics.special_frequency.astype(np.float64)
+        weights = (frequency + 1) ** 2 if theme == 'hot' else 1 / (frequency + 1) ** 2 if theme == 'cold' else np.ones(len(frequency))
+        weights[np.isin(self.statistics.special_axis, regular_numbers)] = 0
+        return int(self.rng.choice(self.statistics.special_axis, p=weights / weights.sum()))
+
+    def recommend(self, themes=tuple(THEMES), per_theme=1):
+        """產生與 AI recommended_sets 相同格式的推薦號碼"""
+        recommended_sets = []
+        for theme in themes:
+            for numbers in self.generate(theme, per_theme).tolist():
+                recommended_sets.append({
+                    "type": THEMES[theme],
+                    "regular_numbers": numbers,
+                    "special_number": self.special_number(theme, numbers),
+                    "reason": "依選號策略規則 (單雙比、和值、首尾差、分區、同尾號、連號) 於本地產生的{}".format(THEMES[theme])
+                })
+        return recommended_sets
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+class PredictionCache():
+    """
+    AI 預測結果的內容定址磁碟快取
+    提示詞完全由模型、提示詞版本與資料期別範圍決定，相同的鍵可直接重用先前的回應而不必再呼叫模型；
+    每筆資料為一個 JSON 檔案，包含原始文字與解析後的 recommended_sets，
+    超過 max_entries 或 max_bytes 時依最後讀取時間刪除最舊的檔案
+    """
+
+    def __init__(self, cache_dir, max_entries=512, max_bytes=64 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(model_name, prompt_version, datas):
+        """
+        Args:
+            model_name: 模型名稱，例如 'gemini-2.5-flash'
+            prompt_version: 提示詞範本版本，範本內容改變時需遞增
+            datas: 提示詞使用的開獎資料
+        Returns:
+            SHA-256 十六進位字串
+        """
+        periods = [data['期別'] for data in datas]
+        window = [min(periods), max(periods), len(periods)] if periods else []
+        content = json.dumps([model_name, prompt_version, window])
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """回傳 {'text', 'recommended_sets', 'created_at', ...}，未命中時回傳 None"""
+        path = self._path(key)
+        with self._lock:
+            try:
+                with open(path, encoding='utf-8') as f:
+                    entry = json.load(f)
+            except (FileNotFoundError, ValueError):
+                self.misses += 1
+                return None
+            # 以檔案修改時間記錄最後讀取時間，供淘汰時使用
+            os.utime(path)
+            self.hits += 1
+            return entry
+
+    def set(self, key, text, recommended_sets=None, **meta):
+        """寫入原始文字與解析後的推薦號碼，meta 為其他要一併保存的資訊 (例如模型名稱)"""
+        entry = dict(meta, text=text, recommended_sets=recommended_sets, created_at=time.time())
+        path = self._path(key)
+        tmp_path = path + '.tmp'
+        with self._lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            self._evict()
+
+    def update(self, key, **fields):
+        """更新既有資料的欄位 (例如補上 recommended_sets)，資料不存在時回傳 False"""
+        with self._lock:
+            try:
+                with open(self._path(key), encoding='utf-8') as f:
+                    entry = json.load(f)
+            except (FileNotFoundError, ValueError):
+                return False
+        entry.update(fields)
+        self.set(key, **entry)
+        return True
+
+    def stats(self):
+        with self._lock:
+            files = self._files()
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0,
+                'entries': len(files),
+                'bytes': sum(size for _, size, _ in files),
+            }
+
+    def clear(self):
+        with self._lock:
+            for path, _, _ in self._files():
+                os.remove(path)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + '.json')
+
+    def _files(self):
+        files = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.json'):
+                stat = entry.stat()
+                files.append((entry.path, stat.st_size, stat.st_mtime))
+        return files
+
+    def _evict(self):
+        files = sorted(self._files(), key=lambda file: file[2])
+        total_bytes = sum(size for _, size, _ in files)
+        while files and (len(files) > self.max_entries or total_bytes > self.max_bytes):
+            path, size, _ = files.pop(0)
+            os.remove(path)
+            total_bytes -= size
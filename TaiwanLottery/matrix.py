@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from TaiwanLottery import TaiwanLotteryCrawler
+
+
+class DrawMatrix():
+    """
+    以 NumPy 陣列表示的開獎歷史，每一列為一期，順序與輸入相同 (爬蟲回傳為最新一期在前)
+        periods: (期數,) int64 期別
+        dates: (期數,) datetime64[s] 開獎日期
+        numbers: (期數, 號碼數) uint8 開出的號碼，保留原始順序
+        incidence: (期數, 號碼範圍) uint8 號碼出現次數矩陣，第 j 欄對應號碼 min_number + j
+        specials: (期數,) uint8 特別號 / 第二區，彩種沒有特別號時為 None
+    """
+
+    def __init__(self, game, periods, dates, numbers, specials=None):
+        api = TaiwanLotteryCrawler.GAME_API[game]
+        self.game = game
+        self.min_number, self.max_number = api['number_range']
+        self.periods = np.asarray(periods, dtype=np.int64)
+        self.dates = np.asarray(dates, dtype='datetime64[s]')
+        self.numbers = np.asarray(numbers, dtype=np.uint8).reshape(len(self.periods), -1) if len(self.periods) else np.zeros((0, 0), dtype=np.uint8)
+        self.specials = None if specials is None else np.asarray(specials, dtype=np.uint8)
+        self.incidence = self._build_incidence()
+
+    @classmethod
+    def from_draws(cls, datas, game):
+        """由爬蟲回傳的開獎資料 (dict 清單) 建立"""
+        api = TaiwanLotteryCrawler.GAME_API[game]
+        number_key, special_key = api['split'] if api['split'] else ('獎號', None)
+        periods = [data['期別'] for data in datas]
+        dates = [data['開獎日期'] for data in datas]
+        numbers = [data[number_key] for data in datas]
+        specials = [data[special_key] for data in datas] if special_key else None
+        return cls(game, periods, dates, numbers, specials)
+
+    def to_draws(self):
+        """轉回與爬蟲相同格式的開獎資料 (dict 清單)"""
+        api = TaiwanLotteryCrawler.GAME_API[self.game]
+        number_key, special_key = api['split'] if api['split'] else ('獎號', None)
+        dates = np.datetime_as_string(self.dates, unit='s')
+        datas = []
+        for i, (period, numbers) in enumerate(zip(self.periods.tolist(), self.numbers.tolist())):
+            data = {'期別': period, '開獎日期': str(dates[i]), number_key: numbers}
+            if special_key:
+                data[special_key] = int(self.specials[i])
+            datas.append(data)
+        return datas
+
+    @property
+    def number_axis(self):
+        """incidence 各欄對應的號碼"""
+        return np.arange(self.min_number, self.max_number + 1)
+
+    @property
+    def special_axis(self):
+        """special_incidence 各欄對應的號碼，彩種沒有特別號時為 None"""
+        special_range = TaiwanLotteryCrawler.GAME_API[self.game]['special_range']
+        if special_range is None:
+            return None
+        return np.arange(special_range[0], special_range[1] + 1)
+
+    @property
+    def special_incidence(self):
+        """(期數, 特別號範圍) uint8 特別號出現矩陣，第 j 欄對應號碼 special_min + j"""
+        if self.specials is None:
+            return None
+        special_min, special_max = TaiwanLotteryCrawler.GAME_API[self.game]['special_range']
+        incidence = np.zeros((len(self), special_max - special_min + 1), dtype=np.uint8)
+        incidence[np.arange(len(self)), self.specials.astype(np.intp) - special_min] = 1
+        return incidence
+
+    def take(self, index):
+        """依列索引 (slice、整數陣列或布林遮罩) 取出子集合"""
+        specials = None if self.specials is None else self.specials[index]
+        return DrawMatrix(self.game, self.periods[index], self.dates[index], self.numbers[index], specials)
+
+    def head(self, n):
+        """取前 n 期 (爬蟲順序下為最近 n 期)"""
+        return self.take(slice(0, n))
+
+    def sort(self, descending=True):
+        """依期別排序，預設最新一期在前"""
+        order = np.argsort(self.periods, kind='stable')
+        return self.take(order[::-1] if descending else order)
+
+    def __len__(self):
+        return len(self.periods)
+
+    def __repr__(self):
+        return 'DrawMatrix(game={!r}, draws={}, numbers={}-{})'.format(self.game, len(self), self.min_number, self.max_number)
+
+    def _build_incidence(self):
+        draws = len(self.periods)
+        width = self.max_number - self.min_number + 1
+        if not self.numbers.size:
+            return np.zeros((draws, width), dtype=np.uint8)
+        # 以扁平索引計數，3星彩、4星彩的位數重複時會累加次數
+        flat_index = np.arange(draws)[:, None] * width + (self.numbers.astype(np.intp) - self.min_number)
+        return np.bincount(flat_index.ravel(), minlength=draws * width).astype(np.uint8).reshape(draws, width)
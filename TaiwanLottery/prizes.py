@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+# 各彩種的獎項規則，依獎項由高到低排列: (獎項, 獎號中獎數, 是否需中特別號 / 第二區, 獎金, 是否為固定獎金)
+# 浮動獎金依當期銷售額分配，表中金額僅為計算期望值用的估計值，可由 PrizeTable.for_game(estimates=...) 覆寫
+#     special: 'pool' 表示特別號與獎號同一號碼池 (投注號碼含特別號即中)，'zone' 表示另選一個第二區號碼
+PRIZE_TABLES = {
+    'lotto649': {
+        'ticket_price': 50,
+        'special': 'pool',
+        'tiers': [
+            ('頭獎', 6, False, 100000000, False),
+            ('貳獎', 5, True, 1500000, False),
+            ('參獎', 5, False, 50000, False),
+            ('肆獎', 4, True, 12000, False),
+            ('伍獎', 4, False, 2000, True),
+            ('陸獎', 3, True, 1000, True),
+            ('柒獎', 2, True, 400, True),
+            ('普獎', 3, False, 400, True),
+        ],
+    },
+    'super_lotto': {
+        'ticket_price': 100,
+        'special': 'zone',
+        'tiers': [
+            ('頭獎', 6, True, 200000000, False),
+            ('貳獎', 6, False, 5000000, False),
+            ('參獎', 5, True, 150000, True),
+            ('肆獎', 5, False, 20000, True),
+            ('伍獎', 4, True, 4000, True),
+            ('陸獎', 4, False, 800, True),
+            ('柒獎', 3, True, 400, True),
+            ('捌獎', 2, True, 200, True),
+            ('玖獎', 3, False, 100, True),
+            ('普獎', 1, True, 100, True),
+        ],
+    },
+    'daily_cash': {
+        'ticket_price': 50,
+        'special': None,
+        'tiers': [
+            ('頭獎', 5, False, 8000000, True),
+            ('貳獎', 4, False, 20000, True),
+            ('參獎', 3, False, 300, True),
+            ('肆獎', 2, False, 50, True),
+        ],
+    },
+}
+
+# 依位置比對、號碼可重複的彩種 (3星彩、4星彩)，中獎數為位置與號碼皆相同的位數
+POSITIONAL_GAMES = ('lotto3d', 'lotto4d')
+
+
+class PrizeTable():
+    """
+    以查表方式向量化判定獎項
+        names: 獎項名稱，索引 len(names) 代表未中獎
+        amounts: 各獎項獎金 (最後一個元素為未中獎的 0)
+        lookup: (獎號中獎數, 是否中特別號) -> 獎項索引
+        positional: 是否依位置比對 (POSITIONAL_GAMES)，此時以 score_positional 判定獎項
+    """
+
+    def __init__(self, game, tiers, pick, ticket_price=0, special=None, positional=False):
+        self.game = game
+        self.pick = pick
+        self.ticket_price = ticket_price
+        self.special = special
+        self.positional = positional
+        self.names = [tier[0] for tier in tiers]
+        self.fixed = [tier[4] for tier in tiers]
+        self.amounts = np.array([tier[3] for tier in tiers] + [0], dtype=np.float64)
+        self.lookup = np.full((pick + 1, 2), len(tiers), dtype=np.intp)
+        # 由低獎往高獎填入，同一格被較高的獎項覆蓋
+        for index in range(len(tiers) - 1, -1, -1):
+            _, hits, need_special, _, _ = tiers[index]
+            self.lookup[hits, 1] = index
+            if not need_special:
+                self.lookup[hits, 0] = index
+
+    @classmethod
+    def for_game(cls, game, pick=None, estimates=None):
+        """
+        Args:
+            game: 彩種
+            pick: 每注號碼數，沒有獎項規則的彩種必須提供，會以「中 N 碼」(3星彩、4星彩為「中 N 位」) 計算中獎數分佈 (獎金為 0)
+            estimates: 覆寫浮動獎金估計值，例如 {'頭獎': 300000000}
+        """
+        if game in POSITIONAL_GAMES:
+            tiers = [('中{}位'.format(hits), hits, False, 0, True) for hits in range(pick, 0, -1)]
+            return cls(game, tiers, pick, positional=True)
+        if game not in PRIZE_TABLES:
+            tiers = [('中{}碼'.format(hits), hits, False, 0, True) for hits in range(pick, 0, -1)]
+            return cls(game, tiers, pick)
+        table = PRIZE_TABLES[game]
+        estimates = estimates or {}
+        tiers = [(name, hits, need_special, estimates.get(name, amount), fixed) for name, hits, need_special, amount, fixed in table['tiers']]
+        return cls(game, tiers, pick or max(tier[1] for tier in tiers), table['ticket_price'], table['special'])
+
+    @property
+    def no_prize(self):
+        """未中獎的獎項索引"""
+        return len(self.names)
+
+    def score(self, hits, special_hits):
+        """由中獎數與是否中特別號陣列回傳同形狀的獎項索引"""
+        return self.lookup[np.minimum(hits, self.pick), special_hits.astype(np.intp)]
+
+    def score_tickets(self, ticket_masks, ticket_specials, draw_masks, draw_specials):
+        """
+        以號碼 bitmask 判定每期每注的獎項
+        Args:
+            ticket_masks: (注數,) uint64 投注號碼 bitmask
+            ticket_specials: (注數,) 第二區號碼，special 不為 'zone' 時不使用
+            draw_masks: (期數,) uint64 開獎號碼 bitmask
+            draw_specials: (期數,) 特別號 / 第二區，彩種沒有特別號時不使用
+        Returns:
+            (期數, 注數) 獎項索引
+        """
+        hits = popcount(draw_masks[:, None] & ticket_masks[None, :])
+        if self.special == 'pool':
+            special_hits = (ticket_masks[None, :] >> np.asarray(draw_specials, dtype=np.uint64)[:, None]) & np.uint64(1)
+        elif self.special == 'zone':
+            special_hits = np.asarray(ticket_specials)[None, :] == np.asarray(draw_specials)[:, None]
+        else:
+            special_hits = np.zeros(hits.shape, dtype=bool)
+        return self.score(hits, special_hits)
+
+    def score_positional(self, tickets, draws):
+        """
+        依位置比對號碼判定每期每注的獎項 (號碼可重複，順序不同不算中獎)
+        Args:
+            tickets: (注數, 號碼數) 投注號碼
+            draws: (期數, 號碼數) 開獎號碼
+        Returns:
+            ((期數, 注數) 獎項索引, (期數, 注數) 中獎位數)
+        """
+        hits = (np.asarray(draws)[:, None, :] == np.asarray(tickets)[None, :, :]).sum(axis=-1)
+        return self.score(hits, np.zeros(hits.shape, dtype=bool)), hits
+
+    def tier_counts(self, counts):
+        """將 np.bincount(獎項索引) 轉為 {獎項: 次數}"""
+        return {name: int(count) for name, count in zip(self.names, counts)}
+
+
+def to_bitmask(numbers):
+    """(組數, 號碼數) 號碼轉為 (組數,) uint64 bitmask，第 n 個位元代表號碼 n"""
+    numbers = np.asarray(numbers, dtype=np.uint64)
+    return np.bitwise_or.reduce(np.uint64(1) << numbers, axis=-1)
+
+
+# 不支援 np.bitwise_count 的 NumPy 版本以位元組查表計算
+_POPCOUNT_TABLE = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
+
+
+def popcount(values):
+    """uint64 陣列每個元素的位元數"""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values)
+    values = np.ascontiguousarray(values, dtype=np.uint64)
+    return _POPCOUNT_TABLE[values.view(np.uint8)].reshape(values.shape + (8, )).sum(axis=-1, dtype=np.uint8)
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+from TaiwanLottery.matrix import DrawMatrix
+from TaiwanLottery.stats import DrawStatistics
+
+# 開獎資料之後的選號策略與回答格式，predict_lottery_numbers_with_ai 的解析依賴其中的格式
+PREDICTION_INSTRUCTIONS = r"""
+
+
+基於數學原理與數據分析，以下為具體選號策略，旨在增加與短期趨勢的吻合度，同時保持隨機性：
+
+均衡分佈：
+- 選擇3:3或2:4的單雙比組合。
+- 選擇和值在120–160之間的號碼組合。
+- 確保首尾差在30–40之間，避免過於集中或分散的號碼。
+
+包含同尾號與連號：
+- 至少包含1–2組同尾號，優先選擇3尾、5尾或7尾（如03, 13或05, 15）。
+- 包含1組2連號（如15, 16或36, 37），優先在1–20或30–49區間。
+
+分區選號：
+- 將1–49分為三區：1–16（低）、17–33（中）、34–49（高）。
+- 選擇2個低區、2個中區、2個高區的號碼，確保分佈均衡。例如：04, 15, 25, 33, 41, 46。
+
+熱門號碼與冷門號碼結合：
+- 選擇2–3個熱門號碼與3–4個其他號碼結合，避免全選熱門號碼。
+- 可考慮冷門號碼作為補充，因其可能在未來「回歸均值」。
+
+大樂透玩法以及號碼選取技巧:
+- 大樂透獎號為6個號碼，範圍是1-49
+- 特別號為1個號碼，範圍是1-49，且不能與獎號重複
+- 請以清楚的格式回答，並簡單說明選號理由
+- 奇偶比分佈: 大樂透玩法中，奇、偶數號碼各5個。建議選擇奇偶比例接近 3:2 或 2:3 的組合，例如 3 個奇數 + 2 個偶數或 2 個奇數 + 3 個偶數，避免選擇 5 個奇數或 5 個偶數的極端組合。
+- 大小比分佈: 大樂透玩法的號碼分為小號碼和大小號碼，各 5 個。建議選擇介於 10~39 的小號碼 2~3 個，大號碼 40~49 2~3 個。避免選擇全部小號碼或全部大號碼的組合。
+- 避開連號和順序號: 建議避免選擇 3 個以上的連號，例如 1、2、3 或 4、5、6 等。此外，順序號，例如 1、11、21 等，中獎機率也不高，建議減少選擇此類組合。
+— 考慮遺漏號碼： 大樂透玩法中，每期開獎號碼皆不相同。追蹤遺漏號碼可以幫助玩家找出較久未開出的號碼。當號碼遺漏超過 5~10 期時，可以考慮將其納入選號組合，增加中獎機會。
+— 熱門號碼與冷門號碼搭配： 熱門號通常是指近期頻繁出現的號碼，冷門號是指較少出現的號碼。建議在選號時，適當地搭配熱門和冷門號碼，既能提高命中率，又能降低與其他彩民重複中獎的機率。
+
+根據大樂透半年的中獎資料，請試著分析並且參照[選號策略]和［大樂透玩法以及號碼選取技巧］推薦出四組彩券號碼(包含特別號):
+
+請務必按照以下格式及pattern回答, 不要添加任何額外說明或文字，僅回覆符合格式的內容:
+# 主要匹配模式：第X組(類型): [數字列表] + 特別號: 數字
+pattern = r'第[X]組\(([^)]+)\):\s*\[([^\]]+)\]\s*\+\s*特別號:\s*(\d+)'
+
+根據以下主題，[冷門號碼組合、熱門號碼組合熱門 + 冷門 混合號碼組合、均衡組合]產生四組號碼組合，並說明選號理由:
+第[X]組([主題]): [號碼1, 號碼2, 號碼3, 號碼4, 號碼5, 號碼6] + 特別號: 號碼
+選號理由: ...
+
+"""
+
+# 頻率向量每列的號碼數
+VECTOR_ROW_SIZE = 10
+
+
+def estimate_tokens(text):
+    """
+    不呼叫模型即可估計的 token 數，只用於比較提示詞大小與控制預算
+    中文與全形字元約每字 1 token，數字每位 1 token，其餘字元約每 4 字元 1 token
+    """
+    wide = digits = 0
+    for char in text:
+        if char.isdigit():
+            digits += 1
+        elif ord(char) > 0x2E7F:
+            wide += 1
+    return wide + digits + -(-(len(text) - wide - digits) // 4)
+
+
+def build_verbose_prompt(lottery_data):
+    """
+    改版前逐期、逐號碼列出的提示詞，作為 PromptBuilder 計算節省 token 數的基準
+    Args:
+        lottery_data: 大樂透中獎資料 (最新一期在前)
+    """
+    # 準備資料摘要給 AI 分析
+    data_summary = "大樂透半年中獎資料分析:\n\n"
+    data_summary += f"總期數: {len(lottery_data)}\n"
+    data_summary += f"日期範圍: {lottery_data[-1]['開獎日期'][:10]} 至 {lottery_data[0]['開獎日期'][:10]}\n\n"
+
+    # 加入所有期數的詳細資料
+    data_summary += f"所有{len(lottery_data)}期中獎號碼:\n"
+    for data in lottery_data:
+        data_summary += f"第{data['期別']}期 ({data['開獎日期'][:10]}): 獎號 {data['獎號']} | 特別號 {data['特別號']}\n"
+
+    statistics = DrawStatistics(DrawMatrix.from_draws(lottery_data, 'lotto649'))
+
+    # 加入完整號碼頻率統計
+    data_summary += "\n完整獎號出現頻率統計 (1-49號碼):\n"
+    for num, freq in statistics.ranked_numbers():
+        data_summary += f"號碼 {num}: {freq} 次\n"
+
+    # 找出從未出現的號碼
+    never_appeared = statistics.never_appeared()
+    if never_appeared:
+        data_summary += f"\n半年內從未出現的獎號: {never_appeared}\n"
+
+    data_summary += "\n完整特別號出現頻率統計:\n"
+    for num, freq in statistics.ranked_specials():
+        data_summary += f"特別號 {num}: {freq} 次\n"
+
+    # 找出從未出現的特別號
+    never_appeared_special = statistics.never_appeared_specials()
+    if never_appeared_special:
+        data_summary += f"\n半年內從未出現的特別號: {never_appeared_special}\n"
+
+    return data_summary + PREDICTION_INSTRUCTIONS
+
+
+class PromptBuilder():
+    """
+    以精簡格式建構大樂透預測提示詞
+    每期開獎只佔一行 (月/日 獎號+特別號)，頻率與遺漏期數以依號碼排列的定寬向量呈現；
+    超過 token_budget 時保留最新的開獎紀錄，較早的各期改以一組頻率向量彙總，
+    全部彙總後仍超過預算時回傳最精簡的版本
+    """
+
+    def __init__(self, token_budget=None):
+        """
+        Args:
+            token_budget: 整份提示詞的 token 上限 (以 estimate_tokens 估計)，None 表示不限制
+        """
+        self.token_budget = token_budget
+
+    def build(self, lottery_data):
+        """
+        Args:
+            lottery_data: 大樂透中獎資料
+        Returns:
+            (提示詞, {'tokens', 'baseline_tokens', 'saved_tokens', 'token_budget', 'detailed_draws', 'aggregated_draws'})
+        """
+        datas = sorted(lottery_data, key=lambda data: data['期別'], reverse=True)
+        statistics = DrawStatistics(DrawMatrix.from_draws(datas, 'lotto649'))
+        header = self._header(datas, statistics)
+        rows = [self._draw_row(data) for data in datas]
+
+        # 定寬向量使彙總段落的長度與彙總期數無關，可先扣除再決定保留幾期
+        detailed = len(rows)
+        if self.token_budget is not None and estimate_tokens(self._render(header, rows, datas, detailed)) > self.token_budget:
+            available = self.token_budget - estimate_tokens(self._render(header, [], datas, 0))
+            detailed = 0
+            for row in rows:
+                available -= estimate_tokens(row) + 1
+                if available < 0:
+                    break
+                detailed += 1
+            while detailed and estimate_tokens(self._render(header, rows, datas, detailed)) > self.token_budget:
+                detailed -= 1
+
+        prompt = self._render(header, rows, datas, detailed)
+        tokens = estimate_tokens(prompt)
+        baseline_tokens = estimate_tokens(build_verbose_prompt(datas))
+        return prompt, {
+            'tokens': tokens,
+            'baseline_tokens': baseline_tokens,
+            'saved_tokens': baseline_tokens - tokens,
+            'token_budget': self.token_budget,
+            'detailed_draws': detailed,
+            'aggregated_draws': len(rows) - detailed,
+        }
+
+    def _render(self, header, rows, datas, detailed):
+        parts = [header, f"近{detailed}期開獎 (月/日 獎號+特別號，新到舊):\n"]
+        parts.extend(row + "\n" for row in rows[:detailed])
+        # 全部以彙總呈現時開頭的整體向量已涵蓋所有期數
+        if 0 < detailed < len(datas):
+            older = datas[detailed:]
+            statistics = DrawStatistics(DrawMatrix.from_draws(older, 'lotto649'))
+            parts.append(f"較早{len(older)}期 ({older[-1]['開獎日期'][:10]} 至 {older[0]['開獎日期'][:10]}) 彙總:\n")
+            parts.append(_vector('獎號次數', statistics.number_axis, statistics.number_frequency))
+            parts.append(_vector('特別號次數', statistics.special_axis, statistics.special_frequency))
+        return ''.join(parts) + PREDICTION_INSTRUCTIONS
+
+    def _header(self, datas, statistics):
+        header = f"大樂透中獎資料: {len(datas)}期，{datas[-1]['開獎日期'][:10]} 至 {datas[0]['開獎日期'][:10]}\n"
+        header += "以下向量每列為 起始號碼-結束號碼: 各號碼的數值\n"
+        header += _vector('獎號次數', statistics.number_axis, statistics.number_frequency)
+        header += _vector('獎號遺漏期數', statistics.number_axis, statistics.miss_streak)
+        header += _vector('特別號次數', statistics.special_axis, statistics.special_frequency)
+        never_appeared = statistics.never_appeared()
+        if never_appeared:
+            header += f"從未出現的獎號: {' '.join(map(str, never_appeared))}\n"
+        never_appeared_special = statistics.never_appeared_specials()
+        if never_appeared_special:
+            header += f"從未出現的特別號: {' '.join(map(str, never_appeared_special))}\n"
+        return header + "\n"
+
+    @staticmethod
+    def _draw_row(data):
+        month_day = data['開獎日期'][5:10].replace('-', '/')
+        return f"{month_day} {' '.join(map(str, sorted(data['獎號'])))}+{data['特別號']}"
+
+
+def _vector(title, axis, values):
+    """依號碼順序列出數值，每列 VECTOR_ROW_SIZE 個號碼，數值補齊為相同寬度"""
+    width = len(str(int(values.max()))) if len(values) else 1
+    lines = [title + ":\n"]
+    for start in range(0, len(axis), VECTOR_ROW_SIZE):
+        row_axis = axis[start:start + VECTOR_ROW_SIZE]
+        row_values = ' '.join(str(int(value)).rjust(width) for value in values[start:start + VECTOR_ROW_SIZE])
+        lines.append(f"{int(row_axis[0])}-{int(row_axis[-1])}: {row_values}\n")
+    return ''.join(lines)
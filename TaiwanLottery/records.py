@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+import datetime
+from collections.abc import Mapping
+
+from TaiwanLottery import TaiwanLotteryCrawler
+
+# 各彩種 dict 格式的鍵，順序與爬蟲回傳的 dict 相同
+FIELDS = {
+    game: ('期別', '開獎日期') + (api['split'] if api['split'] else ('獎號',))
+    for game, api in TaiwanLotteryCrawler.GAME_API.items()
+}
+DATE_SUFFIX = 'T00:00:00'
+
+
+class Draw(Mapping):
+    """
+    精簡的單期開獎資料，以 __slots__ 儲存，號碼壓縮為 bytes (每個號碼 1 byte，保留開出順序與重複的位數)，
+    開獎日期存為日期序數，記憶體約為 dict 格式的三分之一
+    同時是唯讀的 Mapping，可用 draw['期別']、draw['獎號'] 等與 dict 相同的鍵讀取，也可以直接與 dict 比較
+        period: 期別
+        special: 特別號 / 第二區，彩種沒有特別號時為 None
+    """
+
+    __slots__ = ('game', 'period', 'special', '_date', '_numbers')
+
+    def __init__(self, game, period, date, numbers, special=None):
+        self.game = game
+        self.period = period
+        self.special = special
+        self._date = _pack_date(date)
+        self._numbers = bytes(numbers)
+
+    @classmethod
+    def from_dict(cls, data, game):
+        """由爬蟲回傳的 dict 建立"""
+        fields = FIELDS[game]
+        return cls(game, data['期別'], data['開獎日期'], data[fields[2]], data[fields[3]] if len(fields) > 3 else None)
+
+    @classmethod
+    def from_dicts(cls, datas, game):
+        return [cls.from_dict(data, game) for data in datas]
+
+    @property
+    def date(self):
+        """與爬蟲相同格式的開獎日期字串，例如 '2023-06-30T00:00:00'"""
+        if isinstance(self._date, int):
+            return datetime.date.fromordinal(self._date).isoformat() + DATE_SUFFIX
+        return self._date
+
+    @property
+    def numbers(self):
+        return list(self._numbers)
+
+    @property
+    def mask(self):
+        """開出號碼的位元遮罩 (第 n 位代表號碼 n)，可用 bin(a.mask & b.mask).count('1') 計算相同號碼數"""
+        mask = 0
+        for number in self._numbers:
+            mask |= 1 << number
+        return mask
+
+    def to_dict(self):
+        """轉回與爬蟲相同格式的 dict"""
+        return dict(self.items())
+
+    def __getitem__(self, key):
+        fields = FIELDS[self.game]
+        if key == '期別':
+            return self.period
+        if key == '開獎日期':
+            return self.date
+        if key == fields[2]:
+            return self.numbers
+        if len(fields) > 3 and key == fields[3]:
+            return self.special
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(FIELDS[self.game])
+
+    def __len__(self):
+        return len(FIELDS[self.game])
+
+    def __repr__(self):
+        return 'Draw({!r}, {})'.format(self.game, self.to_dict())
+
+    def __reduce__(self):
+        return (self.__class__, (self.game, self.period, self.date, self._numbers, self.special))
+
+
+# 只有日期 (時間為 00:00:00) 的開獎日期存為日期序數，其他格式原樣保留
+def _pack_date(date):
+    if isinstance(date, int):
+        return date
+    if len(date) == 10 or date[10:] == DATE_SUFFIX:
+        try:
+            return datetime.date.fromisoformat(date[:10]).toordinal()
+        except ValueError:
+            pass
+    return date
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+import argparse
+import json
+import math
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from TaiwanLottery import TaiwanLotteryCrawler
+from TaiwanLottery.prizes import PRIZE_TABLES, PrizeTable, popcount, to_bitmask
+
+# 每個 worker 行程的模擬狀態，由 _init_worker 設定一次
+_worker_state = {}
+
+
+class MonteCarloSimulator():
+    """
+    以 NumPy 亂數產生大量模擬開獎結果，計算一組投注 (portfolio) 每期的獎金期望值與變異數
+    模擬依 chunk_size 分批進行，記憶體用量只與 chunk_size 與注數有關；
+    每批使用由 seed 衍生的獨立亂數序列，結果與 worker 數量無關
+    """
+
+    def __init__(self, game, tickets, specials=None, estimates=None):
+        """
+        Args:
+            game: 有獎項規則的彩種 (PRIZE_TABLES)，例如 'lotto649'、'super_lotto'、'daily_cash'
+            tickets: (注數, 號碼數) 投注號碼
+            specials: (注數,) 第二區號碼，僅威力彩需要
+            estimates: 浮動獎金估計值，參考 PrizeTable.for_game
+        """
+        if game not in PRIZE_TABLES:
+            raise ValueError('沒有獎項規則的彩種: ' + game)
+        api = TaiwanLotteryCrawler.GAME_API[game]
+        self.game = game
+        self.table = PrizeTable.for_game(game, estimates=estimates)
+        self.tickets = np.atleast_2d(np.asarray(tickets, dtype=np.int64))
+        if self.tickets.ndim != 2 or self.tickets.shape[1] != self.table.pick:
+            raise ValueError('每注需為 {} 個號碼'.format(self.table.pick))
+        if not len(self.tickets):
+            raise ValueError('至少需要一注號碼')
+        self.number_range = api['number_range']
+        self.special_range = api['special_range']
+        if self.tickets.min() < self.number_range[0] or self.tickets.max() > self.number_range[1]:
+            raise ValueError('號碼需介於 {} 到 {}'.format(*self.number_range))
+        if self.table.special == 'zone':
+            if specials is None:
+                raise ValueError('威力彩需要提供第二區號碼')
+            self.specials = np.asarray(specials, dtype=np.int64)
+            if self.specials.shape != (len(self.tickets), ):
+                raise ValueError('第二區號碼數需與注數相同')
+            if self.specials.min() < self.special_range[0] or self.specials.max() > self.special_range[1]:
+                raise ValueError('第二區號碼需介於 {} 到 {}'.format(*self.special_range))
+        else:
+            self.specials = np.zeros(len(self.tickets), dtype=np.int64)
+        self.ticket_masks = to_bitmask(self.tickets)
+        if (popcount(self.ticket_masks) != self.table.pick).any():
+            raise ValueError('每注號碼不可重複')
+
+    @classmethod
+    def from_recommended_sets(cls, game, recommended_sets, estimates=None):
+        """由 predict_lotto649 / recommend 回傳的 recommended_sets 建立"""
+        tickets = [recommended_set['regular_numbers'] for recommended_set in recommended_sets]
+        specials = [recommended_set['special_number'] for recommended_set in recommended_sets]
+        return cls(game, tickets, specials if PRIZE_TABLES[game]['special'] == 'zone' else None, estimates)
+
+    def run(self, draws, seed=None, chunk_size=250000, max_workers=1):
+        """
+        Args:
+            draws: 模擬期數
+            seed: 亂數種子
+            chunk_size: 每批模擬期數
+            max_workers: 行程數，1 表示在目前行程中執行
+        Returns:
+            每期整組投注的成本、獎金期望值、變異數與各獎項機率
+        """
+        children = np.random.SeedSequence(seed).spawn(math.ceil(draws / chunk_size))
+        sizes = [min(chunk_size, draws - i * chunk_size) for i in range(len(children))]
+        state = {
+            'table': self.table,
+            'ticket_masks': self.ticket_masks,
+            'specials': self.specials,
+            'number_range': self.number_range,
+            'special_range': self.special_range,
+        }
+        if max_workers == 1:
+            _init_worker(state)
+            results = [_simulate_chunk(child, size) for child, size in zip(children, sizes)]
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(state, )) as executor:
+                results = list(executor.map(_simulate_chunk, children, sizes))
+
+        tier_counts = sum(result[0] for result in results)
+        ticket_payouts = sum(result[1] for result in results)
+        payout_sum = sum(result[2] for result in results)
+        payout_square_sum = sum(result[3] for result in results)
+        winning_draws = sum(result[4] for result in results)
+        return self._summary(draws, tier_counts, ticket_payouts, payout_sum, payout_square_sum, winning_draws)
+
+    def _summary(self, draws, tier_counts, ticket_payouts, payout_sum, payout_square_sum, winning_draws):
+        cost = len(self.tickets) * self.table.ticket_price
+        expected_payout = payout_sum / draws
+        variance = max(payout_square_sum / draws - expected_payout ** 2, 0.0) * draws / max(draws - 1, 1)
+        return {
+            'game': self.game,
+            'draws': draws,
+            'tickets': len(self.tickets),
+            'cost': cost,
+            'expected_payout': expected_payout,
+            'expected_value': expected_payout - cost,
+            'variance': variance,
+            'std': math.sqrt(variance),
+            'standard_error': math.sqrt(variance / draws),
+            'return_rate': expected_payout / cost if cost else None,
+            'prize_probability': winning_draws / draws,
+            'tier_counts': self.table.tier_counts(tier_counts),
+            'tier_probabilities': {name: count / (draws * len(self.tickets)) for name, count in self.table.tier_counts(tier_counts).items()},
+            'ticket_expected_payouts': (ticket_payouts / draws).tolist(),
+        }
+
+
+def sample_draws(rng, size, pick, number_range, special=None, special_range=None):
+    """
+    以拒絕取樣產生 size 期不重複號碼的開獎結果
+    Returns:
+        ((size,) uint64 獎號 bitmask, (size,) 特別號 / 第二區，沒有特別號時全為 0)
+    """
+    count = pick + 1 if special == 'pool' else pick
+    numbers = rng.integers(number_range[0], number_range[1] + 1, size=(size, count), dtype=np.uint8)
+    # 含重複號碼的列重新抽取，大樂透 7 個號碼約 64% 第一次即不重複
+    while True:
+        repeated = np.flatnonzero(popcount(to_bitmask(numbers)) != count)
+        if not len(repeated):
+            break
+        numbers[repeated] = rng.integers(number_range[0], number_range[1] + 1, size=(len(repeated), count), dtype=np.uint8)
+
+    masks = to_bitmask(numbers[:, :pick])
+    if special == 'pool':
+        specials = numbers[:, pick]
+    elif special == 'zone':
+        specials = rng.integers(special_range[0], special_range[1] + 1, size=size, dtype=np.uint8)
+    else:
+        specials = np.zeros(size, dtype=np.uint8)
+    return masks, specials
+
+
+def _init_worker(state):
+    _worker_state.clear()
+    _worker_state.update(state)
+
+
+def _simulate_chunk(seed_sequence, size):
+    """回傳 (各獎項注數, 各注獎金總和, 整組獎金總和, 整組獎金平方和, 有中獎的期數)"""
+    table = _worker_state['table']
+    rng = np.random.default_rng(seed_sequence)
+    masks, specials = sample_draws(rng, size, table.pick, _worker_state['number_range'], table.special, _worker_state['special_range'])
+    tiers = table.score_tickets(_worker_state['ticket_masks'], _worker_state['specials'], masks, specials)
+    payouts = table.amounts[tiers]
+    portfolio = payouts.sum(axis=1)
+    return (np.bincount(tiers.ravel(), minlength=table.no_prize + 1)[:table.no_prize], payouts.sum(axis=0),
+            float(portfolio.sum()), float(np.square(portfolio).sum()), int(np.count_nonzero((tiers != table.no_prize).any(axis=1))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='以蒙地卡羅模擬計算投注組合的獎金期望值與變異數')
+    parser.add_argument('game', choices=list(PRIZE_TABLES))
+    parser.add_argument('tickets', nargs='+', help='每注號碼以逗號分隔，威力彩第二區以 + 連接，例如 1,2,3,4,5,6+7')
+    parser.add_argument('--draws', type=int, default=10000000)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=250000)
+    parser.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args()
+
+    tickets = []
+    specials = []
+    for ticket in args.tickets:
+        numbers, _, special = ticket.partition('+')
+        tickets.append([int(x) for x in numbers.split(',')])
+        specials.append(int(special) if special else None)
+    simulator = MonteCarloSimulator(args.game, tickets, specials if PRIZE_TABLES[args.game]['special'] == 'zone' else None)
+    result = simulator.run(args.draws, args.seed, args.chunk_size, args.workers)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+from collections import deque
+
+import numpy as np
+
+from TaiwanLottery import TaiwanLotteryCrawler, utils
+
+# 各彩種預設的分區上界 (含)，未列出的彩種將號碼範圍平均分為三區
+ZONE_BOUNDS = {
+    'lotto649': (16, 33),
+    'lotto49m6': (16, 33),
+}
+
+
+class DrawStatistics():
+    """
+    一次向量化計算開獎歷史的各項統計，所有陣列皆以 DrawMatrix.number_axis 的號碼為索引
+        matrix: 統計範圍內的 DrawMatrix (最新一期在前)
+        number_frequency: 各號碼出現次數
+        special_frequency: 各特別號出現次數，彩種沒有特別號時為 None
+        miss_streak: 各號碼的遺漏期數 (最近一期開出為 0，從未開出為總期數)
+        special_miss_streak: 各特別號的遺漏期數
+    以下為每期 (最新一期在前) 的特徵:
+        odd_counts: 奇數個數
+        high_counts: 大號個數 (號碼 >= high_threshold)
+        sums: 和值
+        spans: 首尾差
+        zone_counts: (期數, 3) 低、中、高區個數
+        same_tail_groups: 同尾號組數
+        consecutive_pairs: 連號組數
+        longest_runs: 最長連號長度
+    """
+
+    def __init__(self, matrix, window=None, zone_bounds=None):
+        """
+        Args:
+            matrix: DrawMatrix
+            window: 只統計最近 window 期，None 表示全部
+            zone_bounds: 低區與中區的上界 (含)，例如 (16, 33)
+        """
+        matrix = matrix.sort()
+        if window is not None:
+            matrix = matrix.head(window)
+        self.game = matrix.game
+        self.matrix = matrix
+        self.periods = matrix.periods
+        self.number_axis = matrix.number_axis
+        self.draws = len(matrix)
+        self.high_threshold = matrix.max_number // 2 + 1
+        self.zone_bounds = zone_bounds or ZONE_BOUNDS.get(matrix.game) or _split_zones(matrix.min_number, matrix.max_number)
+
+        incidence = matrix.incidence
+        self.number_frequency = incidence.sum(axis=0, dtype=np.int64)
+        self.miss_streak = _miss_streak(incidence)
+
+        special_incidence = matrix.special_incidence
+        if special_incidence is None:
+            self.special_axis = self.special_frequency = self.special_miss_streak = None
+        else:
+            self.special_axis = matrix.special_axis
+            self.special_frequency = special_incidence.sum(axis=0, dtype=np.int64)
+            self.special_miss_streak = _miss_streak(special_incidence)
+
+        numbers = matrix.numbers if matrix.numbers.shape[1] else np.zeros((self.draws, 1), dtype=np.uint8)
+        features = combination_features(np.sort(numbers, axis=1), self.zone_bounds, self.high_threshold)
+        self.odd_counts = features['odd_counts']
+        self.high_counts = features['high_counts']
+        self.sums = features['sums']
+        self.spans = features['spans']
+        self.zone_counts = features['zone_counts']
+        self.same_tail_groups = features['same_tail_groups']
+        self.consecutive_pairs = features['consecutive_pairs']
+        self.longest_runs = features['longest_runs']
+
+    def ranked_numbers(self):
+        """已開出的號碼依出現次數降序排列 (次數相同時號碼小的在前)，回傳 [(號碼, 次數), ...]"""
+        return _ranked(self.number_axis, self.number_frequency)
+
+    def ranked_specials(self):
+        if self.special_frequency is None:
+            return []
+        return _ranked(self.special_axis, self.special_frequency)
+
+    def hot_numbers(self, n=10):
+        return self.ranked_numbers()[:n]
+
+    def cold_numbers(self, n=10):
+        return self.ranked_numbers()[-n:]
+
+    def never_appeared(self):
+        return self.number_axis[self.number_frequency == 0].tolist()
+
+    def never_appeared_specials(self):
+        if self.special_frequency is None:
+            return []
+        return self.special_axis[self.special_frequency == 0].tolist()
+
+    def distribution(self, values):
+        """每期特徵的分佈，回傳 {數值: 期數}"""
+        counts = np.bincount(values) if len(values) else np.zeros(0, dtype=np.int64)
+        return {int(value): int(count) for value, count in enumerate(counts) if count}
+
+    def to_dict(self):
+        """轉為可直接 JSON 序列化的統計摘要"""
+        return {
+            'draws': self.draws,
+            'number_frequency': dict(self.ranked_numbers()),
+            'special_frequency': dict(self.ranked_specials()) if self.special_frequency is not None else None,
+            'miss_streak': dict(zip(self.number_axis.tolist(), self.miss_streak.tolist())),
+            'never_appeared': self.never_appeared(),
+            'odd_count_distribution': self.distribution(self.odd_counts),
+            'high_count_distribution': self.distribution(self.high_counts),
+            'sum_range': [int(self.sums.min()), int(self.sums.max())] if self.draws else None,
+            'span_distribution': self.distribution(self.spans),
+            'zone_bounds': list(self.zone_bounds),
+            'zone_totals': self.zone_counts.sum(axis=0).tolist(),
+            'same_tail_distribution': self.distribution(self.same_tail_groups),
+            'consecutive_distribution': self.distribution(self.consecutive_pairs),
+        }
+
+
+def analyze_windows(matrix, windows=(10, 30, 100, None), zone_bounds=None):
+    """以多個期數視窗計算統計，回傳 {視窗: DrawStatistics}，None 表示全部期數"""
+    return {window: DrawStatistics(matrix, window, zone_bounds) for window in windows}
+
+
+def combination_features(numbers, zone_bounds, high_threshold):
+    """
+    計算每組號碼的選號特徵
+    Args:
+        numbers: (組數, 號碼數) 已由小到大排序的號碼
+        zone_bounds: 低區與中區的上界 (含)
+        high_threshold: 大號的下界 (含)
+    Returns:
+        {'odd_counts', 'high_counts', 'sums', 'spans', 'zone_counts', 'same_tail_groups', 'consecutive_pairs', 'longest_runs'}
+    """
+    numbers = numbers.astype(np.int16)
+    zones = np.searchsorted(np.asarray(zone_bounds), numbers, side='left')
+    tail_counts = _row_bincount(numbers % 10, 10)
+    is_consecutive = np.diff(numbers, axis=1) == 1
+    longest_runs = current_runs = np.ones(len(numbers), dtype=np.int16)
+    for column in range(is_consecutive.shape[1]):
+        current_runs = np.where(is_consecutive[:, column], current_runs + 1, 1)
+        longest_runs = np.maximum(longest_runs, current_runs)
+    return {
+        'odd_counts': (numbers % 2 == 1).sum(axis=1),
+        'high_counts': (numbers >= high_threshold).sum(axis=1),
+        'sums': numbers.sum(axis=1, dtype=np.int32),
+        'spans': numbers[:, -1] - numbers[:, 0],
+        'zone_counts': np.stack([(zones == zone).sum(axis=1) for zone in range(len(zone_bounds) + 1)], axis=1),
+        'same_tail_groups': (tail_counts >= 2).sum(axis=1),
+        'consecutive_pairs': is_consecutive.sum(axis=1),
+        'longest_runs': longest_runs,
+    }
+
+
+def _miss_streak(incidence):
+    # incidence 最新一期在前，第一個出現的列索引即為遺漏期數
+    appeared = incidence > 0
+    return np.where(appeared.any(axis=0), appeared.argmax(axis=0), incidence.shape[0])
+
+
+def _row_bincount(values, width):
+    rows = values.shape[0]
+    flat_index = np.arange(rows)[:, None] * width + values
+    return np.bincount(flat_index.ravel(), minlength=rows * width).reshape(rows, width)
+
+
+def _ranked(axis, frequency):
+    order = np.argsort(-frequency, kind='stable')
+    order = order[frequency[order] > 0]
+    return list(zip(axis[order].tolist(), frequency[order].tolist()))
+
+
+def _split_zones(min_number, max_number):
+    size = max_number - min_number + 1
+    return (min_number + size // 3 - 1, min_number + 2 * size // 3 - 1)
+
+
+class RollingStatistics():
+    """
+    滑動視窗統計，每新增一期只以 O(號碼數) 更新出現次數、最後出現位置與遺漏期數，
+    並移除超出視窗 (最近 window 期或最近 months 個月) 的舊資料，不需重新掃描整段歷史
+    """
+
+    def __init__(self, game, window=None, months=None):
+        """
+        Args:
+            game: 彩種方法名稱，例如 'lotto649'
+            window: 保留最近 window 期，None 表示不限期數
+            months: 保留最新一期所在月份起算最近 months 個月 (含)，None 表示不限月份
+        """
+        api = TaiwanLotteryCrawler.GAME_API[game]
+        self.game = game
+        self.window = window
+        self.months = months
+        self.min_number, max_number = api['number_range']
+        self.number_key, self.special_key = api['split'] if api['split'] else ('獎號', None)
+        self.special_min = api['special_range'][0] if api['special_range'] else 0
+        special_width = api['special_range'][1] - self.special_min + 1 if api['special_range'] else 0
+        self.number_counts = np.zeros(max_number - self.min_number + 1, dtype=np.int64)
+        self.number_last_seen = np.full(len(self.number_counts), -1, dtype=np.int64)
+        self.special_counts = np.zeros(special_width, dtype=np.int64)
+        self.special_last_seen = np.full(special_width, -1, dtype=np.int64)
+        # 視窗內的開獎資料 (舊到新)，seq 為累計新增的序號
+        self.draws = deque()
+        self.seq = -1
+
+    @property
+    def latest_period(self):
+        return self.draws[-1]['期別'] if self.draws else None
+
+    def append(self, data):
+        """新增一期開獎資料，期別不大於目前最新一期時略過並回傳 False"""
+        if self.draws and data['期別'] <= self.latest_period:
+            return False
+        self.seq += 1
+        numbers = self._number_index(data[self.number_key])
+        np.add.at(self.number_counts, numbers, 1)
+        self.number_last_seen[numbers] = self.seq
+        if self.special_key:
+            special = data[self.special_key] - self.special_min
+            self.special_counts[special] += 1
+            self.special_last_seen[special] = self.seq
+        self.draws.append(dict(data, seq=self.seq))
+        self._expire()
+        return True
+
+    def extend(self, datas):
+        """新增多期開獎資料 (任意順序)，回傳實際新增的期數"""
+        return sum(self.append(data) for data in sorted(datas, key=lambda x: x['期別']))
+
+    @property
+    def number_axis(self):
+        return np.arange(self.min_number, self.min_number + len(self.number_counts))
+
+    @property
+    def special_axis(self):
+        return np.arange(self.special_min, self.special_min + len(self.special_counts))
+
+    def ranked_numbers(self):
+        """與 DrawStatistics.ranked_numbers 相同的排序，回傳 [(號碼, 次數), ...]"""
+        return _ranked(self.number_axis, self.number_counts)
+
+    def ranked_specials(self):
+        return _ranked(self.special_axis, self.special_counts)
+
+    def hot_numbers(self, n=10):
+        return self.ranked_numbers()[:n]
+
+    def cold_numbers(self, n=10):
+        return self.ranked_numbers()[-n:]
+
+    @property
+    def miss_streak(self):
+        return self._miss_streak(self.number_last_seen)
+
+    @property
+    def special_miss_streak(self):
+        return self._miss_streak(self.special_last_seen)
+
+    def to_dict(self):
+        """可 JSON 序列化的完整狀態"""
+        return {
+            'game': self.game,
+            'window': self.window,
+            'months': self.months,
+            'seq': self.seq,
+            'number_counts': self.number_counts.tolist(),
+            'number_last_seen': self.number_last_seen.tolist(),
+            'special_counts': self.special_counts.tolist(),
+            'special_last_seen': self.special_last_seen.tolist(),
+            'draws': list(self.draws),
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        rolling = cls(state['game'], state['window'], state['months'])
+        rolling.seq = state['seq']
+        rolling.number_counts = np.asarray(state['number_counts'], dtype=np.int64)
+        rolling.number_last_seen = np.asarray(state['number_last_seen'], dtype=np.int64)
+        rolling.special_counts = np.asarray(state['special_counts'], dtype=np.int64)
+        rolling.special_last_seen = np.asarray(state['special_last_seen'], dtype=np.int64)
+        rolling.draws = deque(state['draws'])
+        return rolling
+
+    def save(self, path):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+    def _number_index(self, numbers):
+        return np.asarray(numbers, dtype=np.intp) - self.min_number
+
+    def _expire(self):
+        while self.draws and self._is_expired(self.draws[0]):
+            data = self.draws.popleft()
+            # 最後出現位置保留不變，遺漏期數計算時會與視窗起點比較
+            np.subtract.at(self.number_counts, self._number_index(data[self.number_key]), 1)
+            if self.special_key:
+                self.special_counts[data[self.special_key] - self.special_min] -= 1
+
+    def _is_expired(self, data):
+        if self.window is not None and len(self.draws) > self.window:
+            return True
+        if self.months is not None:
+            oldest_month = utils.add_months(self.draws[-1]['開獎日期'][:7], -(self.months - 1))
+            return data['開獎日期'][:7] < oldest_month
+        return False
+
+    def _miss_streak(self, last_seen):
+        if not self.draws:
+            return np.zeros(len(last_seen), dtype=np.int64)
+        oldest_seq = self.draws[0]['seq']
+        return np.where(last_seen >= oldest_seq, self.seq - last_seen, len(self.draws))
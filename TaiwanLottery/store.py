@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+import json
+import sqlite3
+import threading
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS draws (
+    game TEXT NOT NULL,
+    period INTEGER NOT NULL,
+    lottery_date TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (game, period)
+);
+CREATE INDEX IF NOT EXISTS draws_game_date ON draws (game, lottery_date);
+CREATE TABLE IF NOT EXISTS closed_months (
+    game TEXT NOT NULL,
+    month TEXT NOT NULL,
+    PRIMARY KEY (game, month)
+);
+'''
+
+
+class DrawStore():
+    """
+    以 SQLite 儲存各彩種開獎資料，主鍵為 (彩種, 期別)
+    已結束的月份會記錄在 closed_months，之後讀取該月份時不需再向 API 查詢
+    """
+
+    def __init__(self, path='taiwan_lottery.db'):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.executescript(SCHEMA)
+
+    def save(self, game, month, datas, closed=False):
+        """寫入某彩種某月份的開獎資料，closed 為 True 表示該月份資料已完整"""
+        rows = [(game, data['期別'], data['開獎日期'], json.dumps(data, ensure_ascii=False)) for data in datas]
+        with self._lock, self._conn:
+            self._conn.executemany('INSERT OR REPLACE INTO draws VALUES (?, ?, ?, ?)', rows)
+            if closed:
+                self._conn.execute('INSERT OR IGNORE INTO closed_months VALUES (?, ?)', (game, month))
+
+    def is_closed(self, game, month):
+        with self._lock:
+            row = self._conn.execute('SELECT 1 FROM closed_months WHERE game = ? AND month = ?', (game, month)).fetchone()
+        return row is not None
+
+    def load_month(self, game, month):
+        """讀取已完整儲存的月份資料，尚未儲存完整時回傳 None"""
+        if not self.is_closed(game, month):
+            return None
+        return self.draws(game, month, month)
+
+    def draws(self, game, start_month=None, end_month=None):
+        """依期別降序回傳起訖月份 (YYYY-MM，含) 內的開獎資料"""
+        sql = 'SELECT data FROM draws WHERE game = ?'
+        params = [game]
+        if start_month:
+            sql += ' AND lottery_date >= ?'
+            params.append(start_month)
+        if end_month:
+            # 'YYYY-MM~' 大於該月份所有 'YYYY-MM-DD...' 日期字串
+            sql += ' AND lottery_date < ?'
+            params.append(end_month + '~')
+        sql += ' ORDER BY period DESC'
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def latest(self, game):
+        """回傳資料庫中最新一期的 (期別, 開獎日期)，無資料時回傳 None"""
+        with self._lock:
+            row = self._conn.execute('SELECT period, lottery_date FROM draws WHERE game = ? ORDER BY period DESC LIMIT 1', (game, )).fetchone()
+        return row
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from TaiwanLottery import TaiwanLotteryCrawler
+
+API_PREFIX = '/TLCAPIWeB/Lottery/'
+
+
+def fixture_name(path, year, month):
+    """錄製檔的檔名，例如 Lotto649Result_2023-06.json"""
+    return '{}_{:04d}-{:02d}.json'.format(path, int(year), int(month))
+
+
+def record_fixture(fixture_dir, game, back_time, crawler=None):
+    """
+    向上游 API 擷取一個月份的原始回應並存成錄製檔，回傳檔案路徑
+    Args:
+        fixture_dir: 錄製檔目錄
+        game: 彩種方法名稱，例如 'lotto649'
+        back_time: [年, 月]
+        crawler: TaiwanLotteryCrawler，預設建立新的 (不使用 store 與 cache)
+    """
+    crawler = crawler or TaiwanLotteryCrawler()
+    result = crawler.get_lottery_result(crawler._build_url(game, back_time))
+    os.makedirs(fixture_dir, exist_ok=True)
+    path = os.path.join(fixture_dir, fixture_name(crawler.GAME_API[game]['path'], *back_time))
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+        f.write('\n')
+    return path
+
+
+class UpstreamStub():
+    """
+    在本機執行緒中啟動的 HTTP 伺服器，依 TaiwanLotteryCrawler.GAME_API 的九個端點回放錄製的 *Result JSON，
+    取代台灣彩券 API 供測試與效能量測使用
+    沒有錄製檔的月份回傳與上游相同格式的空結果，未知的路徑回傳 404
+        latency: 每個請求回應前等待的秒數
+        error_rate: 以 error_status 回應的機率 (0 到 1)，用來測試重試與錯誤處理
+    """
+
+    def __init__(self, fixture_dir, latency=0.0, error_rate=0.0, error_status=503, seed=None, host='127.0.0.1', port=0):
+        """
+        Args:
+            fixture_dir: 錄製檔目錄，檔名格式見 fixture_name
+            latency: 模擬的回應延遲秒數
+            error_rate: 注入錯誤的機率
+            error_status: 注入錯誤時回應的 HTTP 狀態碼
+            seed: 錯誤注入的亂數種子
+            host, port: 監聽位址，port 為 0 表示自動選擇
+        """
+        self.fixture_dir = fixture_dir
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.requests = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._fixtures = {}
+        self._result_keys = {api['path']: api['result_key'] for api in TaiwanLotteryCrawler.GAME_API.values()}
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return 'http://{}:{}{}'.format(host, port, API_PREFIX.rstrip('/'))
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def stats(self):
+        return {'requests': self.requests, 'errors': self.errors}
+
+    def respond(self, url):
+        """回傳 (狀態碼, 回應內容)，url 為請求的路徑與查詢字串"""
+        with self._lock:
+            self.requests += 1
+            inject = self.error_rate > 0 and self._random.random() < self.error_rate
+            if inject:
+                self.errors += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if inject:
+            return self.error_status, {'rtCode': -1, 'rtMsg': 'injected error'}
+
+        parts = urlsplit(url)
+        path = parts.path[len(API_PREFIX):] if parts.path.startswith(API_PREFIX) else None
+        match = re.fullmatch(r'(\d{4})-(\d{1,2})', parse_qs(parts.query).get('month', [''])[0])
+        if path not in self._result_keys or not match:
+            return 404, {'rtCode': -1, 'rtMsg': 'not found'}
+        return 200, self._load(path, *match.groups())
+
+    def _load(self, path, year, month):
+        name = fixture_name(path, year, month)
+        if name not in self._fixtures:
+            try:
+                with open(os.path.join(self.fixture_dir, name), encoding='utf-8') as f:
+                    self._fixtures[name] = f.read().encode('utf-8')
+            except FileNotFoundError:
+                empty = {'rtCode': 0, 'rtMsg': '', 'content': {'totalSize': 0, self._result_keys[path]: []}}
+                self._fixtures[name] = json.dumps(empty).encode('utf-8')
+        return self._fixtures[name]
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                status, body = stub.respond(self.path)
+                if not isinstance(body, bytes):
+                    body = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
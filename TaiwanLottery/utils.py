@@ -39,6 +39,37 @@ def month_diff(back_month):
     return [calc_year, calc_month]
 
 
+# 將 [年, 月] 轉為 YYYY-MM 格式
+def format_month(back_time):
+    return '{:04d}-{:02d}'.format(int(back_time[0]), int(back_time[1]))
+
+
+# 判斷 YYYY-MM 是否為已結束的月份
+def is_past_month(month):
+    return month < format_month([get_current_year(), get_current_month()])
+
+
+# YYYY-MM 加減月數
+def add_months(month, delta):
+    year, month = [int(x) for x in month.split('-')]
+    total = year * 12 + (month - 1) + delta
+    return '{:04d}-{:02d}'.format(total // 12, total % 12 + 1)
+
+
+# 產生起訖月份 (含) 之間的 [年, 月] 清單，依日曆逐月遞增
+def month_range(start_month, end_month):
+    year, month = [int(x) for x in start_month.split('-')]
+    end_year, end_month = [int(x) for x in end_month.split('-')]
+    months = []
+    while (year, month) <= (end_year, end_month):
+        months.append([str(year), str(month).zfill(2)])
+        month += 1
+        if month > 12:
+            month = 1
+            year += 1
+    return months
+
+
 # 輸出成 JSON 檔案
 def output_to_json(filename, data):
     try:
@@ -50,6 +81,18 @@ def output_to_json(filename, data):
         logging.error(filename + "存取發生未知的錯誤")
 
 
+# 輸出成欄式的壓縮 .npz 檔案 (見 TaiwanLottery.archive)，大量歷史資料的讀取比 JSON 快且檔案較小
+def output_to_npz(filename, data, game):
+    from TaiwanLottery.archive import save_npz
+    from TaiwanLottery.matrix import DrawMatrix
+    try:
+        save_npz(filename + '.npz', DrawMatrix.from_draws(data, game))
+    except PermissionError:
+        logging.error(filename + "存取權限異常")
+    except Exception:
+        logging.error(filename + "存取發生未知的錯誤")
+
+
 # 使用 Table 樣式顯示
 def print_to_table(title, datas):
     table_datas = []
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+
+
+class QueueFull(Exception):
+    """等待中的工作已達上限"""
+
+
+class JobQueue():
+    """
+    以固定數量的 worker 依序執行耗時工作 (例如 AI 預測)，HTTP 請求只負責建立工作並立即回傳工作 id
+    等待中的工作超過 max_queue 時 submit 直接拋出 QueueFull，讓呼叫端快速回應 429 而不是堆積請求；
+    完成的工作保留最近 max_finished 筆供查詢結果
+    """
+
+    def __init__(self, run, max_workers=2, max_queue=16, max_finished=256):
+        """
+        Args:
+            run: coroutine function run(**params)，回傳工作結果，拋出例外時工作狀態為 failed
+            max_workers: 同時執行的工作數
+            max_queue: 最多等待中的工作數
+            max_finished: 保留的已完成工作數
+        """
+        self.run = run
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.max_finished = max_finished
+        self.jobs = OrderedDict()
+        self.rejected = 0
+        self._queue = None
+        self._workers = []
+
+    def start(self):
+        if not self._workers:
+            self._queue = asyncio.Queue(self.max_queue)
+            self._workers = [asyncio.ensure_future(self._worker()) for _ in range(self.max_workers)]
+
+    async def stop(self):
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        for job in self.jobs.values():
+            if job['status'] == 'queued':
+                job['status'] = 'failed'
+                job['error'] = '服務關閉，工作已取消'
+
+    def submit(self, **params):
+        """建立工作並回傳工作資訊，佇列已滿時拋出 QueueFull"""
+        self.start()
+        job = {
+            'id': uuid.uuid4().hex,
+            'status': 'queued',
+            'params': params,
+            'created_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            'result': None,
+            'error': None,
+        }
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise QueueFull('預測工作已達上限 ({})，請稍後再試'.format(self.max_queue))
+        self.jobs[job['id']] = job
+        self._trim()
+        return job
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def position(self, job_id):
+        """等待中的工作前面還有幾個工作，不在等待中時回傳 None"""
+        queued = [job['id'] for job in self.jobs.values() if job['status'] == 'queued']
+        return queued.index(job_id) if job_id in queued else None
+
+    def stats(self):
+        counts = {'queued': 0, 'running': 0, 'succeeded': 0, 'failed': 0}
+        for job in self.jobs.values():
+            counts[job['status']] += 1
+        return dict(counts, workers=self.max_workers, max_queue=self.max_queue, rejected=self.rejected)
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            job['status'] = 'running'
+            job['started_at'] = time.time()
+            try:
+                job['result'] = await self.run(**job['params'])
+                job['status'] = 'succeeded'
+            except asyncio.CancelledError:
+                job['status'] = 'failed'
+                job['error'] = '服務關閉，工作已取消'
+                raise
+            except Exception as e:
+                job['status'] = 'failed'
+                job['error'] = str(e)
+            finally:
+                job['finished_at'] = time.time()
+                self._queue.task_done()
+                self._trim()
+
+    def _trim(self):
+        # 只移除已完成的工作，等待中與執行中的工作一定保留
+        finished = [job_id for job_id, job in self.jobs.items() if job['status'] in ('succeeded', 'failed')]
+        for job_id in finished[:max(len(finished) - self.max_finished, 0)]:
+            del self.jobs[job_id]
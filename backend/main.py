@@ -1,24 +1,136 @@
 # -*- coding: utf-8 -*-
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import iterate_in_threadpool, run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
 import json
+import logging
 import os
-import sys
 import re
+import sys
 from datetime import datetime
+import numpy as np
 
 # 添加項目根目錄到 Python 路徑
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from TaiwanLottery import TaiwanLotteryCrawler
-from Lottery_predict import get_six_months_lotto649_data, predict_lottery_numbers_with_ai
+from TaiwanLottery import utils
+from TaiwanLottery.aio import AsyncTaiwanLotteryCrawler
+from TaiwanLottery.combinations import INDEX_GAMES, CombinationIndex
+from TaiwanLottery.generator import CandidateGenerator, SelectionRules
+from TaiwanLottery.matrix import DrawMatrix
+from TaiwanLottery.simulation import MonteCarloSimulator
+from TaiwanLottery.stats import DrawStatistics, RollingStatistics
+from backend.jobs import JobQueue, QueueFull
+from backend.prediction_parser import PredictionParser, parse_ai_prediction
+from backend.responses import GZIP_MIN_SIZE, FastJSONResponse, SerializedCache, dumps
+from backend.scheduler import DrawScheduler
+from backend.singleflight import SharedStream, SingleFlightCache
+from Lottery_predict import (MODEL_NAME, PROMPT_VERSION, create_prediction_model, get_draw_archive, get_draw_store, get_prediction_cache,
+                             get_response_cache, get_six_months_lotto649_data, prediction_cache_key, predict_lottery_numbers_with_ai,
+                             stream_lottery_numbers_with_ai)
+
+# 初始化非同步彩券爬蟲，避免上游 API 回應緩慢時阻塞事件迴圈
+lottery_crawler = AsyncTaiwanLotteryCrawler(store=get_draw_store(), cache=get_response_cache())
+# 大樂透預測結果快取，以最新期別為鍵
+prediction_cache = SingleFlightCache()
+# 進行中的 AI 串流預測，以 AI 預測快取鍵為鍵
+prediction_streams = SharedStream()
+AI_UNAVAILABLE = "AI 預測服務暫時無法使用"
+# /api/simulate 最多可模擬的注數
+MAX_SIMULATION_TICKETS = 20
+# 歷史月份回應序列化後的 JSON bytes，以 (彩種, 月份) 為鍵、資料版本為版本，資料不變時不重新驗證與序列化
+history_responses = SerializedCache()
+# 已結束的月份不會再改變，瀏覽器與代理伺服器可長期快取；目前月份在開獎後會新增資料，只短暫快取
+CLOSED_MONTH_CACHE_CONTROL = "public, max-age=31536000, immutable"
+CURRENT_MONTH_CACHE_CONTROL = "public, max-age=60, must-revalidate"
+# /api/draws 單次最多可查詢的月份數與同時向上游擷取的請求數
+MAX_DRAW_MONTHS = 120
+DRAW_FETCH_WORKERS = int(os.getenv('DRAW_FETCH_WORKERS', '8'))
+# 各 worker 以 mmap 共用的號碼組合索引
+combination_indexes = {}
+# 半年大樂透號碼頻率的滑動視窗統計，新的一期只需增量更新；設定 LOTTERY_STATS_PATH 時於開獎後保存到磁碟
+LOTTERY_STATS_PATH = os.getenv('LOTTERY_STATS_PATH')
+rolling_lotto649 = None
+# 設定 LOTTERY_ARCHIVE_DIR 時於啟動時以 mmap 載入的各彩種完整開獎歷史 (DrawMatrix，最新一期在前)
+draw_history = {}
+# 依開獎日曆預先擷取的彩種
+SCHEDULED_GAMES = ('lotto649', 'super_lotto', 'daily_cash')
+
+
+async def poll_latest_period(game):
+    """略過目前月份的 API 快取，重新向上游查詢最新期別"""
+    lottery_crawler.invalidate(game, [utils.get_current_year(), utils.get_current_month()])
+    return await get_latest_period(game)
+
+
+async def refresh_after_draw(game, period):
+    """
+    開出新的一期後更新資料: 查詢最新期別時已將目前月份的資料寫入快取與資料庫，
+    大樂透另外預先計算統計與 AI 預測，讓開獎後第一個請求直接取得結果
+    """
+    logging.info('{} 開出新的一期: {}'.format(game, period))
+    archive = get_draw_archive()
+    if archive is not None:
+        # 目前月份的資料已在查詢最新期別時取得，只附加新的期別
+        datas = await lottery_crawler.crawl(game)
+        await run_in_threadpool(archive.append, game, datas)
+        draw_history[game] = await run_in_threadpool(archive.load, game)
+    if game == 'lotto649':
+        # 預測失敗時拋出例外，排程不記錄這一期並於下一次查詢重試
+        await run_prediction_job()
+        if LOTTERY_STATS_PATH and rolling_lotto649 is not None:
+            await run_in_threadpool(rolling_lotto649.save, LOTTERY_STATS_PATH)
+
+
+draw_scheduler = DrawScheduler(SCHEDULED_GAMES, poll_latest_period, refresh_after_draw)
+
+
+async def run_prediction_job(refresh=False):
+    """預測工作: 擷取資料、計算統計、呼叫 AI 並解析號碼，與 /api/lotto649/predict 共用結果快取"""
+    response = await predict_lotto649(refresh)
+    if not isinstance(response, dict):
+        response = response.model_dump(exclude_none=True)
+    if response["status"] == "error":
+        raise RuntimeError(response["error"])
+    return response
+
+
+# AI 預測工作佇列，同時執行的工作數與等待中的工作數皆有上限
+prediction_jobs = JobQueue(run_prediction_job, max_workers=int(os.getenv('PREDICTION_JOB_WORKERS', '2')),
+                           max_queue=int(os.getenv('PREDICTION_JOB_QUEUE', '16')))
+
+
+def load_draw_history():
+    """以 mmap 載入開獎歷史檔中所有彩種的資料，不需解析 JSON"""
+    archive = get_draw_archive()
+    if archive is not None:
+        for game in archive.games():
+            draw_history[game] = archive.load(game)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    await run_in_threadpool(load_draw_history)
+    # LOTTERY_SCHEDULER=0 時不啟動背景排程 (例如測試或多個 worker 時只讓其中一個啟用)
+    if os.getenv('LOTTERY_SCHEDULER', '1') != '0':
+        draw_scheduler.start()
+    prediction_jobs.start()
+    yield
+    await prediction_jobs.stop()
+    await draw_scheduler.stop()
+    await lottery_crawler.aclose()
 
 app = FastAPI(
     title="台灣彩券 API",
     description="提供台灣彩券歷史資料與 AI 選號推薦服務",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 # 設定 CORS
@@ -29,6 +141,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# 壓縮其他較大的 JSON 回應；歷史月份已預先壓縮 (帶有 Content-Encoding) 不會重複壓縮，SSE 串流不壓縮
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_SIZE)
 
 # Pydantic 模型
 class LotteryData(BaseModel):
@@ -48,184 +162,14 @@ class BackTimeRequest(BaseModel):
     year: Optional[str] = None
     month: Optional[str] = None
 
-# 初始化彩券爬蟲
-lottery_crawler = TaiwanLotteryCrawler()
+class PredictionJobRequest(BaseModel):
+    refresh: bool = False
 
-def parse_ai_prediction(ai_prediction_text):
-    """
-    解析 AI 預測文字，提取出三組號碼
-    """
-    if not ai_prediction_text:
-        return None
-    
-    recommended_sets = []
-    
-    # 根據 Lottery_predict.py 中的提示詞格式，匹配以下格式：
-    # 第一組(冷門號碼組合): [號碼1, 號碼2, 號碼3, 號碼4, 號碼5, 號碼6] + 特別號: 號碼
-    # 第二組(熱門號碼組合): [號碼1, 號碼2, 號碼3, 號碼4, 號碼5, 號碼6] + 特別號: 號碼
-    # 第三組(熱門 + 冷門 混合號碼組合): [號碼1, 號碼2, 號碼3, 號碼4, 號碼5, 號碼6] + 特別號: 號碼
-    
-    # 主要匹配模式：第X組(類型): [數字列表] + 特別號: 數字
-    pattern = r'第[一二三四]組\(([^)]+)\):\s*\[([^\]]+)\]\s*\+\s*特別號:\s*(\d+)'
-    matches = re.findall(pattern, ai_prediction_text)
-    
-    # 如果沒匹配到，嘗試更寬鬆的格式（可能有額外的符號或格式）
-    if not matches:
-        # 匹配帶有星號或其他格式的版本
-        pattern = r'\*?\*?第[一二三四]組\(([^)]+)\):\*?\*?\s*\[([^\]]+)\]\s*\+\s*特別號:\s*(\d+)'
-        matches = re.findall(pattern, ai_prediction_text)
-    
-    # 如果還是沒匹配到，嘗試 Markdown 格式：**彩券號碼:** [數字列表] + **特別號:** 數字
-    if not matches:
-        # 匹配 Markdown 格式的彩券號碼
-        markdown_pattern = r'\*\*彩券號碼:\*\*\s*\[([^\]]+)\]\s*\+\s*\*\*特別號:\*\*\s*(\d+)'
-        markdown_matches = re.findall(markdown_pattern, ai_prediction_text)
-        
-        if len(markdown_matches) >= 4:
-            # 確定第一組是冷門，第二組是熱門，第三組是混合，第四組是均衡（根據文本中的順序）
-            for i, match in enumerate(markdown_matches[:4]):
-                numbers_str, special_number_str = match
-                # 解析號碼字符串，處理各種可能的分隔符
-                numbers_str = re.sub(r'[^\d,，、\s]', '', numbers_str)  # 移除非數字、逗號、空格的字符
-                regular_numbers = []
-                for num_str in re.split(r'[,，、\s]+', numbers_str):
-                    if num_str.strip().isdigit():
-                        regular_numbers.append(int(num_str.strip()))
-                
-                if len(regular_numbers) == 6:  # 確保有6個號碼
-                    special_number = int(special_number_str)
-                    # 根據文本中的順序判斷類型
-                    if i == 0:
-                        set_type = "冷門號碼組合"
-                    elif i == 1:
-                        set_type = "熱門號碼組合"
-                    elif i == 2:
-                        set_type = "熱門 + 冷門 混合號碼組合"
-                    else:
-                        set_type = "均衡組合"
-                    reason = f"基於歷史資料分析的{set_type}"
-                    
-                    recommended_sets.append({
-                        "type": set_type,
-                        "regular_numbers": regular_numbers,
-                        "special_number": special_number,
-                        "reason": reason
-                    })
-    
-    # 如果還是沒匹配到，嘗試新增的AI LLM格式1: **獎號**: [數字列表] **特別號**: 數字
-    if not matches and not markdown_matches:
-        pattern1 = r'\*\*獎號\*\*:\s*\[([^\]]+)\]\s*\*\*特別號\*\*:\s*(\d+)'
-        matches1 = re.findall(pattern1, ai_prediction_text)
-        
-        if matches1:
-            for i, match in enumerate(matches1[:4]):
-                numbers_str, special_number_str = match
-                numbers_str = re.sub(r'[^\d,，、\s]', '', numbers_str)
-                regular_numbers = []
-                for num_str in re.split(r'[,，、\s]+', numbers_str):
-                    if num_str.strip().isdigit():
-                        regular_numbers.append(int(num_str.strip()))
-                
-                if len(regular_numbers) == 6:
-                    special_number = int(special_number_str)
-                    if i == 0:
-                        set_type = "冷門號碼組合"
-                    elif i == 1:
-                        set_type = "熱門號碼組合"
-                    elif i == 2:
-                        set_type = "熱門 + 冷門 混合號碼組合"
-                    else:
-                        set_type = "均衡組合"
-                    reason = f"基於歷史資料分析的{set_type}"
-
-                    recommended_sets.append({
-                        "type": set_type,
-                        "regular_numbers": regular_numbers,
-                        "special_number": special_number,
-                        "reason": reason
-                    })
-
-    # 如果還是沒匹配到，嘗試新的格式2: **第X組(類型):** [數字列表] + 特別號: 數字
-    if not matches and not markdown_matches and not recommended_sets:
-        pattern2 = r'\*\*第[一二三四]組\(([^)]+)\):\*\*\s*\[([^\]]+)\]\s*\+\s*特別號:\s*(\d+)'
-        matches2 = re.findall(pattern2, ai_prediction_text)
-
-        if matches2:
-            for match in matches2[:4]:
-                set_type, numbers_str, special_number_str = match
-                numbers_str = re.sub(r'[^\d,，、\s]', '', numbers_str)
-                regular_numbers = []
-                for num_str in re.split(r'[,，、\s]+', numbers_str):
-                    if num_str.strip().isdigit():
-                        regular_numbers.append(int(num_str.strip()))
-                
-                if len(regular_numbers) == 6:
-                    special_number = int(special_number_str)
-                    reason = f"基於歷史資料分析的{set_type}"
-                    
-                    recommended_sets.append({
-                        "type": set_type,
-                        "regular_numbers": regular_numbers,
-                        "special_number": special_number,
-                        "reason": reason
-                    })
-    
-    # 如果還是沒匹配到，嘗試最簡單的格式（直接匹配數字組合）
-    if not matches and not recommended_sets:
-        pattern = r'\[([^\]]+)\]\s*\+\s*(?:\*\*)?特別號(?:\*\*)?:\s*(\d+)'
-        simple_matches = re.findall(pattern, ai_prediction_text)
-        if len(simple_matches) >= 4:
-            for i, match in enumerate(simple_matches[:4]):
-                numbers_str, special_number_str = match
-                # 解析號碼字符串，處理各種可能的分隔符
-                numbers_str = re.sub(r'[^\d,，、\s]', '', numbers_str)  # 移除非數字、逗號、空格的字符
-                regular_numbers = []
-                for num_str in re.split(r'[,，、\s]+', numbers_str):
-                    if num_str.strip().isdigit():
-                        regular_numbers.append(int(num_str.strip()))
-                
-                if len(regular_numbers) == 6:  # 確保有6個號碼
-                    special_number = int(special_number_str)
-                    if i == 0:
-                        set_type = "冷門號碼組合"
-                    elif i == 1:
-                        set_type = "熱門號碼組合"
-                    elif i == 2:
-                        set_type = "熱門 + 冷門 混合號碼組合"
-                    else:
-                        set_type = "均衡組合"
-                    reason = f"基於歷史資料分析的{set_type}"
-
-                    recommended_sets.append({
-                        "type": set_type,
-                        "regular_numbers": regular_numbers,
-                        "special_number": special_number,
-                        "reason": reason
-                    })
-    else:
-        # 處理帶類型的匹配結果
-        for match in matches[:4]:
-            if len(match) == 3:  # 帶類型的格式
-                set_type, numbers_str, special_number_str = match
-                # 解析號碼字符串，處理各種可能的分隔符和格式
-                numbers_str = re.sub(r'[^\d,，、\s]', '', numbers_str)  # 移除非數字、逗號、空格的字符
-                regular_numbers = []
-                for num_str in re.split(r'[,，、\s]+', numbers_str):
-                    if num_str.strip().isdigit():
-                        regular_numbers.append(int(num_str.strip()))
-                
-                if len(regular_numbers) == 6:  # 確保有6個號碼
-                    special_number = int(special_number_str)
-                    reason = f"基於歷史資料分析的{set_type}"
-                    
-                    recommended_sets.append({
-                        "type": set_type,
-                        "regular_numbers": regular_numbers,
-                        "special_number": special_number,
-                        "reason": reason
-                    })
-    
-    return recommended_sets if recommended_sets else None
+class SimulationRequest(BaseModel):
+    game: str = 'lotto649'
+    recommended_sets: List[Dict[str, Any]]
+    draws: int = 200000
+    seed: Optional[int] = None
 
 @app.get("/")
 async def root():
@@ -235,6 +179,10 @@ async def root():
         "endpoints": {
             "lotto649": "/api/lotto649",
             "lotto649_predict": "/api/lotto649/predict",
+            "lotto649_predict_stream": "/api/lotto649/predict/stream",
+            "predict_jobs": "/api/predict/jobs",
+            "lotto649_recommend": "/api/lotto649/recommend",
+            "simulate": "/api/simulate",
             "super_lotto": "/api/super_lotto",
             "daily_cash": "/api/daily_cash"
         }
@@ -242,136 +190,412 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "message": "Backend service is running"}
+    return {
+        "status": "healthy",
+        "message": "Backend service is running",
+        "cache": get_response_cache().stats(),
+        "llm_cache": get_prediction_cache().stats(),
+        "scheduler": draw_scheduler.stats(),
+        "prediction_jobs": prediction_jobs.stats(),
+        "prediction_streams": prediction_streams.stats(),
+        "history_responses": history_responses.stats(),
+        "draw_history": {game: {"draws": len(matrix), "latest_period": int(matrix.periods[0]) if len(matrix) else None}
+                         for game, matrix in draw_history.items()}
+    }
 
-@app.get("/api/lotto649", response_model=List[LotteryData])
-async def get_lotto649(year: Optional[str] = None, month: Optional[str] = None):
-    """取得大樂透歷史資料"""
+def history_version(datas):
+    """月份資料的版本: 期數與最新期別，目前月份開出新的一期時改變"""
+    return len(datas), max(data['期別'] for data in datas)
+
+
+async def get_month_history(request, game, year, month):
+    """
+    回傳某彩種某月份的開獎資料 (未指定時為目前月份)，序列化後的 JSON bytes 依資料版本快取:
+    已結束的月份不會再改變，快取命中時不需查詢爬蟲、驗證或序列化
+    回應帶有強 ETag 與依月份決定的 Cache-Control，If-None-Match 符合時回傳 304，接受 gzip 時回傳預先壓縮的內容
+    """
     try:
         if year and month:
             back_time = [year, month]
         else:
-            # 使用目前年月
-            from TaiwanLottery.utils import get_current_year, get_current_month
-            back_time = [str(get_current_year()), str(get_current_month()).zfill(2)]
-        
-        result = lottery_crawler.lotto649(back_time)
-        if not result:
-            raise HTTPException(status_code=404, detail="查無資料")
-        
-        return result
+            back_time = [str(utils.get_current_year()), str(utils.get_current_month()).zfill(2)]
+        key = (game, utils.format_month(back_time))
+        closed = utils.is_past_month(key[1])
+        entry = history_responses.get(key, 'closed') if closed else None
+        if entry is None:
+            result = await lottery_crawler.crawl(game, back_time)
+            if not result:
+                raise HTTPException(status_code=404, detail="查無資料")
+            # 與資料庫相同，已結束且有資料的月份視為不再改變
+            version = 'closed' if closed else history_version(result)
+            entry = None if closed else history_responses.get(key, version)
+            if entry is None:
+                entry = history_responses.set(key, version, dumps(result))
+        return entry.response(request.headers, CLOSED_MONTH_CACHE_CONTROL if closed else CURRENT_MONTH_CACHE_CONTROL)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"資料擷取失敗: {str(e)}")
 
+@app.get("/api/lotto649", response_model=List[LotteryData])
+async def get_lotto649(request: Request, year: Optional[str] = None, month: Optional[str] = None):
+    """取得大樂透歷史資料"""
+    return await get_month_history(request, 'lotto649', year, month)
+
+async def build_lotto649_prediction(refresh=False):
+    """擷取半年資料、計算統計並呼叫 AI 產生大樂透預測回應，refresh 為 True 時不使用 AI 預測快取"""
+    # 取得半年的大樂透資料 (同步函式，放到執行緒池避免阻塞事件迴圈)
+    lotto649_data = await run_in_threadpool(get_six_months_lotto649_data)
+
+    if not lotto649_data:
+        return {"status": "error", "error": "無法取得大樂透歷史資料"}
+
+    # 使用 AI 進行預測
+    ai_prediction = await run_in_threadpool(predict_lottery_numbers_with_ai, lotto649_data, refresh)
+    statistics = build_lotto649_statistics(lotto649_data)
+
+    # 解析 AI 預測文字，提取結構化的推薦號碼
+    recommended_sets = await run_in_threadpool(get_recommended_sets, lotto649_data, ai_prediction) if ai_prediction else None
+
+    response_data = {
+        "status": "success",
+        "data": statistics,
+        "ai_prediction": ai_prediction if ai_prediction else AI_UNAVAILABLE
+    }
+
+    # 如果成功解析出推薦號碼，加入回應中
+    if recommended_sets:
+        response_data["recommended_sets"] = recommended_sets
+
+    return response_data
+
+
+def get_recommended_sets(lotto649_data, ai_prediction):
+    """解析 AI 預測文字，解析結果與原始文字一起保存在 AI 預測快取，之後直接使用"""
+    cache = get_prediction_cache()
+    cache_key = prediction_cache_key(lotto649_data)
+    entry = cache.get(cache_key)
+    if entry and entry['text'] == ai_prediction and entry.get('recommended_sets') is not None:
+        return entry['recommended_sets'] or None
+    recommended_sets = parse_ai_prediction(ai_prediction)
+    if entry and entry['text'] == ai_prediction:
+        cache.update(cache_key, recommended_sets=recommended_sets or [])
+    return recommended_sets
+
+
+def get_rolling_lotto649(lotto649_data):
+    """
+    將半年資料中尚未加入的新期別增量加入滑動視窗統計，
+    視窗與資料範圍不一致 (例如啟動時、月初尚未開獎) 時以這份資料重新建立
+    """
+    global rolling_lotto649
+    if rolling_lotto649 is None and LOTTERY_STATS_PATH and os.path.exists(LOTTERY_STATS_PATH):
+        rolling_lotto649 = RollingStatistics.load(LOTTERY_STATS_PATH)
+    if rolling_lotto649 is None:
+        rolling_lotto649 = RollingStatistics('lotto649', months=6)
+
+    latest_period = rolling_lotto649.latest_period
+    rolling_lotto649.extend([data for data in lotto649_data if latest_period is None or data['期別'] > latest_period])
+    draws = rolling_lotto649.draws
+    if (len(draws) != len(lotto649_data) or draws[-1]['期別'] != lotto649_data[0]['期別']
+            or draws[0]['期別'] != lotto649_data[-1]['期別']):
+        rolling_lotto649 = RollingStatistics('lotto649', months=6)
+        rolling_lotto649.extend(lotto649_data)
+    return rolling_lotto649
+
+
+def build_lotto649_statistics(lotto649_data):
+    """半年大樂透資料的統計資訊 (期數、日期範圍、號碼頻率與型態分析)"""
+    statistics = {
+        "total_periods": len(lotto649_data),
+        "date_range": {
+            "start": lotto649_data[-1]['開獎日期'][:10],
+            "end": lotto649_data[0]['開獎日期'][:10]
+        },
+        "latest_period": lotto649_data[0]['期別'],
+        "oldest_period": lotto649_data[-1]['期別']
+    }
+
+    # 號碼頻率由滑動視窗統計增量更新，找出熱門和冷門號碼 (前/後 10 名)
+    rolling = get_rolling_lotto649(lotto649_data)
+    statistics["frequency_analysis"] = {
+        "hot_numbers": rolling.hot_numbers(10),
+        "cold_numbers": rolling.cold_numbers(10),
+        "number_frequency": dict(rolling.ranked_numbers()),
+        "special_frequency": dict(rolling.ranked_specials())
+    }
+    # 型態分析需要視窗內每一期的特徵分布，仍以 DrawStatistics 計算
+    statistics["pattern_analysis"] = DrawStatistics(DrawMatrix.from_draws(lotto649_data, 'lotto649')).to_dict()
+    return statistics
+
+
+def format_sse(event, data):
+    """Server-Sent Events 格式的單一事件"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def stream_lotto649_prediction(refresh=False):
+    """
+    依序產生 statistics (統計資訊)、token (AI 輸出的文字片段)、set (每解析出一組推薦號碼)、
+    done (完整預測與所有推薦號碼) 事件，發生錯誤時產生 error 事件後結束
+    """
+    lotto649_data = await run_in_threadpool(get_six_months_lotto649_data)
+    if not lotto649_data:
+        yield format_sse("error", {"error": "無法取得大樂透歷史資料"})
+        return
+    yield format_sse("statistics", build_lotto649_statistics(lotto649_data))
+
+    # 相同資料範圍已有 AI 預測時直接送出快取的結果
+    cache_key = prediction_cache_key(lotto649_data)
+    cached = None if refresh else await run_in_threadpool(get_prediction_cache().get, cache_key)
+    if cached:
+        recommended_sets = await run_in_threadpool(get_recommended_sets, lotto649_data, cached['text']) or []
+        yield format_sse("token", {"text": cached['text']})
+        for recommended_set in recommended_sets:
+            yield format_sse("set", recommended_set)
+        yield format_sse("done", {"ai_prediction": cached['text'], "recommended_sets": recommended_sets})
+        return
+
+    # 快取尚未建立時 (例如剛開獎)，同一資料範圍的並行串流共用一次 AI 呼叫
+    async for event in prediction_streams.subscribe(cache_key, lambda: generate_ai_prediction_events(lotto649_data, cache_key)):
+        yield event
+
+
+async def generate_ai_prediction_events(lotto649_data, cache_key):
+    """呼叫 AI 串流預測並產生 token、set、done (或 error) 事件，完成後寫入 AI 預測快取"""
+    model = await run_in_threadpool(create_prediction_model)
+    if model is None:
+        yield format_sse("error", {"error": AI_UNAVAILABLE})
+        return
+
+    parser = PredictionParser()
+    chunks = []
+    try:
+        # 模型的串流回應為同步 iterator，逐段在執行緒池中取得
+        async for text in iterate_in_threadpool(stream_lottery_numbers_with_ai(lotto649_data, model)):
+            chunks.append(text)
+            yield format_sse("token", {"text": text})
+            for recommended_set in parser.feed(text):
+                yield format_sse("set", recommended_set)
+    except Exception as e:
+        print(f"AI 串流預測過程中發生錯誤: {e}")
+        yield format_sse("error", {"error": AI_UNAVAILABLE})
+        return
+    for recommended_set in parser.close():
+        yield format_sse("set", recommended_set)
+    ai_prediction = "".join(chunks)
+    await run_in_threadpool(get_prediction_cache().set, cache_key, ai_prediction, parser.sets, model=MODEL_NAME, prompt_version=PROMPT_VERSION)
+    yield format_sse("done", {"ai_prediction": ai_prediction, "recommended_sets": parser.sets})
+
+
+def check_refresh_allowed(refresh):
+    """強制重新呼叫 AI 會產生費用並取代所有人共用的結果，只在設定 ALLOW_PREDICTION_REFRESH=1 時開放"""
+    if refresh and os.getenv('ALLOW_PREDICTION_REFRESH', '0') != '1':
+        raise HTTPException(status_code=403, detail="未開放重新產生 AI 預測 (ALLOW_PREDICTION_REFRESH)")
+
+
+async def get_latest_period(game):
+    """以目前月份 (月初尚未開獎時為上個月) 的資料取得最新期別，無法取得時回傳 None"""
+    current_month = utils.format_month([utils.get_current_year(), utils.get_current_month()])
+    try:
+        for month in (current_month, utils.add_months(current_month, -1)):
+            datas = await lottery_crawler.crawl(game, month.split('-'))
+            if datas:
+                return max(data['期別'] for data in datas)
+    except Exception as e:
+        print(f"取得最新期別失敗: {e}")
+    return None
+
+
 @app.get("/api/lotto649/predict", response_model=PredictionResponse)
-async def predict_lotto649():
-    """使用 AI 預測大樂透號碼"""
+async def predict_lotto649(refresh: bool = False):
+    """
+    使用 AI 預測大樂透號碼，同一期別的並行請求共用一次計算，結果保留到開出新的一期
+    refresh 為 True 時重新呼叫 AI (需設定 ALLOW_PREDICTION_REFRESH=1)，不會併入進行中的一般計算
+    """
+    check_refresh_allowed(refresh)
     try:
-        # 取得半年的大樂透資料
-        lotto649_data = get_six_months_lotto649_data()
-        
-        if not lotto649_data:
-            return PredictionResponse(
-                status="error",
-                error="無法取得大樂透歷史資料"
-            )
-        
-        # 使用 AI 進行預測
-        ai_prediction = predict_lottery_numbers_with_ai(lotto649_data)
-        
-        # 統計資訊
-        statistics = {
-            "total_periods": len(lotto649_data),
-            "date_range": {
-                "start": lotto649_data[-1]['開獎日期'][:10],
-                "end": lotto649_data[0]['開獎日期'][:10]
-            },
-            "latest_period": lotto649_data[0]['期別'],
-            "oldest_period": lotto649_data[-1]['期別']
-        }
-        
-        # 計算號碼頻率統計
-        number_frequency = {}
-        special_frequency = {}
-        
-        for data in lotto649_data:
-            for num in data['獎號']:
-                number_frequency[num] = number_frequency.get(num, 0) + 1
-            special_frequency[data['特別號']] = special_frequency.get(data['特別號'], 0) + 1
-        
-        # 找出熱門和冷門號碼
-        sorted_numbers = sorted(number_frequency.items(), key=lambda x: x[1], reverse=True)
-        hot_numbers = sorted_numbers[:10]  # 前10個熱門號碼
-        cold_numbers = sorted_numbers[-10:] if len(sorted_numbers) >= 10 else sorted_numbers  # 後10個冷門號碼
-        
-        statistics["frequency_analysis"] = {
-            "hot_numbers": hot_numbers,
-            "cold_numbers": cold_numbers,
-            "number_frequency": dict(sorted_numbers),
-            "special_frequency": dict(sorted(special_frequency.items(), key=lambda x: x[1], reverse=True))
-        }
-        
-        # 解析 AI 預測文字，提取結構化的推薦號碼
-        recommended_sets = parse_ai_prediction(ai_prediction) if ai_prediction else None
-        
-        # 調試信息
-        print(f"AI prediction length: {len(ai_prediction) if ai_prediction else 0}")
-        print(f"Recommended sets: {recommended_sets}")
-        
-        response_data = {
-            "status": "success",
-            "data": statistics,
-            "ai_prediction": ai_prediction if ai_prediction else "AI 預測服務暫時無法使用"
-        }
-        
-        # 如果成功解析出推薦號碼，加入回應中
-        if recommended_sets:
-            response_data["recommended_sets"] = recommended_sets
-            print("Added recommended_sets to response")
-        
-        return response_data
-        
+        latest_period = await get_latest_period('lotto649')
+
+        def cacheable(response_data):
+            return (response_data["status"] == "success"
+                    and response_data["ai_prediction"] != AI_UNAVAILABLE
+                    and response_data["data"]["latest_period"] == latest_period)
+
+        if refresh:
+            # 只與其他 refresh 請求合併，完成後取代目前保留的結果
+            response_data = await prediction_cache.get(('refresh', latest_period), lambda: build_lotto649_prediction(refresh=True),
+                                                       lambda value: False)
+            if latest_period is not None and cacheable(response_data):
+                prediction_cache.put(latest_period, response_data)
+            return response_data
+
+        return await prediction_cache.get(latest_period, build_lotto649_prediction, cacheable)
     except Exception as e:
         return PredictionResponse(
             status="error",
             error=f"預測過程發生錯誤: {str(e)}"
         )
 
-@app.get("/api/super_lotto")
-async def get_super_lotto(year: Optional[str] = None, month: Optional[str] = None):
-    """取得威力彩歷史資料"""
+@app.get("/api/lotto649/predict/stream")
+async def stream_predict_lotto649(refresh: bool = False):
+    """以 Server-Sent Events 串流 AI 預測: 先送出統計資訊，再即時轉送 AI 輸出並在解析出每組號碼時送出"""
+    check_refresh_allowed(refresh)
+    return StreamingResponse(
+        stream_lotto649_prediction(refresh),
+        media_type="text/event-stream",
+        # 避免反向代理緩衝串流內容
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def format_job(job):
+    return {
+        "id": job["id"],
+        "status": job["status"],
+        "position": prediction_jobs.position(job["id"]),
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "result": job["result"],
+        "error": job["error"],
+        "url": f"/api/predict/jobs/{job['id']}"
+    }
+
+@app.post("/api/predict/jobs", status_code=202)
+async def create_prediction_job(request: Optional[PredictionJobRequest] = None):
+    """建立大樂透 AI 預測工作並立即回傳工作 id，等待中的工作已滿時回傳 429"""
+    refresh = request.refresh if request else False
+    check_refresh_allowed(refresh)
     try:
-        if year and month:
-            back_time = [year, month]
-        else:
-            from TaiwanLottery.utils import get_current_year, get_current_month
-            back_time = [str(get_current_year()), str(get_current_month()).zfill(2)]
-        
-        result = lottery_crawler.super_lotto(back_time)
-        if not result:
-            raise HTTPException(status_code=404, detail="查無資料")
-        
-        return result
+        job = prediction_jobs.submit(refresh=refresh)
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+    return format_job(job)
+
+@app.get("/api/predict/jobs/{job_id}")
+async def get_prediction_job(job_id: str):
+    """查詢預測工作的狀態 (queued、running、succeeded、failed) 與結果"""
+    job = prediction_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="查無此預測工作")
+    return format_job(job)
+
+@app.get("/api/lotto649/recommend", response_model=PredictionResponse)
+async def recommend_lotto649(count: int = 1, seed: Optional[int] = None):
+    """依選號策略規則於本地產生冷門、熱門、混合、均衡四種主題的大樂透號碼，不需等待 AI"""
+    if not 1 <= count <= 10:
+        raise HTTPException(status_code=422, detail="count 需介於 1 到 10")
+    try:
+        lotto649_data = await run_in_threadpool(get_six_months_lotto649_data)
+        if not lotto649_data:
+            return PredictionResponse(status="error", error="無法取得大樂透歷史資料")
+
+        draw_statistics = DrawStatistics(DrawMatrix.from_draws(lotto649_data, 'lotto649'))
+        recommended_sets = CandidateGenerator(draw_statistics, seed=seed).recommend(per_theme=count)
+        return PredictionResponse(
+            status="success",
+            data={"latest_period": lotto649_data[0]['期別'], "total_periods": len(lotto649_data)},
+            recommended_sets=recommended_sets
+        )
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"資料擷取失敗: {str(e)}")
+        return PredictionResponse(
+            status="error",
+            error=f"產生推薦號碼時發生錯誤: {str(e)}"
+        )
+
+@app.post("/api/simulate")
+async def simulate_recommended_sets(request: SimulationRequest):
+    """以蒙地卡羅模擬估計 recommended_sets 整組投注每期的獎金期望值與變異數"""
+    if not 1 <= request.draws <= 2000000:
+        raise HTTPException(status_code=422, detail="draws 需介於 1 到 2000000")
+    # 每批模擬的記憶體用量與注數成正比
+    if not 1 <= len(request.recommended_sets) <= MAX_SIMULATION_TICKETS:
+        raise HTTPException(status_code=422, detail=f"recommended_sets 需介於 1 到 {MAX_SIMULATION_TICKETS} 注")
+    try:
+        simulator = MonteCarloSimulator.from_recommended_sets(request.game, request.recommended_sets)
+    except (KeyError, TypeError, ValueError) as e:
+        raise HTTPException(status_code=422, detail=f"無效的投注號碼: {str(e)}")
+    return await run_in_threadpool(simulator.run, request.draws, request.seed)
+
+def get_combination_index(game):
+    """
+    載入 (mmap) LOTTERY_INDEX_DIR 中預先建立的號碼組合索引，未設定、尚未建立或建立中 (檔案不完整) 時回傳 None
+    只保留載入成功的索引，之後才建立的索引不需重新啟動即可使用
+    """
+    if game not in combination_indexes:
+        index_dir = os.getenv('LOTTERY_INDEX_DIR')
+        path = os.path.join(index_dir, game) if index_dir else None
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            combination_indexes[game] = CombinationIndex(path)
+        except (OSError, ValueError, KeyError):
+            return None
+    return combination_indexes[game]
+
+@app.get("/api/combinations/{game}/count")
+async def count_combinations(game: str, sum_min: int = 120, sum_max: int = 160, span_min: int = 30, span_max: int = 40,
+                             zone_balanced: bool = True, sample: int = 0):
+    """計算符合選號規則的號碼組合數，並可隨機抽出 sample 組 (需先以 python -m TaiwanLottery.combinations 建立索引)"""
+    if game not in INDEX_GAMES:
+        raise HTTPException(status_code=404, detail="不支援的彩種")
+    if not 0 <= sample <= 100:
+        raise HTTPException(status_code=422, detail="sample 需介於 0 到 100")
+    index = get_combination_index(game)
+    if index is None:
+        raise HTTPException(status_code=503, detail="號碼組合索引尚未建立")
+
+    rules = SelectionRules(sum_range=(sum_min, sum_max), span_range=(span_min, span_max), zone_counts=(2, 2, 2) if zone_balanced else None,
+                           zone_bounds=index.zone_bounds, high_threshold=index.high_threshold)
+    mask = await run_in_threadpool(index.mask, rules)
+    result = {"game": game, "total": len(index), "count": int(mask.sum())}
+    if sample:
+        rows = np.flatnonzero(mask)
+        chosen = np.random.default_rng().choice(rows, size=min(sample, len(rows)), replace=False)
+        result["sample"] = index.numbers[np.sort(chosen)].tolist()
+    return result
+
+@app.get("/api/super_lotto")
+async def get_super_lotto(request: Request, year: Optional[str] = None, month: Optional[str] = None):
+    """取得威力彩歷史資料"""
+    return await get_month_history(request, 'super_lotto', year, month)
 
 @app.get("/api/daily_cash")
-async def get_daily_cash(year: Optional[str] = None, month: Optional[str] = None):
+async def get_daily_cash(request: Request, year: Optional[str] = None, month: Optional[str] = None):
     """取得今彩539歷史資料"""
+    return await get_month_history(request, 'daily_cash', year, month)
+
+def parse_draw_query(games, start_month, end_month):
+    """驗證 /api/draws 的查詢參數，回傳 (彩種清單, 起始月份, 結束月份)"""
+    current_month = utils.format_month([utils.get_current_year(), utils.get_current_month()])
+    game_list = list(dict.fromkeys(game.strip() for game in games.split(',') if game.strip())) if games else list(lottery_crawler.GAMES)
+    unknown = [game for game in game_list if game not in lottery_crawler.GAMES]
+    if unknown or not game_list:
+        raise HTTPException(status_code=422, detail=f"未知的彩種: {', '.join(unknown)}，可用的彩種: {', '.join(lottery_crawler.GAMES)}")
+
+    months = []
+    for month in (start_month or end_month or current_month, end_month or start_month or current_month):
+        if not re.fullmatch(r'\d{4}-(0[1-9]|1[0-2])', month):
+            raise HTTPException(status_code=422, detail=f"月份格式需為 YYYY-MM: {month}")
+        months.append(month)
+    count = len(utils.month_range(*months))
+    if not 1 <= count <= MAX_DRAW_MONTHS:
+        raise HTTPException(status_code=422, detail=f"查詢範圍需介於 1 到 {MAX_DRAW_MONTHS} 個月，且 from 不可晚於 to")
+    return game_list, months[0], months[1]
+
+@app.get("/api/draws")
+async def get_draws(games: Optional[str] = None, start_month: Optional[str] = Query(None, alias="from"),
+                    end_month: Optional[str] = Query(None, alias="to")):
+    """
+    一次取得多個彩種在 from 到 to (YYYY-MM，含) 之間的開獎資料，所有彩種與月份並行擷取
+    games 為以逗號分隔的彩種名稱 (例如 lotto649,super_lotto)，預設為全部彩種；from/to 預設為目前月份
+    """
+    game_list, start_month, end_month = parse_draw_query(games, start_month, end_month)
     try:
-        if year and month:
-            back_time = [year, month]
-        else:
-            from TaiwanLottery.utils import get_current_year, get_current_month
-            back_time = [str(get_current_year()), str(get_current_month()).zfill(2)]
-        
-        result = lottery_crawler.daily_cash(back_time)
-        if not result:
-            raise HTTPException(status_code=404, detail="查無資料")
-        
-        return result
+        draws = await lottery_crawler.fetch_games(game_list, start_month, end_month, max_workers=DRAW_FETCH_WORKERS)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"資料擷取失敗: {str(e)}")
+    return {"from": start_month, "to": end_month, "games": draws}
 
 if __name__ == "__main__":
     import uvicorn
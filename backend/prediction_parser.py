@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+import re
+
+from TaiwanLottery.generator import THEMES
+
+# 沒有標示類型的號碼組依出現順序對應的類型 (與提示詞要求的四組順序相同)
+DEFAULT_TYPES = list(THEMES.values())
+
+# 單次掃描同時辨識以下格式 (括號與冒號皆接受全形):
+#     第一組(冷門號碼組合): [1, 2, 3, 4, 5, 6] + 特別號: 7
+#     **第一組(冷門號碼組合):** [1, 2, 3, 4, 5, 6] + 特別號: 7
+#     **彩券號碼:** [1, 2, 3, 4, 5, 6] + **特別號:** 7
+#     **獎號**: [1, 2, 3, 4, 5, 6] **特別號**: 7
+#     [1, 2, 3, 4, 5, 6] + 特別號: 7
+# 號碼組以 '[' 開頭，regex 引擎可直接跳到候選位置；
+# 「第X組(類型)」標題只在上一組與這一組之間的文字中尋找，不論標題與號碼在同一行或分行
+SET_PATTERN = re.compile(r'\[(?P<numbers>[^\]\n]{1,80})\]\s*\+?\s*(?:\*\*)?特別號(?:\*\*)?\s*[:：]\s*(?:\*\*)?\s*(?P<special>\d{1,2})')
+HEADING_PATTERN = re.compile(r'第[一二三四1-4]組\s*[(（]([^)）\n]{1,40})[)）]')
+NUMBER_PATTERN = re.compile(r'\d+')
+
+# 號碼組與其標題的最大長度，串流解析時只需保留這麼長的未解析文字
+MAX_MATCH_LENGTH = 256
+
+
+class PredictionParser():
+    """
+    AI 預測文字的單次掃描解析器，可一次解析完整文字，也可在串流時逐段 feed
+    每組號碼需為 pick 個不重複且在 number_range 內的號碼，特別號需在範圍內且不與獎號重複，
+    不符合的號碼組會記錄在 rejected 而不會回傳
+    """
+
+    def __init__(self, max_sets=4, number_range=(1, 49), pick=6):
+        self.max_sets = max_sets
+        self.number_range = number_range
+        self.pick = pick
+        self.sets = []
+        self.rejected = []
+        self._buffer = ''
+        self._position = 0
+        # 已捨棄的文字中最後一個「第X組(類型)」標題，供下一組號碼使用
+        self._heading = None
+
+    def feed(self, text):
+        """加入一段文字，回傳這段文字新解析出的號碼組"""
+        self._buffer += text
+        return self._scan(final=False)
+
+    def close(self, text=''):
+        """加入最後一段文字並結束，回傳新解析出的號碼組"""
+        self._buffer += text
+        return self._scan(final=True)
+
+    def _scan(self, final):
+        found = []
+        for match in SET_PATTERN.finditer(self._buffer, self._position):
+            # 結尾的特別號可能還有下一個位數尚未送達
+            if not final and match.end() == len(self._buffer):
+                break
+            headings = HEADING_PATTERN.findall(self._buffer, self._position, match.start())
+            heading = headings[-1].strip() if headings else self._heading
+            self._position = match.end()
+            self._heading = None
+            recommended_set = self._build_set(match, heading)
+            if recommended_set and len(self.sets) < self.max_sets:
+                self.sets.append(recommended_set)
+                found.append(recommended_set)
+
+        # 已掃描過且不可能成為號碼組開頭的文字不再保留，捨棄前先記下其中的標題
+        # (標題遠短於 MAX_MATCH_LENGTH，在 cut 之前開始的標題一定已完整收到)
+        cut = len(self._buffer) - MAX_MATCH_LENGTH
+        if cut > self._position:
+            for heading in HEADING_PATTERN.finditer(self._buffer, self._position):
+                if heading.start() >= cut:
+                    break
+                self._heading = heading.group(1).strip()
+            self._position = cut
+        if self._position > MAX_MATCH_LENGTH:
+            self._buffer = self._buffer[self._position:]
+            self._position = 0
+        return found
+
+    def _build_set(self, match, heading_type):
+        set_type = heading_type or DEFAULT_TYPES[len(self.sets) % len(DEFAULT_TYPES)]
+        regular_numbers = list(map(int, NUMBER_PATTERN.findall(match.group('numbers'))))
+        special_number = int(match.group('special'))
+        if not self._is_valid(regular_numbers, special_number):
+            self.rejected.append({"type": set_type, "regular_numbers": regular_numbers, "special_number": special_number})
+            return None
+        return {
+            "type": set_type,
+            "regular_numbers": regular_numbers,
+            "special_number": special_number,
+            "reason": "基於歷史資料分析的" + set_type
+        }
+
+    def _is_valid(self, regular_numbers, special_number):
+        low, high = self.number_range
+        unique = set(regular_numbers)
+        return (len(regular_numbers) == len(unique) == self.pick and low <= min(unique) and max(unique) <= high
+                and low <= special_number <= high and special_number not in unique)
+
+
+def parse_ai_prediction(ai_prediction_text):
+    """
+    解析 AI 預測文字，提取出最多四組號碼
+    """
+    if not ai_prediction_text:
+        return None
+    parser = PredictionParser()
+    parser.close(ai_prediction_text)
+    return parser.sets or None
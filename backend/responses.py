@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+import gzip
+import hashlib
+import json
+from collections import OrderedDict
+from collections.abc import Mapping
+
+import numpy as np
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:  # orjson 為選用套件，未安裝時改用標準函式庫的 json
+    orjson = None
+
+# 小於此大小的回應不壓縮 (與 GZipMiddleware 的 minimum_size 相同)
+GZIP_MIN_SIZE = 1000
+
+
+def _default(value):
+    # TaiwanLottery.records.Draw 等 Mapping 與 NumPy 純量
+    if isinstance(value, Mapping):
+        return dict(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError('無法序列化為 JSON: {!r}'.format(type(value)))
+
+
+def dumps(content):
+    """序列化為 UTF-8 JSON bytes，格式與 Starlette JSONResponse 相同 (不跳脫中文、不含空白)"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(',', ':'), default=_default).encode('utf-8')
+
+
+class FastJSONResponse(JSONResponse):
+    """以 orjson (已安裝時) 序列化的 JSONResponse"""
+
+    def render(self, content):
+        return dumps(content)
+
+
+class SerializedBody():
+    """
+    序列化後的 JSON 回應內容，建立時一次計算強 ETag (內容的雜湊) 與 gzip 壓縮結果，之後每個請求直接使用
+    gzip 與未壓縮的內容為不同的表示法，ETag 分別加上 -gzip 後綴
+    """
+
+    __slots__ = ('body', 'etag', 'gzip_body', 'gzip_etag')
+
+    def __init__(self, body):
+        self.body = body
+        digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        self.etag = '"{}"'.format(digest)
+        self.gzip_etag = '"{}-gzip"'.format(digest)
+        self.gzip_body = gzip.compress(body, compresslevel=6, mtime=0) if len(body) >= GZIP_MIN_SIZE else None
+
+    def matches(self, if_none_match):
+        """If-None-Match 是否符合任一表示法 (弱比較，* 符合全部)"""
+        if not if_none_match:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        return any(tag == '*' or tag.replace('W/', '', 1) in (self.etag, self.gzip_etag) for tag in tags)
+
+    def response(self, headers, cache_control):
+        """
+        依請求的 If-None-Match 與 Accept-Encoding 回傳 304 或 (壓縮的) JSON 回應
+        Args:
+            headers: 請求標頭
+            cache_control: Cache-Control 標頭
+        """
+        use_gzip = self.gzip_body is not None and accepts_gzip(headers.get('accept-encoding', ''))
+        response_headers = {'ETag': self.gzip_etag if use_gzip else self.etag, 'Cache-Control': cache_control}
+        vary = {'Vary': 'Accept-Encoding'} if self.gzip_body is not None else {}
+        if self.matches(headers.get('if-none-match')):
+            return Response(status_code=304, headers=dict(response_headers, **vary))
+        if use_gzip:
+            return Response(content=self.gzip_body, media_type='application/json',
+                            headers=dict(response_headers, **vary, **{'Content-Encoding': 'gzip'}))
+        # 未壓縮的大型回應由 GZipMiddleware 加上 Vary，這裡不重複設定
+        return Response(content=self.body, media_type='application/json', headers=response_headers)
+
+
+def accepts_gzip(accept_encoding):
+    """Accept-Encoding 是否接受 gzip (q=0 表示不接受，明確列出的 gzip 優先於 *)"""
+    qualities = {}
+    for coding in accept_encoding.lower().split(','):
+        name, _, params = coding.partition(';')
+        params = params.replace(' ', '')
+        try:
+            qualities[name.strip()] = float(params[2:]) if params.startswith('q=') else 1.0
+        except ValueError:
+            qualities[name.strip()] = 0.0
+    return qualities.get('gzip', qualities.get('*', 0.0)) > 0
+
+
+class SerializedCache():
+    """
+    保存序列化後的 JSON 回應 (SerializedBody)，以 (key, version) 判斷是否可以重複使用，
+    同一個 key 的資料版本改變 (例如目前月份開出新的一期) 時才重新序列化；最多保留 max_entries 個 key (LRU)
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != version:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key, version, body):
+        """保存序列化後的 bytes 並回傳 SerializedBody"""
+        entry = SerializedBody(body)
+        self._entries[key] = (version, entry)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def stats(self):
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses, 'orjson': orjson is not None}
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import datetime
+import logging
+
+from TaiwanLottery import TaiwanLotteryCrawler
+
+# 台灣時間 (沒有日光節約時間)
+TAIPEI = datetime.timezone(datetime.timedelta(hours=8))
+# 大樂透、威力彩、今彩539 皆於開獎日 20:30 開獎
+DRAW_TIME = datetime.time(20, 30)
+
+
+def next_draw_time(game, after, draw_time=DRAW_TIME):
+    """
+    回傳 after 之後 (不含) 的下一次開獎時間，開獎星期依 TaiwanLotteryCrawler.GAME_API 的 draw_days
+    Args:
+        game: 彩種方法名稱，例如 'lotto649'
+        after: 有時區的 datetime
+    """
+    draw_days = TaiwanLotteryCrawler.GAME_API[game]['draw_days']
+    after = after.astimezone(TAIPEI)
+    for days in range(8):
+        day = after.date() + datetime.timedelta(days=days)
+        if day.weekday() in draw_days:
+            draw_at = datetime.datetime.combine(day, draw_time, TAIPEI)
+            if draw_at > after:
+                return draw_at
+    raise ValueError('沒有開獎日的彩種: ' + game)
+
+
+class DrawScheduler():
+    """
+    依開獎日曆在背景預先擷取開獎結果
+    啟動時先取得各彩種的最新期別並預熱一次，之後在每次開獎時間 delay 後開始每隔 poll_interval 查詢，
+    直到出現新的期別 (或超過 poll_window) 為止，出現新期別時呼叫 on_new_period 更新資料與預先計算回應
+    每個行程各自執行，多個 worker 時會各自查詢一次
+    """
+
+    def __init__(self, games, poll, on_new_period, delay=600, poll_interval=300, poll_window=3 * 3600, draw_time=DRAW_TIME,
+                 clock=None, sleep=asyncio.sleep):
+        """
+        Args:
+            games: 要排程的彩種
+            poll: coroutine function poll(game)，略過快取查詢最新期別，無法取得時回傳 None
+            on_new_period: coroutine function on_new_period(game, period)
+            delay: 開獎後幾秒開始查詢
+            poll_interval: 查詢間隔秒數
+            poll_window: 開獎後最多查詢幾秒
+            clock: 回傳目前時間 (有時區) 的函式，預設為台灣時間
+            sleep: 等待用的 coroutine function，測試時可替換
+        """
+        self.games = list(games)
+        self.poll = poll
+        self.on_new_period = on_new_period
+        self.delay = datetime.timedelta(seconds=delay)
+        self.poll_interval = poll_interval
+        self.poll_window = datetime.timedelta(seconds=poll_window)
+        self.draw_time = draw_time
+        self.clock = clock or (lambda: datetime.datetime.now(TAIPEI))
+        self.sleep = sleep
+        self.state = {game: {'latest_period': None, 'next_draw': None, 'polls': 0, 'refreshes': 0, 'last_refresh': None} for game in self.games}
+        self._tasks = []
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.ensure_future(self.run_game(game)) for game in self.games]
+
+    async def stop(self):
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self):
+        return {
+            'running': bool(self._tasks),
+            'games': {
+                game: dict(state, next_draw=state['next_draw'] and state['next_draw'].isoformat(),
+                           last_refresh=state['last_refresh'] and state['last_refresh'].isoformat())
+                for game, state in self.state.items()
+            },
+        }
+
+    async def run_game(self, game):
+        """單一彩種的排程迴圈，直到被取消為止"""
+        state = self.state[game]
+        await self._check(game)
+        last_draw = None
+        while True:
+            # 啟動時若正處於某次開獎的查詢期間內，仍會查詢該次開獎
+            after = self.clock() - self.poll_window
+            if last_draw is not None:
+                after = max(after, last_draw)
+            last_draw = state['next_draw'] = next_draw_time(game, after, self.draw_time)
+            await self._sleep_until(last_draw + self.delay)
+
+            deadline = last_draw + self.poll_window
+            while not await self._check(game):
+                if self.clock() + datetime.timedelta(seconds=self.poll_interval) > deadline:
+                    logging.warning('{} 於 {} 開獎後未查到新的期別'.format(game, last_draw.isoformat()))
+                    break
+                await self.sleep(self.poll_interval)
+
+    async def _check(self, game):
+        """查詢一次最新期別，出現新期別時呼叫 on_new_period 並回傳 True"""
+        state = self.state[game]
+        state['polls'] += 1
+        try:
+            period = await self.poll(game)
+            if period is None or (state['latest_period'] is not None and period <= state['latest_period']):
+                return False
+            # on_new_period 失敗時不記錄期別，下一次查詢會再試一次
+            await self.on_new_period(game, period)
+            state['latest_period'] = period
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.warning('{} 排程更新失敗: {}'.format(game, e))
+            return False
+        state['refreshes'] += 1
+        state['last_refresh'] = self.clock()
+        return True
+
+    async def _sleep_until(self, when):
+        seconds = (when - self.clock()).total_seconds()
+        if seconds > 0:
+            await self.sleep(seconds)
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import logging
+
+
+class SingleFlightCache():
+    """
+    同一個 key 的並行請求共用同一次計算 (single-flight)，
+    計算完成後保留最新 key 的結果，直到 key 改變 (例如開出新的一期) 為止
+    """
+
+    def __init__(self):
+        self._key = None
+        self._value = None
+        self._inflight = {}
+        self.hits = 0
+        self.coalesced = 0
+        self.misses = 0
+
+    async def get(self, key, compute, cacheable=lambda value: True):
+        """
+        Args:
+            key: 快取鍵，None 表示無法判斷資料版本，只合併並行請求不保留結果
+            compute: 無參數的 coroutine function
+            cacheable: 判斷結果是否可以保留的函式，例如 AI 服務失敗時不保留
+        """
+        if key is not None and key == self._key:
+            self.hits += 1
+            return self._value
+
+        future = self._inflight.get(key)
+        if future is None:
+            self.misses += 1
+            future = asyncio.ensure_future(compute())
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._finish(key, done, cacheable))
+        else:
+            self.coalesced += 1
+        # shield 避免單一客戶端中斷連線時取消其他人共用的計算
+        return await asyncio.shield(future)
+
+    def put(self, key, value):
+        """直接保留 key 的結果 (例如強制重新計算後的結果)"""
+        self._key = key
+        self._value = value
+
+    def invalidate(self):
+        self._key = None
+        self._value = None
+
+    def stats(self):
+        return {'hits': self.hits, 'coalesced': self.coalesced, 'misses': self.misses, 'key': self._key}
+
+    def _finish(self, key, future, cacheable):
+        self._inflight.pop(key, None)
+        if future.cancelled() or future.exception() is not None:
+            return
+        value = future.result()
+        if key is not None and cacheable(value):
+            self._key = key
+            self._value = value
+
+
+class SharedStream():
+    """
+    同一個 key 的並行串流共用同一個來源 (例如同一次 AI 串流回應)
+    後加入的訂閱者先收到已產生的所有項目，再與其他人一起接收後續項目；
+    來源在背景 task 中執行，訂閱者中斷連線不會影響其他人，來源結束後即移除
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        # 事件迴圈只保留 task 的弱參考，需自行保留背景 task 直到結束，避免串流中途被回收
+        self._tasks = set()
+        self.started = 0
+        self.joined = 0
+
+    async def subscribe(self, key, produce):
+        """
+        Args:
+            key: 串流的鍵
+            produce: 無參數、回傳 async iterator 的函式，同一個 key 同時只會呼叫一次
+        """
+        broadcast = self._inflight.get(key)
+        if broadcast is None:
+            self.started += 1
+            broadcast = self._inflight[key] = {'items': [], 'done': False, 'changed': asyncio.Event()}
+            task = asyncio.ensure_future(self._pump(key, broadcast, produce))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        else:
+            self.joined += 1
+
+        index = 0
+        while True:
+            while index < len(broadcast['items']):
+                yield broadcast['items'][index]
+                index += 1
+            if broadcast['done']:
+                return
+            changed = broadcast['changed']
+            await changed.wait()
+
+    def stats(self):
+        return {'started': self.started, 'joined': self.joined, 'inflight': len(self._inflight)}
+
+    async def _pump(self, key, broadcast, produce):
+        try:
+            async for item in produce():
+                broadcast['items'].append(item)
+                self._notify(broadcast)
+        except Exception as e:
+            logging.warning('共用串流 {} 發生錯誤: {}'.format(key, e))
+        finally:
+            broadcast['done'] = True
+            self._inflight.pop(key, None)
+            self._notify(broadcast)
+
+    @staticmethod
+    def _notify(broadcast):
+        # 以新的 Event 取代舊的，讓等待中的訂閱者醒來後等待下一次更新
+        changed, broadcast['changed'] = broadcast['changed'], asyncio.Event()
+        changed.set()
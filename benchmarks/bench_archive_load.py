@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+比較九個彩種 20 年開獎歷史以 JSON、.npz 與 TaiwanLottery.archive.DrawArchive (mmap) 保存時的檔案大小與載入時間
+
+    python benchmarks/bench_archive_load.py [--years 20] [--number 5]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_draw_memory import synthetic_history  # noqa: E402
+from TaiwanLottery import TaiwanLotteryCrawler  # noqa: E402
+from TaiwanLottery.archive import DrawArchive, load_npz, save_npz  # noqa: E402
+from TaiwanLottery.matrix import DrawMatrix  # noqa: E402
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='開獎歷史檔載入時間比較')
+    parser.add_argument('--years', type=int, default=20)
+    parser.add_argument('--number', type=int, default=5)
+    args = parser.parse_args()
+
+    histories = {game: synthetic_history(game, args.years, seed=i) for i, game in enumerate(TaiwanLotteryCrawler.GAMES)}
+    with tempfile.TemporaryDirectory() as path:
+        json_dir, npz_dir, archive_dir = [os.path.join(path, name) for name in ('json', 'npz', 'archive')]
+        os.makedirs(json_dir)
+        os.makedirs(npz_dir)
+        archive = DrawArchive(archive_dir)
+        for game, datas in histories.items():
+            with open(os.path.join(json_dir, game + '.json'), 'w', encoding='utf-8') as f:
+                json.dump(datas, f, ensure_ascii=False, indent=2)
+            save_npz(os.path.join(npz_dir, game + '.npz'), DrawMatrix.from_draws(datas, game))
+            archive.append(game, datas)
+
+        def load_json():
+            for game in histories:
+                with open(os.path.join(json_dir, game + '.json'), encoding='utf-8') as f:
+                    DrawMatrix.from_draws(json.load(f), game)
+
+        def load_npz_files():
+            for game in histories:
+                load_npz(os.path.join(npz_dir, game + '.npz'))
+
+        def load_archive():
+            for game in archive.games():
+                archive.load(game)
+
+        draws = sum(len(datas) for datas in histories.values())
+        print(f'{args.years} 年 {len(histories)} 個彩種，共 {draws} 期 (皆載入為 DrawMatrix)')
+        print(f"{'格式':<20}{'MB':>10}{'載入 ms':>12}")
+        for name, directory, load in (('JSON (indent=2)', json_dir, load_json), ('.npz', npz_dir, load_npz_files),
+                                      ('DrawArchive (mmap)', archive_dir, load_archive)):
+            seconds = min(timeit.repeat(load, number=1, repeat=args.number))
+            print(f'{name:<20}{directory_size(directory) / 2 ** 20:>10.2f}{seconds * 1000:>12.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+比較九個彩種 20 年開獎歷史以 dict、TaiwanLottery.records.Draw 與 DrawMatrix 保存時的記憶體用量
+
+    python benchmarks/bench_draw_memory.py [--years 20]
+"""
+import argparse
+import datetime
+import gc
+import json
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from TaiwanLottery import TaiwanLotteryCrawler  # noqa: E402
+from TaiwanLottery.matrix import DrawMatrix  # noqa: E402
+from TaiwanLottery.records import Draw  # noqa: E402
+
+# 各彩種每期開出的號碼數，未列出的為 6 個
+PICKS = {'daily_cash': 5, 'lotto39m5': 5, 'lotto1224': 12, 'lotto3d': 3, 'lotto4d': 4}
+
+
+def synthetic_history(game, years, seed=0):
+    """依開獎星期與號碼範圍產生與爬蟲相同格式的開獎資料 (最新一期在前)"""
+    api = TaiwanLotteryCrawler.GAME_API[game]
+    rng = random.Random(seed)
+    low, high = api['number_range']
+    pick = PICKS.get(game, 6)
+    start = datetime.date(2025 - years, 1, 1)
+    datas = []
+    day, period = start, 0
+    while day < datetime.date(2025, 1, 1):
+        if day.weekday() in api['draw_days']:
+            period += 1
+            data = {'期別': (day.year - 1911) * 1000000 + period, '開獎日期': day.isoformat() + 'T00:00:00'}
+            # 3星彩與4星彩每位數可重複，其他彩種取不重複的號碼
+            if game in ('lotto3d', 'lotto4d'):
+                numbers = [rng.randint(low, high) for _ in range(pick)]
+            else:
+                numbers = sorted(rng.sample(range(low, high + 1), pick))
+            if api['split']:
+                data[api['split'][0]] = numbers
+                data[api['split'][1]] = rng.randint(*api['special_range'])
+            else:
+                data['獎號'] = numbers
+            datas.append(data)
+        day += datetime.timedelta(days=1)
+    datas.reverse()
+    return datas
+
+
+def measure(build):
+    # 回傳 build() 結果保留的記憶體 (bytes)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return result, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description='開獎資料記憶體用量比較')
+    parser.add_argument('--years', type=int, default=20)
+    args = parser.parse_args()
+
+    # 以 JSON 解析出的 dict 為基準，每個 dict 與字串都是獨立物件 (與實際解析結果相同)
+    raw = {game: json.dumps(synthetic_history(game, args.years, seed=i)) for i, game in enumerate(TaiwanLotteryCrawler.GAMES)}
+    draws = sum(len(json.loads(text)) for text in raw.values())
+
+    dicts, dict_bytes = measure(lambda: {game: json.loads(text) for game, text in raw.items()})
+    records, record_bytes = measure(lambda: {game: Draw.from_dicts(datas, game) for game, datas in dicts.items()})
+    _, matrix_bytes = measure(lambda: {game: DrawMatrix.from_draws(datas, game) for game, datas in dicts.items()})
+    assert all(records[game] == dicts[game] for game in dicts)
+
+    print(f'{args.years} 年 {len(raw)} 個彩種，共 {draws} 期')
+    print(f"{'格式':<24}{'MB':>10}{'bytes/期':>12}{'比例':>8}")
+    for name, size in (('dict', dict_bytes), ('Draw (__slots__)', record_bytes), ('DrawMatrix (含 incidence)', matrix_bytes)):
+        print(f'{name:<24}{size / 2 ** 20:>10.2f}{size / draws:>12.1f}{size / dict_bytes:>8.2f}')
+
+
+if __name__ == '__main__':
+    main()
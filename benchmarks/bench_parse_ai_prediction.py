@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+比較 backend.prediction_parser 與改寫前 parse_ai_prediction 的解析效能
+
+    python benchmarks/bench_parse_ai_prediction.py [--number 2000]
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.prediction_parser import PredictionParser, parse_ai_prediction  # noqa: E402
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ai_prediction_corpus.json')
+
+
+def legacy_parse_ai_prediction(ai_prediction_text):
+    """
+    改寫前 backend/main.py 的 parse_ai_prediction (依序嘗試多個 regex)，僅供效能比較
+    """
+    if not ai_prediction_text:
+        return None
+
+    recommended_sets = []
+
+    # 根據 Lottery_predict.py 中的提示詞格式，匹配以下格式：
+    # 第一組(冷門號碼組合): [號碼1, 號碼2, 號碼3, 號碼4, 號碼5, 號碼6] + 特別號: 號碼
+    # 第二組(熱門號碼組合): [號碼1, 號碼2, 號碼3, 號碼4, 號碼5, 號碼6] + 特別號: 號碼
+    # 第三組(熱門 + 冷門 混合號碼組合): [號碼1, 號碼2, 號碼3, 號碼4, 號碼5, 號碼6] + 特別號: 號碼
+
+    # 主要匹配模式：第X組(類型): [數字列表] + 特別號: 數字
+    pattern = r'第[一二三四]組\(([^)]+)\):\s*\[([^\]]+)\]\s*\+\s*特別號:\s*(\d+)'
+    matches = re.findall(pattern, ai_prediction_text)
+
+    # 如果沒匹配到，嘗試更寬鬆的格式（可能有額外的符號或格式）
+    if not matches:
+        # 匹配帶有星號或其他格式的版本
+        pattern = r'\*?\*?第[一二三四]組\(([^)]+)\):\*?\*?\s*\[([^\]]+)\]\s*\+\s*特別號:\s*(\d+)'
+        matches = re.findall(pattern, ai_prediction_text)
+
+    # 如果還是沒匹配到，嘗試 Markdown 格式：**彩券號碼:** [數字列表] + **特別號:** 數字
+    if not matches:
+        # 匹配 Markdown 格式的彩券號碼
+        markdown_pattern = r'\*\*彩券號碼:\*\*\s*\[([^\]]+)\]\s*\+\s*\*\*特別號:\*\*\s*(\d+)'
+        markdown_matches = re.findall(markdown_pattern, ai_prediction_text)
+
+        if len(markdown_matches) >= 4:
+            # 確定第一組是冷門，第二組是熱門，第三組是混合，第四組是均衡（根據文本中的順序）
+            for i, match in enumerate(markdown_matches[:4]):
+                numbers_str, special_number_str = match
+                # 解析號碼字符串，處理各種可能的分隔符
+                numbers_str = re.sub(r'[^\d,，、\s]', '', numbers_str)  # 移除非數字、逗號、空格的字符
+                regular_numbers = []
+                for num_str in re.split(r'[,，、\s]+', numbers_str):
+                    if num_str.strip().isdigit():
+                        regular_numbers.append(int(num_str.strip()))
+
+                if len(regular_numbers) == 6:  # 確保有6個號碼
+                    special_number = int(special_number_str)
+                    # 根據文本中的順序判斷類型
+                    if i == 0:
+                        set_type = "冷門號碼組合"
+                    elif i == 1:
+                        set_type = "熱門號碼組合"
+                    elif i == 2:
+                        set_type = "熱門 + 冷門 混合號碼組合"
+                    else:
+                        set_type = "均衡組合"
+                    reason = f"基於歷史資料分析的{set_type}"
+
+                    recommended_sets.append({
+                        "type": set_type,
+                        "regular_numbers": regular_numbers,
+                        "special_number": special_number,
+                        "reason": reason
+                    })
+
+    # 如果還是沒匹配到，嘗試新增的AI LLM格式1: **獎號**: [數字列表] **特別號**: 數字
+    if not matches and not markdown_matches:
+        pattern1 = r'\*\*獎號\*\*:\s*\[([^\]]+)\]\s*\*\*特別號\*\*:\s*(\d+)'
+        matches1 = re.findall(pattern1, ai_prediction_text)
+
+        if matches1:
+            for i, match in enumerate(matches1[:4]):
+                numbers_str, special_number_str = match
+                numbers_str = re.sub(r'[^\d,，、\s]', '', numbers_str)
+                regular_numbers = []
+                for num_str in re.split(r'[,，、\s]+', numbers_str):
+                    if num_str.strip().isdigit():
+                        regular_numbers.append(int(num_str.strip()))
+
+                if len(regular_numbers) == 6:
+                    special_number = int(special_number_str)
+                    if i == 0:
+                        set_type = "冷門號碼組合"
+                    elif i == 1:
+                        set_type = "熱門號碼組合"
+                    elif i == 2:
+                        set_type = "熱門 + 冷門 混合號碼組合"
+                    else:
+                        set_type = "均衡組合"
+                    reason = f"基於歷史資料分析的{set_type}"
+
+                    recommended_sets.append({
+                        "type": set_type,
+                        "regular_numbers": regular_numbers,
+                        "special_number": special_number,
+                        "reason": reason
+                    })
+
+    # 如果還是沒匹配到，嘗試新的格式2: **第X組(類型):** [數字列表] + 特別號: 數字
+    if not matches and not markdown_matches and not recommended_sets:
+        pattern2 = r'\*\*第[一二三四]組\(([^)]+)\):\*\*\s*\[([^\]]+)\]\s*\+\s*特別號:\s*(\d+)'
+        matches2 = re.findall(pattern2, ai_prediction_text)
+
+        if matches2:
+            for match in matches2[:4]:
+                set_type, numbers_str, special_number_str = match
+                numbers_str = re.sub(r'[^\d,，、\s]', '', numbers_str)
+                regular_numbers = []
+                for num_str in re.split(r'[,，、\s]+', numbers_str):
+                    if num_str.strip().isdigit():
+                        regular_numbers.append(int(num_str.strip()))
+
+                if len(regular_numbers) == 6:
+                    special_number = int(special_number_str)
+                    reason = f"基於歷史資料分析的{set_type}"
+
+                    recommended_sets.append({
+                        "type": set_type,
+                        "regular_numbers": regular_numbers,
+                        "special_number": special_number,
+                        "reason": reason
+                    })
+
+    # 如果還是沒匹配到，嘗試最簡單的格式（直接匹配數字組合）
+    if not matches and not recommended_sets:
+        pattern = r'\[([^\]]+)\]\s*\+\s*(?:\*\*)?特別號(?:\*\*)?:\s*(\d+)'
+        simple_matches = re.findall(pattern, ai_prediction_text)
+        if len(simple_matches) >= 4:
+            for i, match in enumerate(simple_matches[:4]):
+                numbers_str, special_number_str = match
+                # 解析號碼字符串，處理各種可能的分隔符
+                numbers_str = re.sub(r'[^\d,，、\s]', '', numbers_str)  # 移除非數字、逗號、空格的字符
+                regular_numbers = []
+                for num_str in re.split(r'[,，、\s]+', numbers_str):
+                    if num_str.strip().isdigit():
+                        regular_numbers.append(int(num_str.strip()))
+
+                if len(regular_numbers) == 6:  # 確保有6個號碼
+                    special_number = int(special_number_str)
+                    if i == 0:
+                        set_type = "冷門號碼組合"
+                    elif i == 1:
+                        set_type = "熱門號碼組合"
+                    elif i == 2:
+                        set_type = "熱門 + 冷門 混合號碼組合"
+                    else:
+                        set_type = "均衡組合"
+                    reason = f"基於歷史資料分析的{set_type}"
+
+                    recommended_sets.append({
+                        "type": set_type,
+                        "regular_numbers": regular_numbers,
+                        "special_number": special_number,
+                        "reason": reason
+                    })
+    else:
+        # 處理帶類型的匹配結果
+        for match in matches[:4]:
+            if len(match) == 3:  # 帶類型的格式
+                set_type, numbers_str, special_number_str = match
+                # 解析號碼字符串，處理各種可能的分隔符和格式
+                numbers_str = re.sub(r'[^\d,，、\s]', '', numbers_str)  # 移除非數字、逗號、空格的字符
+                regular_numbers = []
+                for num_str in re.split(r'[,，、\s]+', numbers_str):
+                    if num_str.strip().isdigit():
+                        regular_numbers.append(int(num_str.strip()))
+
+                if len(regular_numbers) == 6:  # 確保有6個號碼
+                    special_number = int(special_number_str)
+                    reason = f"基於歷史資料分析的{set_type}"
+
+                    recommended_sets.append({
+                        "type": set_type,
+                        "regular_numbers": regular_numbers,
+                        "special_number": special_number,
+                        "reason": reason
+                    })
+
+    return recommended_sets if recommended_sets else None
+
+
+def stream_parse(text, chunk_size=16):
+    # 模擬串流輸出，每次送入 chunk_size 個字元
+    parser = PredictionParser()
+    for start in range(0, len(text), chunk_size):
+        parser.feed(text[start:start + chunk_size])
+    parser.close()
+    return parser.sets or None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='AI 預測文字解析效能比較')
+    parser.add_argument('--number', type=int, default=2000, help='每筆回應重複解析的次數')
+    args = parser.parse_args()
+
+    with open(CORPUS_PATH, encoding='utf-8') as f:
+        corpus = json.load(f)
+
+    print('{:<20}{:>10}{:>12}{:>12}{:>12}{:>10}'.format('format', 'sets', 'legacy us', 'single us', 'stream us', 'speedup'))
+    totals = [0.0, 0.0, 0.0]
+    for record in corpus:
+        text = record['text']
+        sets = parse_ai_prediction(text)
+        assert stream_parse(text) == sets, record['format']
+        timings = [timeit.timeit(lambda: function(text), number=args.number) / args.number * 1e6
+                   for function in (legacy_parse_ai_prediction, parse_ai_prediction, stream_parse)]
+        totals = [total + timing for total, timing in zip(totals, timings)]
+        print('{:<20}{:>10}{:>12.1f}{:>12.1f}{:>12.1f}{:>9.1f}x'.format(record['format'], len(sets or []), *timings, timings[0] / timings[1]))
+    print('{:<20}{:>10}{:>12.1f}{:>12.1f}{:>12.1f}{:>9.1f}x'.format('total', '', *totals, totals[0] / totals[1]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+比較逐期列出的提示詞與 TaiwanLottery.prompt.PromptBuilder 精簡提示詞的 token 數與建構時間
+
+    python benchmarks/bench_prompt_tokens.py [--draws 52 104 260] [--budgets 3000 2000]
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from TaiwanLottery.prompt import PromptBuilder, build_verbose_prompt, estimate_tokens  # noqa: E402
+
+
+def random_draws(count, seed=0):
+    rng = random.Random(seed)
+    datas = []
+    for i in range(count):
+        drawn = rng.sample(range(1, 50), 7)
+        datas.append({'期別': 114000000 + count - i, '開獎日期': '2025-{:02d}-{:02d}T00:00:00'.format(12 - i % 12, 28 - i % 28),
+                      '獎號': sorted(drawn[:6]), '特別號': drawn[6]})
+    return datas
+
+
+def main():
+    parser = argparse.ArgumentParser(description='比較提示詞 token 數')
+    parser.add_argument('--draws', type=int, nargs='+', default=[52, 104, 260])
+    parser.add_argument('--budgets', type=int, nargs='+', default=[3000, 2000])
+    parser.add_argument('--number', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'期數':>6} {'上限':>6} {'逐期列出':>8} {'精簡':>6} {'節省':>6} {'逐期/彙總':>10} {'建構(ms)':>9}")
+    for draws in args.draws:
+        datas = random_draws(draws)
+        verbose_tokens = estimate_tokens(build_verbose_prompt(datas))
+        for budget in [None] + args.budgets:
+            builder = PromptBuilder(budget)
+            _, report = builder.build(datas)
+            seconds = timeit.timeit(lambda: builder.build(datas), number=args.number) / args.number
+            split = f"{report['detailed_draws']}/{report['aggregated_draws']}"
+            print(f"{draws:>6} {str(budget):>6} {verbose_tokens:>8} {report['tokens']:>6} {report['saved_tokens']:>6} {split:>10} {seconds * 1000:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+效能回歸測試: 以 TaiwanLottery.testing.UpstreamStub 回放錄製的上游回應，量測爬蟲、統計、提示詞建構、
+parse_ai_prediction 與後端端點的處理量，結果存成 JSON 供不同版本比較
+
+    python benchmarks/run_benchmarks.py [--label v1] [--output results.json] [--latency 0.05]
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/v1.json [--threshold 0.2] [--fail-on-regression]
+    python benchmarks/run_benchmarks.py --only crawler statistics
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# 後端模組載入時會建立共用的開獎資料庫與背景排程，量測時改用記憶體資料庫並停用排程
+os.environ.setdefault('LOTTERY_DB_PATH', ':memory:')
+os.environ.setdefault('LOTTERY_SCHEDULER', '0')
+
+from bench_prompt_tokens import random_draws  # noqa: E402
+from TaiwanLottery import TaiwanLotteryCrawler  # noqa: E402
+from TaiwanLottery.aio import AsyncTaiwanLotteryCrawler  # noqa: E402
+from TaiwanLottery.matrix import DrawMatrix  # noqa: E402
+from TaiwanLottery.prompt import PromptBuilder  # noqa: E402
+from TaiwanLottery.stats import DrawStatistics, RollingStatistics  # noqa: E402
+from TaiwanLottery.testing import UpstreamStub  # noqa: E402
+
+FIXTURE_DIR = os.path.join(ROOT, 'tests', 'fixtures', 'upstream')
+CORPUS_PATH = os.path.join(ROOT, 'benchmarks', 'ai_prediction_corpus.json')
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+# 各彩種錄製檔的月份
+RECORDED_MONTHS = {
+    'super_lotto': ['2023', '06'], 'lotto649': ['2023', '06'], 'daily_cash': ['2023', '06'], 'lotto1224': ['2023', '06'],
+    'lotto3d': ['2023', '08'], 'lotto4d': ['2023', '08'], 'lotto38m6': ['2023', '08'], 'lotto49m6': ['2023', '07'],
+    'lotto39m5': ['2023', '07'],
+}
+
+
+def crawler_benchmarks(stub):
+    # 不使用 store 與 cache，每次都向 stand-in 擷取並解析九個彩種各一個月份
+    crawler = TaiwanLotteryCrawler()
+    crawler.BASE_URL = stub.base_url
+
+    def fetch_all():
+        for game, back_time in RECORDED_MONTHS.items():
+            getattr(crawler, game)(back_time)
+
+    async_crawler = AsyncTaiwanLotteryCrawler()
+    async_crawler.BASE_URL = stub.base_url
+    loop = asyncio.new_event_loop()
+
+    async def gather_all():
+        await asyncio.gather(*[getattr(async_crawler, game)(back_time) for game, back_time in RECORDED_MONTHS.items()])
+
+    def fetch_all_async():
+        loop.run_until_complete(gather_all())
+
+    yield 'crawler.nine_games_sync', fetch_all
+    yield 'crawler.nine_games_async', fetch_all_async
+    crawler.close()
+    loop.run_until_complete(async_crawler.aclose())
+    loop.close()
+
+
+def statistics_benchmarks(stub):
+    datas = random_draws(1040)
+    matrix = DrawMatrix.from_draws(datas, 'lotto649')
+
+    def rolling():
+        RollingStatistics('lotto649', window=104).extend(datas)
+
+    yield 'statistics.from_draws_1040', lambda: DrawMatrix.from_draws(datas, 'lotto649')
+    yield 'statistics.draw_statistics_1040', lambda: DrawStatistics(matrix)
+    yield 'statistics.rolling_1040', rolling
+
+
+def prompt_benchmarks(stub):
+    builder = PromptBuilder(3000)
+    datas = random_draws(260)
+    yield 'prompt.build_260', lambda: builder.build(datas)
+
+
+def parse_benchmarks(stub):
+    from backend.prediction_parser import parse_ai_prediction
+
+    with open(CORPUS_PATH, encoding='utf-8') as f:
+        texts = [record['text'] for record in json.load(f)]
+
+    def parse_corpus():
+        for text in texts:
+            parse_ai_prediction(text)
+
+    yield 'parse.ai_prediction_corpus', parse_corpus
+
+
+async def asgi_get(app, path, query=''):
+    """不經過 HTTP 與測試客戶端，直接以 ASGI 呼叫一次 GET，回傳狀態碼"""
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': path, 'raw_path': path.encode(), 'query_string': query.encode(), 'root_path': '',
+        'headers': [(b'host', b'benchmark')], 'client': ('127.0.0.1', 0), 'server': ('benchmark', 80),
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    return messages[0]['status']
+
+
+def backend_benchmarks(stub):
+    import backend.main as backend_main
+
+    # 歷史月份第一次由 stand-in 擷取後存入記憶體資料庫，之後的請求量測端點本身的處理量 (單一 worker、單一事件迴圈)
+    backend_main.lottery_crawler.BASE_URL = stub.base_url
+    loop = asyncio.new_event_loop()
+    for path in ('/api/lotto649', '/api/super_lotto', '/api/daily_cash'):
+        assert loop.run_until_complete(asgi_get(backend_main.app, path, 'year=2023&month=06')) == 200, path
+        yield 'backend.' + path.rsplit('/', 1)[-1], lambda path=path: loop.run_until_complete(asgi_get(backend_main.app, path, 'year=2023&month=06'))
+    yield 'backend.health', lambda: loop.run_until_complete(asgi_get(backend_main.app, '/health'))
+    loop.run_until_complete(backend_main.lottery_crawler.aclose())
+    loop.close()
+
+
+SUITES = {
+    'crawler': crawler_benchmarks,
+    'statistics': statistics_benchmarks,
+    'prompt': prompt_benchmarks,
+    'parse': parse_benchmarks,
+    'backend': backend_benchmarks,
+}
+
+
+def measure(function, repeat):
+    # 自動決定每輪次數 (至少 0.2 秒)，取 repeat 輪中最快的一輪
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number)) / number
+    return {'seconds_per_op': best, 'ops_per_sec': 1 / best if best else None, 'number': number, 'repeat': repeat}
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """印出與 baseline 的差異，回傳變慢超過 threshold 的項目"""
+    regressions = []
+    print(f"\n{'benchmark':<36}{'baseline ms':>14}{'current ms':>14}{'change':>10}")
+    for name, result in results.items():
+        base = baseline['results'].get(name)
+        if base is None:
+            print(f"{name:<36}{'-':>14}{result['seconds_per_op'] * 1000:>14.3f}{'new':>10}")
+            continue
+        change = result['seconds_per_op'] / base['seconds_per_op'] - 1
+        flag = ' !' if change > threshold else ''
+        if flag:
+            regressions.append(name)
+        print(f"{name:<36}{base['seconds_per_op'] * 1000:>14.3f}{result['seconds_per_op'] * 1000:>14.3f}{change:>+9.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='效能回歸測試')
+    parser.add_argument('--only', nargs='+', choices=list(SUITES), help='只執行指定的項目')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.0, help='stand-in 上游的回應延遲秒數')
+    parser.add_argument('--label', help='結果標籤，預設為目前的 git commit')
+    parser.add_argument('--output', help='結果檔路徑，預設為 benchmarks/results/<label>.json')
+    parser.add_argument('--compare', help='與先前儲存的結果檔比較')
+    parser.add_argument('--threshold', type=float, default=0.2, help='變慢超過此比例視為回歸')
+    parser.add_argument('--fail-on-regression', action='store_true', help='有回歸時以非 0 結束')
+    args = parser.parse_args()
+
+    revision = git_revision()
+    label = args.label or revision or 'local'
+    results = {}
+    print(f"{'benchmark':<36}{'ms/op':>12}{'ops/s':>12}")
+    with UpstreamStub(FIXTURE_DIR, latency=args.latency) as stub:
+        for suite in args.only or list(SUITES):
+            for name, function in SUITES[suite](stub):
+                results[name] = measure(function, args.repeat)
+                print(f"{name:<36}{results[name]['seconds_per_op'] * 1000:>12.3f}{results[name]['ops_per_sec']:>12.1f}")
+
+    report = {
+        'label': label,
+        'revision': revision,
+        'created_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'latency': args.latency,
+        'results': results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, label + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print('\n結果已儲存至 ' + output)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print('\n變慢超過 {:.0%}: {}'.format(args.threshold, ', '.join(regressions)))
+            if args.fail_on_regression:
+                sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
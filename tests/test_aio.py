@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import threading
+
+import httpx
+import pytest
+
+from TaiwanLottery.aio import AsyncTaiwanLotteryCrawler
+
+
+def test_async_daily_cash():
+    # Given an async crawler whose upstream answers one 今彩539 draw
+    def handler(request):
+        assert request.url.path.endswith('/Daily539Result')
+        return httpx.Response(200, json={'content': {'totalSize': 1, 'daily539Res': [
+            {'period': 112000155, 'lotteryDate': '2023-06-30T00:00:00', 'drawNumberSize': [3, 11, 20, 30, 36]}
+        ]}})
+
+    async def crawl():
+        async with AsyncTaiwanLotteryCrawler(client=httpx.AsyncClient(transport=httpx.MockTransport(handler))) as lottery:
+            return await lottery.daily_cash(['2023', '06'])
+
+    # When user awaits the 今彩539 2023-06 result
+    daily_cash_result = asyncio.run(crawl())
+
+    # Then the result has the same shape as the sync crawler
+    assert daily_cash_result == [{'期別': 112000155, '開獎日期': '2023-06-30T00:00:00', '獎號': [3, 11, 20, 30, 36]}]
+
+
+def test_sync_close_points_to_aclose():
+    # Given an async crawler
+    lottery = AsyncTaiwanLotteryCrawler(client=httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200))))
+
+    # When user uses the sync context manager or close()
+    # Then a TypeError is raised before any work and the client can still be closed with aclose()
+    with pytest.raises(TypeError, match='async with'):
+        with lottery:
+            pass
+    with pytest.raises(TypeError, match='aclose'):
+        lottery.close()
+    asyncio.run(lottery.aclose())
+    assert lottery.client.is_closed
+
+
+def test_async_requests_interleave():
+    # Given an upstream that takes 0.2 seconds per request
+    async def handler(request):
+        await asyncio.sleep(0.2)
+        return httpx.Response(200, json={'content': {'totalSize': 0, 'lotto649Res': []}})
+
+    async def crawl():
+        async with AsyncTaiwanLotteryCrawler(client=httpx.AsyncClient(transport=httpx.MockTransport(handler))) as lottery:
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            await asyncio.gather(*[lottery.lotto649(['2023', str(month).zfill(2)]) for month in range(1, 6)])
+            return loop.time() - start
+
+    # When user awaits five months concurrently
+    elapsed = asyncio.run(crawl())
+
+    # Then the requests run concurrently instead of one after another
+    assert elapsed < 0.6
+
+
+def test_store_runs_off_the_event_loop():
+    # Given a store that records which thread it runs on
+    class RecordingStore():
+        def __init__(self):
+            self.threads = []
+
+        def load_month(self, game, month):
+            self.threads.append(threading.get_ident())
+            return None
+
+        def save(self, game, month, datas, closed=False):
+            self.threads.append(threading.get_ident())
+
+    def handler(request):
+        return httpx.Response(200, json={'content': {'totalSize': 0, 'lotto649Res': []}})
+
+    store = RecordingStore()
+
+    async def crawl():
+        async with AsyncTaiwanLotteryCrawler(store=store, client=httpx.AsyncClient(transport=httpx.MockTransport(handler))) as lottery:
+            await lottery.lotto649(['2023', '06'])
+        return threading.get_ident()
+
+    # When user awaits a closed month
+    loop_thread = asyncio.run(crawl())
+
+    # Then the blocking store calls never run on the event loop thread
+    assert len(store.threads) == 2
+    assert loop_thread not in store.threads
+
+
+def test_fetch_games_shares_one_concurrency_limit():
+    # Given an upstream that takes 0.2 seconds per request and records the peak of concurrent requests
+    active = []
+    peak = []
+
+    async def handler(request):
+        active.append(request)
+        peak.append(len(active))
+        await asyncio.sleep(0.2)
+        active.remove(request)
+        result_key = 'lotto649Res' if request.url.path.endswith('/Lotto649Result') else 'superLotto638Res'
+        month = request.url.params['month']
+        return httpx.Response(200, json={'content': {'totalSize': 1, result_key: [
+            {'period': int(month.replace('-', '')), 'lotteryDate': month + '-01T00:00:00', 'drawNumberSize': [1, 2, 3, 4, 5, 6, 7]}
+        ]}})
+
+    async def crawl():
+        async with AsyncTaiwanLotteryCrawler(client=httpx.AsyncClient(transport=httpx.MockTransport(handler))) as lottery:
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            draws = await lottery.fetch_games(['lotto649', 'super_lotto'], '2023-11', '2024-01', max_workers=6)
+            return draws, loop.time() - start
+
+    # When user fetches two games over three months
+    draws, elapsed = asyncio.run(crawl())
+
+    # Then all six months are fetched at once and grouped by game in descending period order
+    assert elapsed < 0.6 and max(peak) == 6
+    assert [data['期別'] for data in draws['lotto649']] == [202401, 202312, 202311]
+    assert [data['期別'] for data in draws['super_lotto']] == [202401, 202312, 202311]
+    assert draws['super_lotto'][0]['第二區'] == 7
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+import os
+
+import numpy as np
+import pytest
+
+from TaiwanLottery import utils
+from TaiwanLottery.archive import DrawArchive, load_npz, save_npz
+from TaiwanLottery.matrix import DrawMatrix
+from tests.test_stats import random_lotto649_datas
+
+
+def is_mapped(array):
+    while array is not None:
+        if isinstance(array, np.memmap):
+            return True
+        array = array.base
+    return False
+
+
+def test_append_writes_only_new_draws(tmp_path):
+    # Given an archive holding all but the latest 10 draws
+    datas = random_lotto649_datas(200)
+    archive = DrawArchive(str(tmp_path))
+    assert archive.append('lotto649', datas[10:]) == 190
+    size = os.path.getsize(tmp_path / 'lotto649' / 'numbers.bin')
+
+    # When user appends the full history again
+    added = archive.append('lotto649', datas)
+
+    # Then only the 10 new draws are written to the end of each column
+    assert added == 10
+    assert os.path.getsize(tmp_path / 'lotto649' / 'numbers.bin') == size + 10 * 6
+    assert archive.append('lotto649', datas) == 0
+    assert archive.latest_period('lotto649') == datas[0]['期別']
+    assert archive.games() == ['lotto649']
+
+
+def test_load_maps_columns_newest_first(tmp_path):
+    # Given an archive with 200 draws
+    datas = random_lotto649_datas(200)
+    archive = DrawArchive(str(tmp_path))
+    archive.append('lotto649', datas)
+
+    # When user loads it
+    matrix = archive.load('lotto649')
+
+    # Then the columns are memory-mapped and read back as the crawler's dicts, newest first
+    assert is_mapped(matrix.periods) and is_mapped(matrix.numbers) and is_mapped(matrix.specials)
+    assert matrix.to_draws() == datas
+    assert len(archive.load('daily_cash')) == 0
+
+
+def test_append_discards_an_interrupted_tail(tmp_path):
+    # Given an archive whose last append was interrupted after writing part of a column
+    datas = random_lotto649_datas(20)
+    archive = DrawArchive(str(tmp_path))
+    archive.append('lotto649', datas[5:])
+    with open(tmp_path / 'lotto649' / 'periods.bin', 'ab') as f:
+        f.write(b'\x00' * 3)
+
+    # When user loads and appends again
+    loaded = archive.load('lotto649')
+    archive.append('lotto649', datas)
+
+    # Then the partial tail is ignored and then overwritten
+    assert len(loaded) == 15
+    assert archive.load('lotto649').to_draws() == datas
+
+
+def test_append_rejects_a_different_number_count(tmp_path):
+    # Given an archive of 6-number draws
+    archive = DrawArchive(str(tmp_path))
+    archive.append('lotto49m6', [{'期別': 1, '開獎日期': '2023-07-04T00:00:00', '獎號': [1, 2, 3, 4, 5, 6]}])
+
+    # When user appends a draw with 5 numbers
+    # Then a ValueError is raised
+    with pytest.raises(ValueError):
+        archive.append('lotto49m6', [{'期別': 2, '開獎日期': '2023-07-07T00:00:00', '獎號': [1, 2, 3, 4, 5]}])
+
+
+def test_npz_round_trip(tmp_path):
+    # Given 50 draws of 大樂透
+    datas = random_lotto649_datas(50)
+
+    # When user exports them to .npz and reads them back
+    utils.output_to_npz(str(tmp_path / 'lotto649'), datas, 'lotto649')
+    matrix = load_npz(str(tmp_path / 'lotto649.npz'))
+    save_npz(str(tmp_path / 'copy.npz'), matrix)
+
+    # Then the draws are unchanged
+    assert matrix.game == 'lotto649'
+    assert matrix.to_draws() == datas
+    assert load_npz(str(tmp_path / 'copy.npz')).to_draws() == DrawMatrix.from_draws(datas, 'lotto649').to_draws()
@@ -0,0 +1,464 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+import os
+import time
+
+# 後端模組載入時會建立共用的開獎資料庫，測試時改用記憶體資料庫
+os.environ.setdefault('LOTTERY_DB_PATH', ':memory:')
+# 測試時不啟動依開獎日曆查詢上游的背景排程
+os.environ.setdefault('LOTTERY_SCHEDULER', '0')
+
+import pytest  # noqa: E402
+import httpx  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import backend.main as backend_main  # noqa: E402
+from backend.jobs import JobQueue  # noqa: E402
+from TaiwanLottery.aio import AsyncTaiwanLotteryCrawler  # noqa: E402
+from TaiwanLottery.combinations import CombinationIndex  # noqa: E402
+from TaiwanLottery.generator import SelectionRules  # noqa: E402
+from TaiwanLottery.llm_cache import PredictionCache  # noqa: E402
+from TaiwanLottery.matrix import DrawMatrix  # noqa: E402
+from TaiwanLottery.stats import DrawStatistics  # noqa: E402
+from tests.test_stats import random_lotto649_datas  # noqa: E402
+
+STUB_PREDICTION = '''第一組(冷門號碼組合): [6, 12, 31, 34, 36, 42] + 特別號: 1
+第二組(熱門號碼組合): [5, 15, 24, 25, 37, 48] + 特別號: 26
+第三組(熱門 + 冷門 混合號碼組合): [3, 7, 8, 14, 25, 49] + 特別號: 27
+第四組(均衡組合): [2, 4, 5, 33, 36, 40] + 特別號: 13
+'''
+
+
+class StubChunk():
+    def __init__(self, text):
+        self.text = text
+
+
+class StubModel():
+    """以固定文字模擬 Gemini 的串流回應，每次輸出 chunk_size 個字元"""
+
+    def __init__(self, text=STUB_PREDICTION, chunk_size=9):
+        self.text = text
+        self.chunk_size = chunk_size
+        self.prompts = []
+
+    def generate_content(self, prompt, stream=False):
+        self.prompts.append(prompt)
+        return [StubChunk(self.text[i:i + self.chunk_size]) for i in range(0, len(self.text), self.chunk_size)]
+
+
+def read_events(response):
+    events = []
+    for block in response.text.strip().split('\n\n'):
+        event, data = block.split('\n')
+        events.append((event[len('event: '):], json.loads(data[len('data: '):])))
+    return events
+
+
+@pytest.fixture(autouse=True)
+def llm_cache(tmp_path, monkeypatch):
+    # 每個測試使用獨立的 AI 預測快取目錄
+    cache = PredictionCache(str(tmp_path / 'llm_cache'))
+    monkeypatch.setattr(backend_main, 'get_prediction_cache', lambda: cache)
+    return cache
+
+
+def test_stream_predict_sends_statistics_tokens_and_sets(monkeypatch):
+    # Given 30 draws and a stub model
+    model = StubModel()
+    monkeypatch.setattr(backend_main, 'get_six_months_lotto649_data', lambda: random_lotto649_datas(30))
+    monkeypatch.setattr(backend_main, 'create_prediction_model', lambda: model)
+
+    # When user opens the prediction stream
+    with TestClient(backend_main.app) as client:
+        response = client.get('/api/lotto649/predict/stream')
+    events = read_events(response)
+
+    # Then statistics come first, tokens relay the model output and every set is emitted before done
+    assert response.headers['content-type'].startswith('text/event-stream')
+    assert events[0][0] == 'statistics' and events[0][1]['total_periods'] == 30
+    assert ''.join(data['text'] for event, data in events if event == 'token') == STUB_PREDICTION
+    sets = [data for event, data in events if event == 'set']
+    assert [recommended_set['special_number'] for recommended_set in sets] == [1, 26, 27, 13]
+    assert events[-1] == ('done', {'ai_prediction': STUB_PREDICTION, 'recommended_sets': sets})
+    assert len(model.prompts) == 1
+
+
+def test_stream_predict_reports_missing_model(monkeypatch):
+    # Given no API key configured
+    monkeypatch.setattr(backend_main, 'get_six_months_lotto649_data', lambda: random_lotto649_datas(30))
+    monkeypatch.setattr(backend_main, 'create_prediction_model', lambda: None)
+
+    # When user opens the prediction stream
+    with TestClient(backend_main.app) as client:
+        events = read_events(client.get('/api/lotto649/predict/stream'))
+
+    # Then the statistics are still sent before the error
+    assert [event for event, _ in events] == ['statistics', 'error']
+    assert events[1][1]['error'] == backend_main.AI_UNAVAILABLE
+
+
+def test_stream_predict_replays_cached_prediction(monkeypatch, llm_cache):
+    # Given a prediction already streamed for the same draws and refresh enabled
+    monkeypatch.setenv('ALLOW_PREDICTION_REFRESH', '1')
+    model = StubModel()
+    monkeypatch.setattr(backend_main, 'get_six_months_lotto649_data', lambda: random_lotto649_datas(30))
+    monkeypatch.setattr(backend_main, 'create_prediction_model', lambda: model)
+    with TestClient(backend_main.app) as client:
+        first = read_events(client.get('/api/lotto649/predict/stream'))
+
+        # When user opens the stream again, and once more with refresh
+        second = read_events(client.get('/api/lotto649/predict/stream'))
+        assert len(model.prompts) == 1
+        client.get('/api/lotto649/predict/stream', params={'refresh': 'true'})
+
+    # Then the cached text and sets are replayed without calling the model, and refresh calls it again
+    assert second[-1] == first[-1]
+    assert [event for event, _ in second].count('set') == 4
+    assert len(model.prompts) == 2
+    assert llm_cache.stats()['entries'] == 1
+
+
+def test_prediction_job_runs_in_background(monkeypatch):
+    # Given stubbed history, latest period and AI prediction
+    async def latest_period(game):
+        return 100000030
+
+    monkeypatch.setattr(backend_main, 'get_six_months_lotto649_data', lambda: random_lotto649_datas(30))
+    monkeypatch.setattr(backend_main, 'get_latest_period', latest_period)
+    monkeypatch.setattr(backend_main, 'predict_lottery_numbers_with_ai', lambda datas, refresh=False: STUB_PREDICTION)
+    backend_main.prediction_cache.invalidate()
+
+    with TestClient(backend_main.app) as client:
+        # When user creates a job and polls it
+        created = client.post('/api/predict/jobs')
+        job_id = created.json()['id']
+        for _ in range(200):
+            job = client.get(f'/api/predict/jobs/{job_id}').json()
+            if job['status'] in ('succeeded', 'failed'):
+                break
+            time.sleep(0.01)
+        missing = client.get('/api/predict/jobs/unknown')
+
+    # Then the job id comes back immediately and the result matches the predict endpoint
+    assert created.status_code == 202 and created.json()['status'] == 'queued'
+    assert job['status'] == 'succeeded'
+    assert job['result']['data']['latest_period'] == 100000030
+    assert [s['special_number'] for s in job['result']['recommended_sets']] == [1, 26, 27, 13]
+    assert missing.status_code == 404
+    backend_main.prediction_cache.invalidate()
+
+
+def test_prediction_jobs_return_429_when_queue_is_full(monkeypatch):
+    # Given a single worker busy with a slow job and room for one waiting job
+    async def slow_prediction(refresh=False):
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(backend_main, 'prediction_jobs', JobQueue(slow_prediction, max_workers=1, max_queue=1))
+
+    # When three jobs are submitted
+    with TestClient(backend_main.app) as client:
+        responses = [client.post('/api/predict/jobs', json={}) for _ in range(3)]
+
+    # Then the overflow is rejected right away with Retry-After
+    assert responses[0].status_code == 202
+    assert responses[-1].status_code == 429
+    assert responses[-1].headers['retry-after'] == '30'
+
+
+def test_statistics_update_rolling_window_incrementally(monkeypatch):
+    # Given statistics already built for 30 draws
+    datas = random_lotto649_datas(31)
+    monkeypatch.setattr(backend_main, 'rolling_lotto649', None)
+    backend_main.build_lotto649_statistics(datas[1:])
+    rolling = backend_main.rolling_lotto649
+
+    # When a new draw arrives
+    statistics = backend_main.build_lotto649_statistics(datas)
+
+    # Then the same rolling window is extended and matches a full rescan
+    expected = DrawStatistics(DrawMatrix.from_draws(datas, 'lotto649'))
+    assert backend_main.rolling_lotto649 is rolling and rolling.latest_period == datas[0]['期別']
+    assert statistics["frequency_analysis"]["number_frequency"] == dict(expected.ranked_numbers())
+    assert statistics["frequency_analysis"]["hot_numbers"] == expected.hot_numbers(10)
+
+
+def test_combination_count_uses_index_built_after_startup(tmp_path, monkeypatch):
+    # Given an index directory that is still empty
+    monkeypatch.setenv('LOTTERY_INDEX_DIR', str(tmp_path))
+    monkeypatch.setattr(backend_main, 'combination_indexes', {})
+    params = {'sum_min': 0, 'sum_max': 100, 'span_min': 0, 'span_max': 20, 'zone_balanced': 'false', 'sample': 3}
+
+    with TestClient(backend_main.app) as client:
+        # When user counts before, while and after the index is built
+        missing = client.get('/api/combinations/lotto649/count', params=params)
+        (tmp_path / 'lotto649').mkdir()
+        (tmp_path / 'lotto649' / 'numbers.npy').write_bytes(b'\x93NUMPY')
+        partial = client.get('/api/combinations/lotto649/count', params=params)
+        index = CombinationIndex.build(str(tmp_path / 'lotto649'), max_number=12, pick=6, zone_bounds=(4, 8), high_threshold=7)
+        found = client.get('/api/combinations/lotto649/count', params=params)
+        unsupported = client.get('/api/combinations/daily_cash/count')
+        too_many = client.get('/api/combinations/lotto649/count', params={'sample': 101})
+
+    # Then the missing and partial index are not remembered and the count matches the index
+    rules = SelectionRules(sum_range=(0, 100), span_range=(0, 20), zone_counts=None, zone_bounds=(4, 8), high_threshold=7)
+    assert missing.status_code == 503 and partial.status_code == 503
+    assert found.status_code == 200
+    assert found.json()['total'] == len(index) == 924
+    assert found.json()['count'] == index.count(rules)
+    assert len(found.json()['sample']) == 3
+    assert unsupported.status_code == 404 and too_many.status_code == 422
+
+
+def test_recommend_returns_rule_based_sets(monkeypatch):
+    # Given 60 draws of history
+    monkeypatch.setattr(backend_main, 'get_six_months_lotto649_data', lambda: random_lotto649_datas(60))
+
+    # When user asks for two local recommendations per theme with a fixed seed
+    with TestClient(backend_main.app) as client:
+        first = client.get('/api/lotto649/recommend', params={'count': 2, 'seed': 7}).json()
+        second = client.get('/api/lotto649/recommend', params={'count': 2, 'seed': 7}).json()
+        invalid = client.get('/api/lotto649/recommend', params={'count': 11})
+
+    # Then every set follows the selection rules and the seed makes the result reproducible
+    assert first['status'] == 'success' and first['data']['total_periods'] == 60
+    assert len(first['recommended_sets']) == 8
+    for recommended_set in first['recommended_sets']:
+        assert SelectionRules().check(recommended_set['regular_numbers'])
+        assert recommended_set['special_number'] not in recommended_set['regular_numbers']
+    assert first == second
+    assert invalid.status_code == 422
+
+
+def test_simulate_validates_tickets():
+    # Given a valid 大樂透 portfolio and several invalid requests
+    recommended_sets = [{'regular_numbers': [1, 2, 3, 4, 5, 6], 'special_number': 7}]
+    too_many = [{'regular_numbers': [1, 2, 3, 4, 5, 6], 'special_number': 7}] * 21
+
+    # When user posts them to /api/simulate
+    with TestClient(backend_main.app) as client:
+        valid = client.post('/api/simulate', json={'recommended_sets': recommended_sets, 'draws': 1000, 'seed': 1})
+        out_of_range = client.post('/api/simulate', json={'recommended_sets': [{'regular_numbers': [1, 2, 3, 4, 5, 50], 'special_number': 7}]})
+        bad_zone = client.post('/api/simulate', json={'game': 'super_lotto', 'recommended_sets': [
+            {'regular_numbers': [1, 2, 3, 4, 5, 6], 'special_number': 99}]})
+        oversized = client.post('/api/simulate', json={'recommended_sets': too_many})
+
+    # Then only the valid portfolio is simulated
+    assert valid.status_code == 200
+    assert valid.json()['draws'] == 1000 and valid.json()['cost'] == 50
+    assert out_of_range.status_code == 422 and '1 到 49' in out_of_range.json()['detail']
+    assert bad_zone.status_code == 422
+    assert oversized.status_code == 422
+
+
+def test_concurrent_streams_share_one_model_call(monkeypatch):
+    # Given a slow model and no cached prediction
+    class SlowModel(StubModel):
+        def generate_content(self, prompt, stream=False):
+            for chunk in super().generate_content(prompt, stream):
+                time.sleep(0.01)
+                yield chunk
+
+    model = SlowModel()
+    monkeypatch.setattr(backend_main, 'get_six_months_lotto649_data', lambda: random_lotto649_datas(30))
+    monkeypatch.setattr(backend_main, 'create_prediction_model', lambda: model)
+
+    async def open_streams():
+        transport = httpx.ASGITransport(app=backend_main.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            return await asyncio.gather(*[client.get('/api/lotto649/predict/stream') for _ in range(4)])
+
+    # When four visitors open the stream at the same time
+    responses = asyncio.run(open_streams())
+
+    # Then the model is called once and everyone receives the full prediction
+    assert len(model.prompts) == 1
+    for response in responses:
+        assert read_events(response)[-1][1]['ai_prediction'] == STUB_PREDICTION
+
+
+def test_refresh_is_disabled_by_default(monkeypatch):
+    # Given the default configuration
+    monkeypatch.delenv('ALLOW_PREDICTION_REFRESH', raising=False)
+
+    # When an anonymous caller asks to refresh the prediction
+    with TestClient(backend_main.app) as client:
+        responses = [client.get('/api/lotto649/predict', params={'refresh': 'true'}),
+                     client.get('/api/lotto649/predict/stream', params={'refresh': 'true'}),
+                     client.post('/api/predict/jobs', json={'refresh': True})]
+
+    # Then it is forbidden everywhere
+    assert [response.status_code for response in responses] == [403, 403, 403]
+
+
+def test_refresh_does_not_join_normal_computation(monkeypatch):
+    # Given refresh enabled and a slow prediction
+    monkeypatch.setenv('ALLOW_PREDICTION_REFRESH', '1')
+    calls = []
+
+    async def latest_period(game):
+        return 100000030
+
+    async def build_prediction(refresh=False):
+        calls.append(refresh)
+        await asyncio.sleep(0.05)
+        return {"status": "success", "data": {"latest_period": 100000030}, "ai_prediction": f"refresh={refresh}"}
+
+    monkeypatch.setattr(backend_main, 'get_latest_period', latest_period)
+    monkeypatch.setattr(backend_main, 'build_lotto649_prediction', build_prediction)
+    backend_main.prediction_cache.invalidate()
+
+    async def requests():
+        normal, refreshed = await asyncio.gather(backend_main.predict_lotto649(), backend_main.predict_lotto649(refresh=True))
+        return normal, refreshed, await backend_main.predict_lotto649()
+
+    # When a refresh arrives while a normal computation is running
+    normal, refreshed, later = asyncio.run(requests())
+
+    # Then both run, and the refreshed result replaces the kept one
+    assert sorted(calls) == [False, True]
+    assert normal["ai_prediction"] == "refresh=False" and refreshed["ai_prediction"] == "refresh=True"
+    assert later["ai_prediction"] == "refresh=True"
+    backend_main.prediction_cache.invalidate()
+
+
+def test_refresh_after_draw_raises_when_prewarm_fails(monkeypatch):
+    # Given a predict endpoint that cannot fetch history
+    async def failing_predict(refresh=False):
+        return backend_main.PredictionResponse(status="error", error="無法取得大樂透歷史資料")
+
+    monkeypatch.setattr(backend_main, 'predict_lotto649', failing_predict)
+
+    # When the scheduler refreshes after a new 大樂透 period
+    # Then the failure propagates so the scheduler retries on the next poll
+    with pytest.raises(RuntimeError, match='無法取得大樂透歷史資料'):
+        asyncio.run(backend_main.refresh_after_draw('lotto649', 100000031))
+
+
+def test_draws_fetches_games_and_months_in_one_response(monkeypatch):
+    # Given a crawler whose upstream answers one draw for every game and month
+    requests = []
+
+    def handler(request):
+        requests.append((request.url.path.rsplit('/', 1)[-1], request.url.params['month']))
+        api = next(api for api in AsyncTaiwanLotteryCrawler.GAME_API.values() if request.url.path.endswith('/' + api['path']))
+        month = request.url.params['month']
+        return httpx.Response(200, json={'content': {'totalSize': 1, api['result_key']: [
+            {'period': int(month.replace('-', '')), 'lotteryDate': month + '-01T00:00:00', api['number_field']: [1, 2, 3, 4, 5, 6, 7]}
+        ]}})
+
+    crawler = AsyncTaiwanLotteryCrawler(client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(backend_main, 'lottery_crawler', crawler)
+
+    with TestClient(backend_main.app) as client:
+        # When user asks for 大樂透 and 38樂合彩 from 2023-12 to 2024-01
+        response = client.get('/api/draws', params={'games': 'lotto649,lotto38m6', 'from': '2023-12', 'to': '2024-01'})
+        unknown = client.get('/api/draws', params={'games': 'keno'})
+        reversed_range = client.get('/api/draws', params={'from': '2024-02', 'to': '2024-01'})
+        too_long = client.get('/api/draws', params={'from': '2000-01', 'to': '2024-01'})
+
+    # Then both games are returned in one response and every month was fetched once
+    assert response.status_code == 200
+    body = response.json()
+    assert body['from'] == '2023-12' and body['to'] == '2024-01'
+    assert [data['期別'] for data in body['games']['lotto649']] == [202401, 202312]
+    assert body['games']['lotto649'][0]['特別號'] == 7
+    assert body['games']['lotto38m6'][0]['獎號'] == [1, 2, 3, 4, 5, 6, 7]
+    assert sorted(requests) == [('38M6Result', '2023-12'), ('38M6Result', '2024-01'), ('Lotto649Result', '2023-12'), ('Lotto649Result', '2024-01')]
+    assert unknown.status_code == 422 and reversed_range.status_code == 422 and too_long.status_code == 422
+
+
+def test_refresh_after_draw_appends_to_draw_archive(tmp_path, monkeypatch):
+    # Given a draw archive and a crawler whose current month has two 威力彩 draws
+    from TaiwanLottery.archive import DrawArchive
+
+    archive = DrawArchive(str(tmp_path))
+    datas = [
+        {'期別': 114000002, '開獎日期': '2025-01-06T00:00:00', '第一區': [1, 2, 3, 4, 5, 6], '第二區': 1},
+        {'期別': 114000001, '開獎日期': '2025-01-02T00:00:00', '第一區': [7, 8, 9, 10, 11, 12], '第二區': 2},
+    ]
+    archive.append('super_lotto', datas[1:])
+
+    async def crawl(game, back_time=None):
+        return datas
+
+    monkeypatch.setattr(backend_main, 'get_draw_archive', lambda: archive)
+    monkeypatch.setattr(backend_main.lottery_crawler, 'crawl', crawl)
+    monkeypatch.setattr(backend_main, 'draw_history', {})
+    backend_main.load_draw_history()
+
+    # When a new 威力彩 period is drawn
+    asyncio.run(backend_main.refresh_after_draw('super_lotto', 114000002))
+
+    # Then only the new draw is appended and the in-memory history is reloaded
+    assert archive.meta('super_lotto')['count'] == 2
+    assert backend_main.draw_history['super_lotto'].to_draws() == datas
+    with TestClient(backend_main.app) as client:
+        health = client.get('/health').json()
+    assert health['draw_history']['super_lotto'] == {'draws': 2, 'latest_period': 114000002}
+
+
+def test_month_history_serializes_once_per_data_version(monkeypatch):
+    # Given a crawler that counts calls and a current month that gains a new draw
+    calls = []
+    current = [{'期別': 114000002, '開獎日期': '2025-01-06T00:00:00', '獎號': [1, 2, 3, 4, 5, 6], '特別號': 7}]
+    closed = [{'期別': 113000001, '開獎日期': '2023-06-02T00:00:00', '獎號': [8, 9, 10, 11, 12, 13], '特別號': 14}]
+
+    async def crawl(game, back_time=None):
+        calls.append(back_time)
+        return closed if back_time == ['2023', '06'] else list(current)
+
+    monkeypatch.setattr(backend_main.lottery_crawler, 'crawl', crawl)
+    monkeypatch.setattr(backend_main, 'history_responses', backend_main.SerializedCache())
+
+    with TestClient(backend_main.app) as client:
+        # When user asks for a closed month twice and the current month before and after a new draw
+        first = client.get('/api/lotto649', params={'year': '2023', 'month': '06'})
+        second = client.get('/api/lotto649', params={'year': '2023', 'month': '06'})
+        before = client.get('/api/lotto649')
+        current.insert(0, {'期別': 114000003, '開獎日期': '2025-01-09T00:00:00', '獎號': [2, 3, 4, 5, 6, 7], '特別號': 8})
+        after = client.get('/api/lotto649')
+
+    # Then the closed month is served from cached bytes without the crawler and the current month follows new draws
+    assert first.status_code == second.status_code == 200
+    assert first.json() == second.json() == closed
+    assert first.headers['content-type'] == 'application/json'
+    assert calls.count(['2023', '06']) == 1
+    assert len(before.json()) == 1 and len(after.json()) == 2
+    stats = backend_main.history_responses.stats()
+    assert stats['hits'] == 1 and stats['entries'] == 2
+
+
+def test_month_history_sends_etag_cache_control_and_gzip(monkeypatch):
+    # Given a closed month large enough to compress and the current month
+    datas = random_lotto649_datas(30)
+
+    async def crawl(game, back_time=None):
+        return datas
+
+    monkeypatch.setattr(backend_main.lottery_crawler, 'crawl', crawl)
+    monkeypatch.setattr(backend_main, 'history_responses', backend_main.SerializedCache())
+    closed = {'year': '2023', 'month': '06'}
+
+    with TestClient(backend_main.app) as client:
+        # When user downloads the months and then revalidates with the ETag
+        plain = client.get('/api/lotto649', params=closed, headers={'Accept-Encoding': 'identity'})
+        gzipped = client.get('/api/lotto649', params=closed, headers={'Accept-Encoding': 'gzip'})
+        not_modified = client.get('/api/lotto649', params=closed, headers={'If-None-Match': plain.headers['etag']})
+        stale = client.get('/api/lotto649', params=closed, headers={'If-None-Match': '"stale"', 'Accept-Encoding': 'identity'})
+        current = client.get('/api/lotto649', headers={'Accept-Encoding': 'identity'})
+
+    # Then closed months are cached for a long time, revalidation answers 304 and gzip is served pre-compressed
+    assert plain.status_code == 200 and plain.json() == datas
+    assert 'content-encoding' not in plain.headers
+    assert plain.headers['cache-control'] == backend_main.CLOSED_MONTH_CACHE_CONTROL
+    assert plain.headers['vary'].split(', ').count('Accept-Encoding') == 1
+    assert gzipped.headers['vary'].split(', ').count('Accept-Encoding') == 1
+    assert gzipped.headers['content-encoding'] == 'gzip' and gzipped.json() == datas
+    assert gzipped.headers['etag'] != plain.headers['etag']
+    assert int(gzipped.headers['content-length']) < int(plain.headers['content-length'])
+    assert not_modified.status_code == 304 and not_modified.content == b''
+    assert stale.status_code == 200 and stale.json() == datas
+    assert current.headers['cache-control'] == backend_main.CURRENT_MONTH_CACHE_CONTROL
+    assert current.headers['etag'] == plain.headers['etag']
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+import random
+
+import pytest
+
+from TaiwanLottery.backtest import Backtester
+
+from tests.test_stats import random_lotto649_datas
+
+
+def random_super_lotto_datas(count, seed=0):
+    rng = random.Random(seed)
+    return [{'期別': 100000000 + count - i, '開獎日期': '2023-06-29T00:00:00', '第一區': sorted(rng.sample(range(1, 39), 6)), '第二區': rng.randint(1, 8)}
+            for i in range(count)]
+
+
+def random_digit_datas(count, pick, seed=0):
+    rng = random.Random(seed)
+    return [{'期別': 100000000 + count - i, '開獎日期': '2023-06-29T00:00:00', '獎號': [rng.randint(0, 9) for _ in range(pick)]}
+            for i in range(count)]
+
+
+def previous_draws_strategy(statistics, rng, count, pick, rules):
+    # 重複選上一期的號碼，用來確認推薦只看得到之前的開獎資料
+    specials = statistics.matrix.specials
+    return statistics.matrix.numbers[:count], None if specials is None else specials[:count]
+
+
+def test_backtest_is_reproducible_across_workers():
+    # Given 200 random 大樂透 draws
+    backtester = Backtester.from_draws(random_lotto649_datas(200), 'lotto649', window=50, min_history=50, tickets=2, seed=5)
+
+    # When user runs the backtest in-process and with a process pool using different chunking
+    serial = backtester.run(max_workers=1, chunk_size=40)
+    parallel = backtester.run(max_workers=2, chunk_size=75)
+
+    # Then both runs produce identical results for every strategy
+    assert serial == parallel
+    assert serial['draws'] == 150
+    assert list(serial['strategies']) == ['random', 'cold', 'hot', 'mixed', 'balanced']
+    for result in serial['strategies'].values():
+        assert result['tickets'] == 300
+        assert sum(result['hit_distribution'].values()) == 300
+        assert result['cost'] == 300 * 50
+
+
+def test_backtest_scores_against_the_real_draw():
+    # Given 威力彩 draws and a strategy that replays the previous draw
+    datas = random_super_lotto_datas(80)
+    backtester = Backtester.from_draws(datas, 'super_lotto', strategies=[previous_draws_strategy], window=10, min_history=1)
+
+    # When user runs the backtest
+    result = backtester.run(max_workers=1)['strategies']['previous_draws_strategy']
+
+    # Then the hits equal comparing each draw with the one before it
+    ordered = sorted(datas, key=lambda x: x['期別'])
+    expected = [0] * 7
+    for previous, current in zip(ordered, ordered[1:]):
+        expected[len(set(previous['第一區']) & set(current['第一區']))] += 1
+    assert result['hit_distribution'] == dict(enumerate(expected))
+
+
+@pytest.mark.parametrize('game, pick', [('lotto3d', 3), ('lotto4d', 4)])
+def test_backtest_scores_digit_games_by_position(game, pick):
+    # Given 3星彩 / 4星彩 draws and a strategy that replays the previous draw
+    datas = random_digit_datas(80, pick, seed=pick)
+    backtester = Backtester.from_draws(datas, game, strategies=[previous_draws_strategy], window=10, min_history=1)
+
+    # When user runs the backtest and the default strategies
+    result = backtester.run(max_workers=1)['strategies']['previous_draws_strategy']
+    default = Backtester.from_draws(datas, game, window=10, min_history=10, tickets=2).run(max_workers=1)
+
+    # Then hits count equal digits in the same position and the default only uses random tickets of pick digits
+    ordered = sorted(datas, key=lambda x: x['期別'])
+    expected = [0] * (pick + 1)
+    for previous, current in zip(ordered, ordered[1:]):
+        expected[sum(a == b for a, b in zip(previous['獎號'], current['獎號']))] += 1
+    assert result['hit_distribution'] == dict(enumerate(expected))
+    assert list(default['strategies']) == ['random']
+    assert default['strategies']['random']['tickets'] == 70 * 2
+
+
+@pytest.mark.parametrize('game, pick', [('lotto3d', 3), ('lotto4d', 4)])
+def test_backtest_rejects_themes_for_digit_games(game, pick):
+    # Given 3星彩 / 4星彩 draws
+    datas = random_digit_datas(20, pick)
+
+    # When user asks for a theme strategy
+    # Then a ValueError names the unsupported strategy
+    with pytest.raises(ValueError, match='mixed'):
+        Backtester.from_draws(datas, game, strategies=['random', 'mixed'])
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+import time
+
+from TaiwanLottery import TaiwanLotteryCrawler
+from TaiwanLottery.cache import ResponseCache
+
+PAST_URL = 'https://api.taiwanlottery.com/TLCAPIWeB/Lottery/Lotto649Result?period&month=2023-06&pageSize=31'
+CURRENT_URL = 'https://api.taiwanlottery.com/TLCAPIWeB/Lottery/Lotto649Result?period&month=9999-01&pageSize=31'
+
+
+def test_past_month_never_expires_and_current_month_has_ttl():
+    # Given a cache with a one hour TTL on non draw days and five minutes on draw days
+    cache = ResponseCache(current_month_ttl=3600, draw_day_ttl=300)
+
+    # When user asks the TTL of a past month and of the current month
+    # Then the past month never expires and the current month depends on the draw days
+    assert cache.ttl(PAST_URL, (1, 4)) is None
+    assert cache.ttl(CURRENT_URL, ()) == 3600
+    assert cache.ttl(CURRENT_URL, tuple(range(7))) == 300
+
+
+def test_lru_eviction_and_counters():
+    # Given a cache that keeps two entries
+    cache = ResponseCache(max_entries=2)
+    cache.set(PAST_URL + '&a', {'a': 1})
+    cache.set(PAST_URL + '&b', {'b': 1})
+
+    # When the first entry is read and a third entry is added
+    assert cache.get(PAST_URL + '&a') == {'a': 1}
+    cache.set(PAST_URL + '&c', {'c': 1})
+
+    # Then the least recently used entry is evicted and the counters reflect it
+    assert cache.get(PAST_URL + '&b') is None
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+    assert cache.stats()['entries'] == 2
+
+
+def test_disk_tier_survives_new_process(tmp_path):
+    # Given a past month response written through a disk backed cache
+    result = {'content': {'totalSize': 1, 'lotto649Res': [{'period': 112000064}]}}
+    ResponseCache(cache_dir=str(tmp_path)).set(PAST_URL, result)
+
+    # When a fresh cache reads the same URL
+    cache = ResponseCache(cache_dir=str(tmp_path))
+
+    # Then it is served from disk
+    assert cache.get(PAST_URL) == result
+    assert cache.stats()['disk_hits'] == 1
+
+
+def test_empty_past_month_is_not_persisted(tmp_path, monkeypatch):
+    # Given a disk backed cache with a one hour TTL
+    cache = ResponseCache(cache_dir=str(tmp_path), current_month_ttl=3600)
+
+    # When upstream answers a past month with no draws or without content
+    cache.set(PAST_URL, {'content': {'totalSize': 0, 'lotto649Res': []}})
+    cache.set(PAST_URL + '&b', {'rtCode': 0})
+
+    # Then nothing is written to disk and the entries expire like the current month
+    assert list(tmp_path.iterdir()) == []
+    assert ResponseCache(cache_dir=str(tmp_path)).get(PAST_URL) is None
+    assert cache.get(PAST_URL) == {'content': {'totalSize': 0, 'lotto649Res': []}}
+    now = time.monotonic()
+    monkeypatch.setattr(time, 'monotonic', lambda: now + 3601)
+    assert cache.get(PAST_URL) is None
+    assert cache.get(PAST_URL + '&b') is None
+
+
+def test_crawler_uses_cache(monkeypatch):
+    # Given a crawler with a response cache
+    lottery = TaiwanLotteryCrawler(cache=ResponseCache())
+    calls = []
+
+    class FakeResponse():
+        status_code = 200
+
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return {'content': {'totalSize': 0, 'lotto649Res': []}}
+
+    monkeypatch.setattr(lottery.session, 'get', lambda url, timeout: calls.append(url) or FakeResponse())
+
+    # When user gets the same month twice
+    lottery.lotto649(['2023', '06'])
+    lottery.lotto649(['2023', '06'])
+
+    # Then upstream is only queried once
+    assert len(calls) == 1
+    assert lottery.cache.stats()['hits'] == 1
+
+    # And after invalidating the month the next request goes upstream again
+    lottery.invalidate('lotto649', ['2023', '06'])
+    lottery.lotto649(['2023', '06'])
+    assert len(calls) == 2
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+import itertools
+
+from TaiwanLottery.combinations import CombinationIndex
+from TaiwanLottery.generator import SelectionRules
+
+
+def test_index_counts_match_brute_force(tmp_path):
+    # Given an index of every 6-of-16 combination built in small chunks
+    index = CombinationIndex.build(str(tmp_path), max_number=16, pick=6, zone_bounds=(5, 10), high_threshold=9, chunk_size=3000)
+    rules = SelectionRules(odd_counts=(3, ), sum_range=(40, 60), span_range=(8, 13), zone_counts=None, zone_bounds=(5, 10), high_threshold=9)
+
+    # When user counts and queries the combinations that satisfy the rules
+    count = index.count(rules)
+    first = index.query(rules, limit=3)
+
+    # Then the result equals checking every combination one by one
+    expected = [numbers for numbers in itertools.combinations(range(1, 17), 6) if rules.check(list(numbers))]
+    assert len(index) == 8008
+    assert count == len(expected)
+    assert first.tolist() == [list(numbers) for numbers in expected[:3]]
+
+
+def test_reopened_index_is_memory_mapped(tmp_path):
+    # Given a built index
+    CombinationIndex.build(str(tmp_path), max_number=12, pick=6, zone_bounds=(4, 8), high_threshold=7)
+
+    # When another process opens it
+    index = CombinationIndex(str(tmp_path))
+    rules = SelectionRules(odd_counts=(2, 3, 4), sum_range=(0, 100), span_range=(0, 11), zone_counts=(2, 2, 2), zone_bounds=(4, 8),
+                           min_same_tail_groups=0, max_consecutive_pairs=5, max_run=6, high_threshold=7)
+
+    # Then the columns are read-only memory maps and sampling returns valid combinations
+    assert index.numbers.filename is not None
+    assert not index.features['sums'].flags.writeable
+    for numbers in index.sample(rules, 5, seed=1).tolist():
+        assert rules.check(numbers)
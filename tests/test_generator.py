@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+from TaiwanLottery.generator import THEMES, CandidateGenerator, SelectionRules
+from TaiwanLottery.matrix import DrawMatrix
+from TaiwanLottery.stats import DrawStatistics
+
+from tests.test_stats import random_lotto649_datas
+
+
+def test_every_generated_set_satisfies_the_rules():
+    # Given statistics of 50 draws and the default 選號策略 rules
+    statistics = DrawStatistics(DrawMatrix.from_draws(random_lotto649_datas(50), 'lotto649'))
+    generator = CandidateGenerator(statistics, seed=7)
+    rules = SelectionRules()
+
+    # When user asks three sets per theme
+    recommended_sets = generator.recommend(per_theme=3)
+
+    # Then every set is valid, distinct and has a special number outside the regular numbers
+    assert [recommended_set['type'] for recommended_set in recommended_sets] == [theme for theme in THEMES.values() for _ in range(3)]
+    assert len({tuple(recommended_set['regular_numbers']) for recommended_set in recommended_sets}) == 12
+    for recommended_set in recommended_sets:
+        numbers = recommended_set['regular_numbers']
+        assert len(set(numbers)) == 6 and all(1 <= number <= 49 for number in numbers)
+        assert rules.check(numbers)
+        assert 120 <= sum(numbers) <= 160
+        assert 30 <= max(numbers) - min(numbers) <= 40
+        assert recommended_set['special_number'] not in numbers
+
+
+def test_mixed_theme_combines_hot_and_cold_numbers():
+    # Given a generator over 50 random draws
+    statistics = DrawStatistics(DrawMatrix.from_draws(random_lotto649_datas(50), 'lotto649'))
+    generator = CandidateGenerator(statistics, seed=3)
+    hot = {number for number, _ in statistics.hot_numbers(10)}
+    cold = {number for number, _ in statistics.ranked_numbers()[-10:]} | set(statistics.never_appeared())
+
+    # When user generates mixed sets
+    sets = generator.generate('mixed', 5).tolist()
+
+    # Then each set has two or three hot numbers and at least two cold numbers
+    for numbers in sets:
+        assert 2 <= len(hot & set(numbers)) <= 3
+        assert len(cold & set(numbers)) >= 2
+
+
+def test_same_seed_is_reproducible():
+    statistics = DrawStatistics(DrawMatrix.from_draws(random_lotto649_datas(50), 'lotto649'))
+    assert CandidateGenerator(statistics, seed=1).generate('hot', 2).tolist() == CandidateGenerator(statistics, seed=1).generate('hot', 2).tolist()
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+import pytest
+
+from backend.jobs import JobQueue, QueueFull
+
+
+def test_jobs_run_on_bounded_workers():
+    # Given a queue with two workers and slow jobs
+    running = []
+    peak = []
+
+    async def run(value):
+        running.append(value)
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        running.remove(value)
+        if value == 3:
+            raise ValueError('bad input')
+        return value * 10
+
+    async def scenario():
+        queue = JobQueue(run, max_workers=2, max_queue=8)
+        jobs = [queue.submit(value=value) for value in range(5)]
+        assert queue.position(jobs[4]['id']) == 4
+        while queue.stats()['succeeded'] + queue.stats()['failed'] < 5:
+            await asyncio.sleep(0.005)
+        await queue.stop()
+        return queue, jobs
+
+    # When five jobs are submitted at once
+    queue, jobs = asyncio.run(scenario())
+
+    # Then at most two run together, results are kept and failures carry the error
+    assert max(peak) == 2
+    assert [queue.get(job['id'])['result'] for job in jobs] == [0, 10, 20, None, 40]
+    assert queue.get(jobs[3]['id'])['status'] == 'failed' and queue.get(jobs[3]['id'])['error'] == 'bad input'
+    assert queue.position(jobs[0]['id']) is None
+
+
+def test_full_queue_rejects_immediately_and_old_results_are_trimmed():
+    # Given a queue that keeps one waiting job and one finished job
+    release = []
+
+    async def run(value):
+        while not release:
+            await asyncio.sleep(0.001)
+        return value
+
+    async def scenario():
+        queue = JobQueue(run, max_workers=1, max_queue=1, max_finished=1)
+        first = queue.submit(value=1)
+        await asyncio.sleep(0.005)
+        second = queue.submit(value=2)
+        with pytest.raises(QueueFull):
+            queue.submit(value=3)
+        release.append(True)
+        while queue.get(second['id'])['status'] != 'succeeded':
+            await asyncio.sleep(0.001)
+        await queue.stop()
+        return queue, first, second
+
+    # When a third job arrives while one runs and one waits
+    queue, first, second = asyncio.run(scenario())
+
+    # Then it is rejected, and only the newest finished job is kept
+    assert queue.stats()['rejected'] == 1
+    assert queue.get(first['id']) is None
+    assert queue.get(second['id'])['result'] == 2
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+import os
+
+from TaiwanLottery.llm_cache import PredictionCache
+from tests.test_stats import random_lotto649_datas
+
+
+def test_key_depends_on_model_version_and_periods():
+    # Given the same draws in two orders and a newer window
+    datas = random_lotto649_datas(30)
+    newer = random_lotto649_datas(31)
+
+    # When user computes the cache keys
+    key = PredictionCache.key('gemini-2.5-flash', 1, datas)
+
+    # Then order does not matter but model, prompt version and periods do
+    assert key == PredictionCache.key('gemini-2.5-flash', 1, list(reversed(datas)))
+    assert key != PredictionCache.key('gemini-2.5-flash', 2, datas)
+    assert key != PredictionCache.key('gemini-2.5-pro', 1, datas)
+    assert key != PredictionCache.key('gemini-2.5-flash', 1, newer)
+
+
+def test_set_get_and_update(tmp_path):
+    # Given a cached prediction without parsed sets
+    cache = PredictionCache(str(tmp_path))
+    cache.set('a', '第一組...', model='gemini-2.5-flash')
+
+    # When user adds the parsed sets
+    assert cache.update('a', recommended_sets=[{'special_number': 1}])
+
+    # Then the text, metadata and sets are kept, and missing keys are misses
+    entry = cache.get('a')
+    assert entry['text'] == '第一組...' and entry['model'] == 'gemini-2.5-flash'
+    assert entry['recommended_sets'] == [{'special_number': 1}]
+    assert cache.get('b') is None and not cache.update('b', recommended_sets=[])
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_evicts_least_recently_used(tmp_path):
+    # Given a cache holding at most two entries
+    cache = PredictionCache(str(tmp_path), max_entries=2)
+    cache.set('a', 'A')
+    cache.set('b', 'B')
+    os.utime(cache._path('a'), (1, 1))
+    os.utime(cache._path('b'), (2, 2))
+    cache.get('a')
+
+    # When user adds a third entry
+    cache.set('c', 'C')
+
+    # Then the least recently read entry is removed
+    assert cache.get('b') is None
+    assert cache.get('a')['text'] == 'A' and cache.get('c')['text'] == 'C'
+
+
+def test_evicts_by_size(tmp_path):
+    # Given a cache smaller than two entries
+    cache = PredictionCache(str(tmp_path), max_bytes=300)
+    cache.set('a', 'x' * 200)
+    os.utime(cache._path('a'), (1, 1))
+
+    # When user adds another large entry
+    cache.set('b', 'y' * 200)
+
+    # Then only the newest entry is kept
+    assert cache.stats()['entries'] == 1 and cache.get('b') is not None
@@ -1,5 +1,30 @@
 # -*- coding: utf-8 -*-
+import os
+import threading
+import time
+
+import pytest
+import requests
+
 from TaiwanLottery import TaiwanLotteryCrawler
+from TaiwanLottery.testing import UpstreamStub
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'upstream')
+# 設定 LOTTERY_LIVE_TESTS=1 時改為直接呼叫台灣彩券 API
+LIVE = os.getenv('LOTTERY_LIVE_TESTS') == '1'
+
+
+@pytest.fixture(scope='module')
+def upstream():
+    with UpstreamStub(FIXTURE_DIR) as stub:
+        yield stub
+
+
+@pytest.fixture(autouse=True)
+def replay_upstream(request, monkeypatch):
+    # 預設以錄製的回應取代上游 API，測試不需連網
+    if not LIVE:
+        monkeypatch.setattr(TaiwanLotteryCrawler, 'BASE_URL', request.getfixturevalue('upstream').base_url)
 
 
 def test_super_lotto():
@@ -280,5 +305,141 @@ def test_lotto39m5():
         {'期別': 112000156, '開獎日期': '2023-07-01T00:00:00', '獎號': [7, 8, 12, 22, 39]}
     ]
 
+
+class FakeResponse():
+    def __init__(self, status_code, payload=None):
+        self.status_code = status_code
+        self.payload = payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(str(self.status_code))
+
+    def json(self):
+        return self.payload
+
+
+def test_get_lottery_result_retries_on_server_error(monkeypatch):
+    # Given upstream fails once with 503 and a connection error before answering
+    lottery = TaiwanLotteryCrawler(timeout=(1, 2), retries=3)
+    responses = [FakeResponse(503), requests.exceptions.ConnectionError(), FakeResponse(200, {'content': {}})]
+    calls = []
+
+    def fake_get(url, timeout):
+        calls.append(timeout)
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    monkeypatch.setattr(lottery.session, 'get', fake_get)
+    monkeypatch.setattr(time, 'sleep', lambda seconds: None)
+
+    # When user gets the lottery result
+    result = lottery.get_lottery_result('https://example.com')
+
+    # Then the request is retried on the same session with the configured timeout
+    assert result == {'content': {}}
+    assert calls == [(1, 2)] * 3
+
+
+def test_get_lottery_result_gives_up_after_retries(monkeypatch):
+    # Given upstream always answers 500
+    lottery = TaiwanLotteryCrawler(retries=2)
+    monkeypatch.setattr(lottery.session, 'get', lambda url, timeout: FakeResponse(500))
+    monkeypatch.setattr(time, 'sleep', lambda seconds: None)
+
+    # When user gets the lottery result
+    # Then the HTTP error is raised after the last retry
+    with pytest.raises(requests.exceptions.HTTPError):
+        lottery.get_lottery_result('https://example.com')
+
+
+def test_fetch_range_merges_months_by_period(monkeypatch):
+    # Given upstream answers each month only after all three months are requested and repeats one period in two months
+    lottery = TaiwanLotteryCrawler()
+    barrier = threading.Barrier(3, timeout=10)
+    lock = threading.Lock()
+    inflight = {'now': 0, 'peak': 0}
+    monthly = {
+        '2023-12': [(112000120, '2023-12-29T00:00:00')],
+        '2024-01': [(113000002, '2024-01-05T00:00:00'), (113000001, '2024-01-02T00:00:00')],
+        '2024-02': [(113000001, '2024-01-02T00:00:00'), (113000003, '2024-02-02T00:00:00')],
+    }
+
+    def fake_get_lottery_result(url):
+        with lock:
+            inflight['now'] += 1
+            inflight['peak'] = max(inflight['peak'], inflight['now'])
+        # 依序擷取時第一個請求會等到逾時並拋出 BrokenBarrierError
+        barrier.wait()
+        with lock:
+            inflight['now'] -= 1
+        month = url.split('month=')[1][:7]
+        return {'content': {'totalSize': len(monthly[month]), 'lotto649Res': [
+            {'period': period, 'lotteryDate': date, 'drawNumberSize': [1, 2, 3, 4, 5, 6, 7]} for period, date in monthly[month]
+        ]}}
+
+    monkeypatch.setattr(lottery, 'get_lottery_result', fake_get_lottery_result)
+
+    # When user fetches 2023-12 to 2024-02
+    result = lottery.fetch_range('lotto649', '2023-12', '2024-02')
+
+    # Then periods are unique, in descending order and the three months were in flight at the same time
+    assert [data['期別'] for data in result] == [113000003, 113000002, 113000001, 112000120]
+    assert inflight['peak'] == 3
+
+
+def test_fetch_games_groups_draws_by_game():
+    # Given the recorded 2023-06 results of 大樂透 and 威力彩
+    lottery = TaiwanLotteryCrawler()
+
+    # When user fetches both games for 2023-06 at once
+    draws = lottery.fetch_games(['lotto649', 'super_lotto'], '2023-06', '2023-06')
+
+    # Then each game has the same draws as its own method
+    assert draws == {'lotto649': lottery.lotto649(['2023', '06']), 'super_lotto': lottery.super_lotto(['2023', '06'])}
+    assert len(draws['super_lotto']) == 9
+
+
+def test_crawl_rejects_unknown_game():
+    # Given a crawler
+    lottery = TaiwanLotteryCrawler()
+
+    # When user crawls an unknown game
+    # Then a ValueError is raised before any request
+    with pytest.raises(ValueError):
+        lottery.crawl('keno', ['2023', '06'])
+
+
+def test_upstream_stub_returns_empty_result_for_unrecorded_month():
+    # Given a stand-in upstream without a recording for 大樂透 2001-01
+    with UpstreamStub(FIXTURE_DIR) as stub:
+        lottery = TaiwanLotteryCrawler()
+        lottery.BASE_URL = stub.base_url
+
+        # When user gets the 大樂透 2001-01 result
+        result = lottery.lotto649(['2001', '01'])
+
+    # Then the month is empty like the real API answers
+    assert result == []
+    assert stub.stats() == {'requests': 1, 'errors': 0}
+
+
+def test_upstream_stub_injects_errors(monkeypatch):
+    # Given a stand-in upstream that always answers 503
+    monkeypatch.setattr(time, 'sleep', lambda seconds: None)
+    with UpstreamStub(FIXTURE_DIR, error_rate=1.0, error_status=503) as stub:
+        lottery = TaiwanLotteryCrawler(retries=2)
+        lottery.BASE_URL = stub.base_url
+
+        # When user gets the 大樂透 2023-06 result
+        # Then the crawler retries and finally raises the HTTP error
+        with pytest.raises(requests.exceptions.HTTPError):
+            lottery.lotto649(['2023', '06'])
+
+    assert stub.stats() == {'requests': 3, 'errors': 3}
+
+
 if __name__ == "__main__":
     test_lotto649()   
\ No newline at end of file
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from TaiwanLottery.matrix import DrawMatrix
+
+LOTTO649_DATAS = [
+    {'期別': 112000064, '開獎日期': '2023-06-30T00:00:00', '獎號': [6, 22, 26, 29, 32, 43], '特別號': 38},
+    {'期別': 112000063, '開獎日期': '2023-06-27T00:00:00', '獎號': [13, 24, 30, 37, 43, 44], '特別號': 4},
+    {'期別': 112000062, '開獎日期': '2023-06-23T00:00:00', '獎號': [4, 8, 23, 31, 42, 49], '特別號': 16},
+]
+
+
+def test_round_trip_lotto649():
+    # Given 大樂透 draws from the crawler
+    # When user converts them to a DrawMatrix and back
+    matrix = DrawMatrix.from_draws(LOTTO649_DATAS, 'lotto649')
+
+    # Then the incidence matrix marks the drawn numbers and the dicts are unchanged
+    assert matrix.incidence.shape == (3, 49)
+    assert matrix.incidence.dtype == np.uint8
+    assert matrix.incidence[0, 6 - 1] == 1
+    assert matrix.incidence.sum(axis=0)[43 - 1] == 2
+    assert matrix.special_incidence[1, 4 - 1] == 1
+    assert matrix.to_draws() == LOTTO649_DATAS
+
+
+def test_super_lotto_and_digit_games():
+    # Given a 威力彩 draw and a 3星彩 draw with a repeated digit
+    super_lotto = DrawMatrix.from_draws([{'期別': 112000052, '開獎日期': '2023-06-29T00:00:00', '第一區': [1, 8, 26, 27, 29, 36], '第二區': 2}], 'super_lotto')
+    lotto3d = DrawMatrix.from_draws([{'期別': 112000155, '開獎日期': '2023-06-30T00:00:00', '獎號': [1, 1, 0]}], 'lotto3d')
+
+    # Then the special zone uses its own range and digits are counted from 0
+    assert super_lotto.special_incidence.shape == (1, 8)
+    assert lotto3d.incidence.tolist() == [[1, 2, 0, 0, 0, 0, 0, 0, 0, 0]]
+    assert lotto3d.to_draws()[0]['獎號'] == [1, 1, 0]
+
+
+def test_head_and_sort():
+    # Given a DrawMatrix in ascending period order
+    matrix = DrawMatrix.from_draws(LOTTO649_DATAS[::-1], 'lotto649')
+
+    # When user sorts it and takes the latest two draws
+    latest = matrix.sort().head(2)
+
+    # Then the newest periods come first
+    assert latest.periods.tolist() == [112000064, 112000063]
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+from backend.prediction_parser import PredictionParser, parse_ai_prediction
+
+PRIMARY_TEXT = '''第一組(冷門號碼組合): [6, 12, 31, 34, 36, 42] + 特別號: 1
+第二組(熱門號碼組合): [5, 15, 24, 25, 37, 48] + 特別號: 26
+第三組(熱門 + 冷門 混合號碼組合): [3, 7, 8, 14, 25, 49] + 特別號: 27
+第四組(均衡組合): [2, 4, 5, 33, 36, 40] + 特別號: 13'''
+
+
+def test_parse_primary_format():
+    # When user parses the format requested by the prompt
+    recommended_sets = parse_ai_prediction(PRIMARY_TEXT)
+
+    # Then four typed sets are returned
+    assert [recommended_set['type'] for recommended_set in recommended_sets] == ['冷門號碼組合', '熱門號碼組合', '熱門 + 冷門 混合號碼組合', '均衡組合']
+    assert recommended_sets[0] == {
+        "type": "冷門號碼組合",
+        "regular_numbers": [6, 12, 31, 34, 36, 42],
+        "special_number": 1,
+        "reason": "基於歷史資料分析的冷門號碼組合"
+    }
+    assert recommended_sets[3]['special_number'] == 13
+
+
+def test_parse_markdown_variants_in_one_response():
+    # Given a response mixing bold headings, markdown labels and full-width punctuation
+    text = '''**第一組(冷門號碼組合):** [1, 9, 17, 28, 36, 44] + 特別號: 3
+### 熱門
+**彩券號碼:** [2、10、18、29、37、45] + **特別號:** 4
+**第三組（熱門 + 冷門 混合號碼組合）**
+**獎號**: [3, 11, 19, 30, 38, 46] **特別號**： 5
+[4, 12, 20, 31, 39, 47] + 特別號: 6'''
+
+    # When user parses it
+    recommended_sets = parse_ai_prediction(text)
+
+    # Then every set is found and untyped sets take the type of their position
+    assert [recommended_set['type'] for recommended_set in recommended_sets] == ['冷門號碼組合', '熱門號碼組合', '熱門 + 冷門 混合號碼組合', '均衡組合']
+    assert [recommended_set['special_number'] for recommended_set in recommended_sets] == [3, 4, 5, 6]
+    assert recommended_sets[1]['regular_numbers'] == [2, 10, 18, 29, 37, 45]
+
+
+def test_invalid_sets_are_rejected():
+    # Given sets with a duplicate number, a number out of range and a special number among the regular numbers
+    parser = PredictionParser()
+    text = '''第一組(冷門號碼組合): [1, 1, 2, 3, 4, 5] + 特別號: 6
+第二組(熱門號碼組合): [3, 8, 15, 22, 41, 52] + 特別號: 9
+第三組(熱門 + 冷門 混合號碼組合): [4, 9, 16, 23, 30, 38] + 特別號: 16
+第四組(均衡組合): [5, 12, 19, 26, 33] + 特別號: 47
+第五組(均衡組合): [5, 12, 19, 26, 33, 40] + 特別號: 47'''
+
+    # When user parses it
+    parser.close(text)
+
+    # Then only the valid set is returned
+    assert [recommended_set['regular_numbers'] for recommended_set in parser.sets] == [[5, 12, 19, 26, 33, 40]]
+    assert len(parser.rejected) == 4
+    assert parse_ai_prediction('抱歉，目前無法提供預測') is None
+
+
+def test_streaming_parse_matches_full_parse():
+    # Given the response split into small chunks, including a split inside the two-digit special number
+    text = '分析如下：\n' + '號碼分析。' * 200 + '\n' + PRIMARY_TEXT + '\n'
+    split_at = text.index('特別號: 26') + len('特別號: 2')
+    chunks = [text[i:i + 7] for i in range(0, split_at, 7)] + [text[split_at:]]
+    parser = PredictionParser()
+
+    # When user feeds the chunks one by one
+    emitted = []
+    for chunk in chunks:
+        emitted.append(parser.feed(chunk))
+    emitted.append(parser.close())
+
+    # Then the sets are emitted as soon as they are complete and equal the full parse
+    assert [recommended_set for found in emitted for recommended_set in found] == parse_ai_prediction(text)
+    assert [recommended_set['special_number'] for recommended_set in parser.sets] == [1, 26, 27, 13]
+    assert sum(1 for found in emitted if found) >= 2
+
+
+def test_streaming_keeps_heading_far_before_its_set():
+    # Given a heading followed by a long reason before its numbers
+    text = '第二組(熱門號碼組合):\n選號理由: ' + '近期熱門號碼。' * 60 + '\n[5, 15, 24, 25, 37, 48] + 特別號: 26\n'
+    parser = PredictionParser()
+
+    # When user feeds it in small chunks
+    for i in range(0, len(text), 7):
+        parser.feed(text[i:i + 7])
+    parser.close()
+
+    # Then the set keeps the heading's type, the same as the full parse
+    assert parser.sets == parse_ai_prediction(text)
+    assert parser.sets[0]['type'] == '熱門號碼組合'
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from TaiwanLottery.prizes import PrizeTable, popcount, to_bitmask
+
+
+def score(table, ticket, draw, draw_special, ticket_special=0):
+    tiers = table.score_tickets(to_bitmask([ticket]), np.array([ticket_special]), to_bitmask([draw]), np.array([draw_special]))
+    index = int(tiers[0, 0])
+    return None if index == table.no_prize else table.names[index]
+
+
+def test_lotto649_special_number_comes_from_the_same_pool():
+    # Given the 大樂透 prize table and a draw of 1-6 with 特別號 7
+    table = PrizeTable.for_game('lotto649')
+    draw = [1, 2, 3, 4, 5, 6]
+
+    # When user scores tickets against the draw
+    # Then a ticket containing the 特別號 upgrades the tier
+    assert score(table, [1, 2, 3, 4, 5, 6], draw, 7) == '頭獎'
+    assert score(table, [1, 2, 3, 4, 5, 7], draw, 7) == '貳獎'
+    assert score(table, [1, 2, 3, 4, 5, 8], draw, 7) == '參獎'
+    assert score(table, [1, 2, 3, 7, 8, 9], draw, 7) == '陸獎'
+    assert score(table, [1, 2, 3, 8, 9, 10], draw, 7) == '普獎'
+    assert score(table, [1, 2, 7, 8, 9, 10], draw, 7) == '柒獎'
+    assert score(table, [1, 2, 8, 9, 10, 11], draw, 7) is None
+
+
+def test_super_lotto_second_zone_is_matched_separately():
+    # Given the 威力彩 prize table and a draw of 1-6 with 第二區 3
+    table = PrizeTable.for_game('super_lotto')
+    draw = [1, 2, 3, 4, 5, 6]
+
+    # When user scores tickets with different 第二區 numbers
+    # Then the 第二區 number must equal the drawn one and is not looked up in 第一區
+    assert score(table, [1, 2, 3, 4, 5, 6], draw, 3, ticket_special=3) == '頭獎'
+    assert score(table, [1, 2, 3, 4, 5, 6], draw, 3, ticket_special=4) == '貳獎'
+    assert score(table, [1, 10, 11, 12, 13, 14], draw, 3, ticket_special=3) == '普獎'
+    assert score(table, [1, 10, 11, 12, 13, 14], draw, 3, ticket_special=4) is None
+    assert score(table, [1, 2, 3, 10, 11, 12], draw, 3, ticket_special=4) == '玖獎'
+
+
+def test_digit_games_score_by_position():
+    # Given the 3星彩 table and a draw of 1 2 3
+    table = PrizeTable.for_game('lotto3d', pick=3)
+    tickets = [[1, 2, 3], [3, 2, 1], [1, 1, 1], [4, 5, 6]]
+
+    # When user scores tickets with reordered and repeated digits
+    tiers, hits = table.score_positional(tickets, [[1, 2, 3]])
+
+    # Then only digits in the same position count
+    assert table.positional
+    assert hits.tolist() == [[3, 1, 1, 0]]
+    assert [None if index == table.no_prize else table.names[index] for index in tiers[0]] == ['中3位', '中1位', '中1位', None]
+
+
+def test_popcount_matches_python_bit_count():
+    # Given random 64-bit values
+    values = np.random.default_rng(1).integers(0, 2 ** 63, size=1000, dtype=np.uint64)
+
+    # When user counts the bits
+    # Then the result equals counting the binary digits
+    assert popcount(values).tolist() == [bin(int(value)).count('1') for value in values]
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+from TaiwanLottery.prompt import PREDICTION_INSTRUCTIONS, PromptBuilder, build_verbose_prompt, estimate_tokens
+from tests.test_stats import random_lotto649_datas
+
+
+def test_compact_prompt_lists_every_draw_and_saves_tokens():
+    # Given half a year of 大樂透 draws
+    datas = random_lotto649_datas(52)
+
+    # When user builds the prompt without a budget
+    prompt, report = PromptBuilder().build(datas)
+
+    # Then every draw has one row, the instructions are unchanged and the prompt is smaller than the verbose one
+    assert report['detailed_draws'] == 52 and report['aggregated_draws'] == 0
+    assert prompt.endswith(PREDICTION_INSTRUCTIONS)
+    assert f"{' '.join(map(str, sorted(datas[0]['獎號'])))}+{datas[0]['特別號']}" in prompt
+    assert report['tokens'] == estimate_tokens(prompt)
+    assert report['baseline_tokens'] == estimate_tokens(build_verbose_prompt(datas))
+    assert report['saved_tokens'] > 0 and report['tokens'] < report['baseline_tokens']
+
+
+def test_budget_aggregates_older_draws():
+    # Given a budget smaller than the full compact prompt
+    datas = random_lotto649_datas(52)
+    _, full = PromptBuilder().build(datas)
+    budget = full['tokens'] - 300
+
+    # When user builds the prompt with the budget
+    prompt, report = PromptBuilder(budget).build(datas)
+
+    # Then the newest draws are kept, the rest are summarised and the budget is met
+    assert 0 < report['detailed_draws'] < 52
+    assert report['detailed_draws'] + report['aggregated_draws'] == 52
+    assert report['tokens'] <= budget
+    assert f"較早{report['aggregated_draws']}期" in prompt
+    assert f"{' '.join(map(str, sorted(datas[0]['獎號'])))}+{datas[0]['特別號']}" in prompt
+
+
+def test_budget_below_minimum_returns_smallest_prompt():
+    # Given a budget too small for any draw rows
+    datas = random_lotto649_datas(52)
+
+    # When user builds the prompt
+    prompt, report = PromptBuilder(100).build(datas)
+
+    # Then only the overall vectors remain
+    assert report['detailed_draws'] == 0 and report['aggregated_draws'] == 52
+    assert '較早' not in prompt
+    assert prompt.endswith(PREDICTION_INSTRUCTIONS)
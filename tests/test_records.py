@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+import json
+import pickle
+
+import pytest
+
+from TaiwanLottery import TaiwanLotteryCrawler
+from TaiwanLottery.matrix import DrawMatrix
+from TaiwanLottery.records import Draw
+
+LOTTO649 = {'期別': 112000064, '開獎日期': '2023-06-30T00:00:00', '獎號': [6, 22, 26, 29, 32, 43], '特別號': 38}
+
+
+def test_draw_reads_like_the_crawler_dict():
+    # Given a 大樂透 draw packed into a Draw
+    draw = Draw.from_dict(LOTTO649, 'lotto649')
+
+    # When user reads it with the dict keys
+    # Then every key, the dict view and equality match the original dict
+    assert draw['期別'] == 112000064 and draw['特別號'] == 38
+    assert draw['獎號'] == [6, 22, 26, 29, 32, 43]
+    assert draw['開獎日期'] == '2023-06-30T00:00:00'
+    assert list(draw) == list(LOTTO649)
+    assert draw == LOTTO649 and draw.to_dict() == LOTTO649
+    assert json.dumps(draw.to_dict(), ensure_ascii=False) == json.dumps(LOTTO649, ensure_ascii=False)
+    assert draw.get('第二區') is None
+    with pytest.raises(KeyError):
+        draw['第二區']
+
+
+def test_draw_is_slotted_and_picklable():
+    # Given a Draw
+    draw = Draw.from_dict(LOTTO649, 'lotto649')
+
+    # When user pickles it or sets an unknown attribute
+    # Then it round-trips and has no per-instance __dict__
+    assert pickle.loads(pickle.dumps(draw)) == draw
+    assert not hasattr(draw, '__dict__')
+    with pytest.raises(AttributeError):
+        draw.extra = 1
+
+
+def test_draw_keeps_repeated_digits_in_order():
+    # Given a 4星彩 draw with a repeated digit
+    data = {'期別': 112000187, '開獎日期': '2023-08-07T00:00:00', '獎號': [7, 7, 2, 4]}
+
+    # When user packs it
+    draw = Draw.from_dict(data, 'lotto4d')
+
+    # Then the order and the repeat are kept and the mask has one bit per distinct digit
+    assert draw['獎號'] == [7, 7, 2, 4] and draw.special is None
+    assert draw.mask == (1 << 7) | (1 << 2) | (1 << 4)
+    assert draw == data
+
+
+def test_compact_crawler_returns_draws(monkeypatch):
+    # Given a compact crawler whose upstream answers one 威力彩 draw
+    lottery = TaiwanLotteryCrawler(compact=True)
+    monkeypatch.setattr(lottery, 'get_lottery_result', lambda url: {'content': {'totalSize': 1, 'superLotto638Res': [
+        {'period': 112000052, 'lotteryDate': '2023-06-29T00:00:00', 'drawNumberSize': [1, 8, 26, 27, 29, 36, 2]}
+    ]}})
+
+    # When user gets the 威力彩 2023-06 result
+    result = lottery.super_lotto(['2023', '06'])
+
+    # Then the draws are Draw records equal to the dict result and usable by DrawMatrix
+    assert isinstance(result[0], Draw)
+    assert result == [{'期別': 112000052, '開獎日期': '2023-06-29T00:00:00', '第一區': [1, 8, 26, 27, 29, 36], '第二區': 2}]
+    assert DrawMatrix.from_draws(result, 'super_lotto').specials.tolist() == [2]
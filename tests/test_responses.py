@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+import json
+
+import numpy as np
+import pytest
+
+from backend import responses
+from backend.responses import SerializedBody, SerializedCache, accepts_gzip, dumps
+from TaiwanLottery.records import Draw
+
+CONTENT = {
+    'draws': [{'期別': 112000064, '開獎日期': '2023-06-30T00:00:00', '獎號': [6, 22, 26, 29, 32, 43], '特別號': 38}],
+    'number_frequency': {1: 3, 49: 0},
+    'ratio': 0.5,
+    'count': np.int64(7),
+}
+
+
+@pytest.mark.parametrize('use_orjson', [True, False])
+def test_dumps_matches_the_standard_encoder(use_orjson, monkeypatch):
+    # Given orjson is available or not
+    if not use_orjson:
+        monkeypatch.setattr(responses, 'orjson', None)
+    elif responses.orjson is None:
+        pytest.skip('orjson 未安裝')
+
+    # When user serializes content with int keys, NumPy scalars and a Draw record
+    body = dumps(dict(CONTENT, record=Draw.from_dict(CONTENT['draws'][0], 'lotto649')))
+
+    # Then the bytes are compact UTF-8 JSON like Starlette's JSONResponse
+    expected = dict(CONTENT, count=7, number_frequency={'1': 3, '49': 0}, record=CONTENT['draws'][0])
+    assert json.loads(body) == expected
+    assert '期別'.encode('utf-8') in body
+    assert b': ' not in body and b', ' not in body
+
+
+def test_serialized_cache_reuses_bytes_per_version():
+    # Given a cache with room for two keys
+    cache = SerializedCache(max_entries=2)
+    cache.set(('lotto649', '2023-06'), 'closed', b'[1]')
+
+    # When user reads with the same and a different version and adds two more keys
+    same = cache.get(('lotto649', '2023-06'), 'closed')
+    changed = cache.get(('lotto649', '2023-06'), (9, 112000064))
+    cache.set(('lotto649', '2023-07'), 'closed', b'[2]')
+    cache.set(('lotto649', '2023-08'), 'closed', b'[3]')
+
+    # Then only the matching version hits and the least recently used key is evicted
+    assert same.body == b'[1]' and changed is None
+    assert cache.get(('lotto649', '2023-06'), 'closed') is None
+    assert cache.get(('lotto649', '2023-08'), 'closed').body == b'[3]'
+    assert cache.stats()['entries'] == 2
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('gzip, deflate, br', True),
+    ('br;q=1.0, gzip;q=0.5', True),
+    ('gzip;q=0', False),
+    ('*', True),
+    ('*, gzip;q=0', False),
+    ('identity', False),
+    ('', False),
+])
+def test_accepts_gzip(header, expected):
+    # Given an Accept-Encoding header
+    # When user checks whether gzip is acceptable
+    # Then explicit q=0 refuses gzip and * allows it
+    assert accepts_gzip(header) is expected
+
+
+def test_serialized_body_etags_and_conditional_match():
+    # Given a large and a small serialized body
+    large = SerializedBody(b'[' + b'1,' * 1000 + b'1]')
+    small = SerializedBody(b'[1]')
+
+    # When user compares If-None-Match values
+    # Then both representations of the same content match and other tags do not
+    assert large.etag.startswith('"') and large.gzip_etag == large.etag[:-1] + '-gzip"'
+    assert large.gzip_body is not None and small.gzip_body is None
+    assert large.matches(large.etag) and large.matches('W/' + large.gzip_etag) and large.matches('"x", ' + large.etag)
+    assert large.matches('*') and not large.matches(small.etag) and not large.matches(None)
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import datetime
+
+from backend.scheduler import TAIPEI, DrawScheduler, next_draw_time
+
+
+class FakeClock():
+    """sleep 只推進時間，不實際等待"""
+
+    def __init__(self, now):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += datetime.timedelta(seconds=seconds)
+        await asyncio.sleep(0)
+
+
+def test_next_draw_time_follows_draw_days():
+    # Given Tuesday 2025-06-03 21:00 in Taiwan
+    now = datetime.datetime(2025, 6, 3, 21, 0, tzinfo=TAIPEI)
+
+    # When user asks for the next draws
+    lotto649 = next_draw_time('lotto649', now)
+    super_lotto = next_draw_time('super_lotto', now)
+    daily_cash = next_draw_time('daily_cash', now - datetime.timedelta(hours=1))
+
+    # Then 大樂透 draws on Friday, 威力彩 on Thursday and 今彩539 later the same day
+    assert lotto649 == datetime.datetime(2025, 6, 6, 20, 30, tzinfo=TAIPEI)
+    assert super_lotto == datetime.datetime(2025, 6, 5, 20, 30, tzinfo=TAIPEI)
+    assert daily_cash == datetime.datetime(2025, 6, 3, 20, 30, tzinfo=TAIPEI)
+    assert next_draw_time('lotto649', datetime.datetime(2025, 6, 3, 12, 30, tzinfo=datetime.timezone.utc)).day == 6
+
+
+def test_polls_after_draw_until_new_period():
+    # Given a scheduler started on Monday and an upstream that shows the new period on the third poll after Tuesday's draw
+    clock = FakeClock(datetime.datetime(2025, 6, 2, 12, 0, tzinfo=TAIPEI))
+    periods = iter([114000040, 114000040, 114000040, 114000041])
+    refreshed = []
+    polled_at = []
+
+    async def poll(game):
+        polled_at.append(clock())
+        return next(periods)
+
+    async def on_new_period(game, period):
+        refreshed.append((game, period, clock()))
+
+    scheduler = DrawScheduler(['lotto649'], poll, on_new_period, delay=600, poll_interval=300, clock=clock, sleep=clock.sleep)
+
+    async def run():
+        task = asyncio.ensure_future(scheduler.run_game('lotto649'))
+        while len(refreshed) < 2:
+            await asyncio.sleep(0)
+        task.cancel()
+
+    # When the scheduler runs
+    asyncio.run(run())
+
+    # Then it warms up once at start, waits for the draw and polls every 5 minutes until the new period appears
+    draw_at = datetime.datetime(2025, 6, 3, 20, 30, tzinfo=TAIPEI)
+    assert refreshed[0][:2] == ('lotto649', 114000040)
+    assert refreshed[1] == ('lotto649', 114000041, draw_at + datetime.timedelta(minutes=20))
+    assert polled_at[1:] == [draw_at + datetime.timedelta(minutes=minutes) for minutes in (10, 15, 20)]
+    state = scheduler.stats()['games']['lotto649']
+    assert state['latest_period'] == 114000041 and state['refreshes'] == 2 and state['polls'] == 4
+
+
+def test_gives_up_after_poll_window_and_survives_errors():
+    # Given an upstream that fails once and never shows a new period
+    clock = FakeClock(datetime.datetime(2025, 6, 3, 20, 0, tzinfo=TAIPEI))
+    calls = []
+
+    async def poll(game):
+        calls.append(clock())
+        if len(calls) == 2:
+            raise ConnectionError('upstream down')
+        return 114000040
+
+    async def on_new_period(game, period):
+        pass
+
+    scheduler = DrawScheduler(['lotto649'], poll, on_new_period, delay=600, poll_interval=600, poll_window=3600, clock=clock, sleep=clock.sleep)
+
+    async def run():
+        task = asyncio.ensure_future(scheduler.run_game('lotto649'))
+        # 等到開始等待下一次 (星期五) 開獎
+        while scheduler.state['lotto649']['next_draw'] != datetime.datetime(2025, 6, 6, 20, 30, tzinfo=TAIPEI):
+            await asyncio.sleep(0)
+        task.cancel()
+
+    # When the scheduler runs past Tuesday's poll window
+    asyncio.run(run())
+
+    # Then it polls within the window only and moves on to the next draw
+    draw_at = datetime.datetime(2025, 6, 3, 20, 30, tzinfo=TAIPEI)
+    assert calls[1:] == [draw_at + datetime.timedelta(minutes=minutes) for minutes in (10, 20, 30, 40, 50, 60)]
+    assert scheduler.state['lotto649']['refreshes'] == 1
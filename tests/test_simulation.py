@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+from math import comb
+
+import numpy as np
+import pytest
+
+from TaiwanLottery.prizes import popcount
+from TaiwanLottery.simulation import MonteCarloSimulator, sample_draws
+
+
+def test_sampled_draws_are_distinct_and_in_range():
+    # Given a seeded generator
+    rng = np.random.default_rng(0)
+
+    # When user samples 大樂透 draws with a same-pool 特別號
+    masks, specials = sample_draws(rng, 20000, 6, (1, 49), 'pool')
+
+    # Then every draw has six distinct numbers in 1-49 and a 特別號 outside them
+    assert (popcount(masks) == 6).all()
+    assert (masks & np.uint64(1)).sum() == 0 and (masks >> np.uint64(50)).sum() == 0
+    assert ((masks >> specials.astype(np.uint64)) & np.uint64(1)).sum() == 0
+    assert specials.min() >= 1 and specials.max() <= 49
+
+
+def test_tier_probabilities_converge_to_exact_odds():
+    # Given one 大樂透 ticket and one 今彩539 ticket
+    lotto649 = MonteCarloSimulator('lotto649', [[1, 2, 3, 4, 5, 6]])
+    daily_cash = MonteCarloSimulator('daily_cash', [[1, 2, 3, 4, 5]])
+
+    # When user simulates a million draws of each
+    lotto649_result = lotto649.run(1000000, seed=1, chunk_size=300000)
+    daily_cash_result = daily_cash.run(1000000, seed=1)
+
+    # Then the frequent tiers match the hypergeometric odds
+    three_hits = comb(6, 3) * comb(43, 3) / comb(49, 6)
+    assert lotto649_result['tier_probabilities']['普獎'] == pytest.approx(three_hits * 40 / 43, rel=0.05)
+    assert lotto649_result['tier_probabilities']['陸獎'] == pytest.approx(three_hits * 3 / 43, rel=0.1)
+    assert daily_cash_result['tier_probabilities']['參獎'] == pytest.approx(comb(5, 3) * comb(34, 2) / comb(39, 5), rel=0.05)
+    assert daily_cash_result['tier_probabilities']['肆獎'] == pytest.approx(comb(5, 2) * comb(34, 3) / comb(39, 5), rel=0.02)
+    assert daily_cash_result['cost'] == 50
+    assert daily_cash_result['expected_value'] == pytest.approx(daily_cash_result['expected_payout'] - 50)
+
+
+def test_results_do_not_depend_on_worker_count():
+    # Given a 威力彩 portfolio built from recommended sets
+    recommended_sets = [
+        {'regular_numbers': [1, 7, 13, 22, 30, 38], 'special_number': 2},
+        {'regular_numbers': [4, 9, 15, 20, 27, 33], 'special_number': 8},
+    ]
+    simulator = MonteCarloSimulator.from_recommended_sets('super_lotto', recommended_sets)
+
+    # When user runs the same seed in-process and with two workers
+    serial = simulator.run(200000, seed=9, chunk_size=50000)
+    parallel = simulator.run(200000, seed=9, chunk_size=50000, max_workers=2)
+
+    # Then the estimates are identical
+    assert serial == parallel
+    assert serial['cost'] == 200
+    assert len(serial['ticket_expected_payouts']) == 2
+
+
+def test_super_lotto_requires_second_zone_numbers():
+    # When user builds a 威力彩 simulator without 第二區 numbers
+    # Then it is rejected
+    with pytest.raises(ValueError):
+        MonteCarloSimulator('super_lotto', [[1, 2, 3, 4, 5, 6]])
+
+
+@pytest.mark.parametrize('game, tickets, specials, message', [
+    ('lotto649', [[0, 2, 3, 4, 5, 6]], None, '號碼需介於 1 到 49'),
+    ('lotto649', [[1, 2, 3, 4, 5, 50]], None, '號碼需介於 1 到 49'),
+    ('lotto649', [[1, 2, 3, 4, 5, 64]], None, '號碼需介於 1 到 49'),
+    ('lotto649', [[1, 2, 3, 4, 5]], None, '每注需為 6 個號碼'),
+    ('lotto649', [[1, 2, 3, 4, 5, 5]], None, '每注號碼不可重複'),
+    ('super_lotto', [[1, 2, 3, 4, 5, 6]], [99], '第二區號碼需介於 1 到 8'),
+    ('super_lotto', [[1, 2, 3, 4, 5, 6], [7, 8, 9, 10, 11, 12]], [1], '第二區號碼數需與注數相同'),
+])
+def test_invalid_tickets_are_rejected(game, tickets, specials, message):
+    # When user builds a simulator with out-of-range or mismatched numbers
+    # Then it is rejected with a matching message
+    with pytest.raises(ValueError, match=message):
+        MonteCarloSimulator(game, tickets, specials)
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import gc
+
+from backend.singleflight import SharedStream, SingleFlightCache
+
+
+def test_concurrent_requests_share_one_computation():
+    # Given a cache and a slow computation
+    cache = SingleFlightCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {'latest_period': 113000001}
+
+    async def burst():
+        results = await asyncio.gather(*[cache.get(113000001, compute) for _ in range(50)])
+        cached = await cache.get(113000001, compute)
+        return results, cached
+
+    # When 50 identical requests arrive at once and one more arrives later
+    results, cached = asyncio.run(burst())
+
+    # Then the computation runs once and everyone gets the same response
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert cached is results[0]
+    assert cache.stats()['coalesced'] == 49
+    assert cache.stats()['hits'] == 1
+
+
+def test_new_key_or_uncacheable_result_recomputes():
+    # Given a cache whose results are only kept when marked cacheable
+    cache = SingleFlightCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return len(calls)
+
+    async def run():
+        first = await cache.get(1, compute, cacheable=lambda value: False)
+        second = await cache.get(1, compute)
+        third = await cache.get(1, compute)
+        fourth = await cache.get(2, compute)
+        return first, second, third, fourth
+
+    # When the key stays the same and then a new draw changes it
+    # Then an uncacheable result is recomputed and a new key invalidates the cache
+    assert asyncio.run(run()) == (1, 2, 2, 3)
+
+
+def test_shared_stream_runs_source_once_and_replays_to_late_subscribers():
+    # Given a slow source of three items
+    stream = SharedStream()
+    calls = []
+
+    async def produce():
+        calls.append(1)
+        for item in ('a', 'b', 'c'):
+            await asyncio.sleep(0.01)
+            yield item
+
+    async def collect(delay):
+        await asyncio.sleep(delay)
+        return [item async for item in stream.subscribe('key', produce)]
+
+    async def burst():
+        results = await asyncio.gather(collect(0), collect(0), collect(0.015))
+        after = await collect(0)
+        return results, after
+
+    # When two subscribers start together, one joins midway and one comes after it finished
+    results, after = asyncio.run(burst())
+
+    # Then the in-flight source is shared and a new one starts once it is done
+    assert results == [['a', 'b', 'c']] * 3
+    assert after == ['a', 'b', 'c']
+    assert len(calls) == 2
+    assert stream.stats() == {'started': 2, 'joined': 2, 'inflight': 0}
+
+
+def test_shared_stream_keeps_the_source_task_until_it_finishes():
+    # Given a source that is still producing
+    stream = SharedStream()
+
+    async def produce():
+        for item in ('a', 'b'):
+            await asyncio.sleep(0.01)
+            yield item
+
+    async def run():
+        iterator = stream.subscribe('key', produce).__aiter__()
+        first = await iterator.__anext__()
+        # When garbage is collected in the middle of the stream
+        gc.collect()
+        running = len(stream._tasks)
+        rest = [item async for item in iterator]
+        await asyncio.sleep(0)
+        return [first] + rest, running
+
+    items, running = asyncio.run(run())
+
+    # Then the source task is held while running, finishes the stream and is released afterwards
+    assert items == ['a', 'b']
+    assert running == 1
+    assert stream._tasks == set()
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+import random
+
+from TaiwanLottery.matrix import DrawMatrix
+from TaiwanLottery.stats import DrawStatistics, RollingStatistics, analyze_windows
+
+
+def random_lotto649_datas(count, seed=0):
+    rng = random.Random(seed)
+    datas = []
+    for i in range(count):
+        drawn = rng.sample(range(1, 50), 7)
+        datas.append({'期別': 100000000 + count - i, '開獎日期': '2023-06-30T00:00:00', '獎號': sorted(drawn[:6]), '特別號': drawn[6]})
+    return datas
+
+
+def test_frequency_matches_dict_counting():
+    # Given 300 random 大樂透 draws
+    datas = random_lotto649_datas(300)
+
+    # When user computes the statistics
+    statistics = DrawStatistics(DrawMatrix.from_draws(datas, 'lotto649'))
+
+    # Then the frequencies equal a plain dict count
+    number_frequency = {}
+    special_frequency = {}
+    for data in datas:
+        for num in data['獎號']:
+            number_frequency[num] = number_frequency.get(num, 0) + 1
+        special_frequency[data['特別號']] = special_frequency.get(data['特別號'], 0) + 1
+    assert dict(statistics.ranked_numbers()) == number_frequency
+    assert dict(statistics.ranked_specials()) == special_frequency
+    assert [count for _, count in statistics.hot_numbers(10)] == sorted(number_frequency.values(), reverse=True)[:10]
+
+
+def test_per_draw_features_and_miss_streak():
+    # Given two draws, the newest first
+    datas = [
+        {'期別': 2, '開獎日期': '2023-06-30T00:00:00', '獎號': [3, 13, 20, 21, 35, 49], '特別號': 7},
+        {'期別': 1, '開獎日期': '2023-06-27T00:00:00', '獎號': [1, 2, 3, 17, 33, 34], '特別號': 8},
+    ]
+
+    # When user computes the statistics
+    statistics = DrawStatistics(DrawMatrix.from_draws(datas, 'lotto649'))
+
+    # Then each draw's features and the miss streaks are correct
+    assert statistics.odd_counts.tolist() == [5, 4]
+    assert statistics.sums.tolist() == [141, 90]
+    assert statistics.spans.tolist() == [46, 33]
+    assert statistics.zone_counts.tolist() == [[2, 2, 2], [3, 2, 1]]
+    assert statistics.same_tail_groups.tolist() == [1, 1]
+    assert statistics.consecutive_pairs.tolist() == [1, 3]
+    assert statistics.miss_streak[3 - 1] == 0
+    assert statistics.miss_streak[1 - 1] == 1
+    assert statistics.miss_streak[4 - 1] == 2
+    assert 4 in statistics.never_appeared()
+
+
+def test_windows():
+    # Given 120 random draws
+    matrix = DrawMatrix.from_draws(random_lotto649_datas(120), 'lotto649')
+
+    # When user computes several windows
+    windows = analyze_windows(matrix, windows=(10, None))
+
+    # Then each window only counts its own draws
+    assert windows[10].draws == 10
+    assert windows[10].number_frequency.sum() == 60
+    assert windows[None].number_frequency.sum() == 720
+    assert windows[10].periods[0] == matrix.periods.max()
+
+
+def test_rolling_statistics_match_full_rescan():
+    # Given 200 random draws and a rolling aggregator over the last 50 draws
+    datas = random_lotto649_datas(200)
+    rolling = RollingStatistics('lotto649', window=50)
+
+    # When the draws are appended one at a time, oldest first
+    for data in reversed(datas):
+        rolling.append(data)
+
+    # Then the counts and miss streaks equal a full rescan of the same window
+    statistics = DrawStatistics(DrawMatrix.from_draws(datas, 'lotto649'), window=50)
+    assert len(rolling.draws) == 50
+    assert rolling.number_counts.tolist() == statistics.number_frequency.tolist()
+    assert rolling.special_counts.tolist() == statistics.special_frequency.tolist()
+    assert rolling.miss_streak.tolist() == statistics.miss_streak.tolist()
+    assert rolling.special_miss_streak.tolist() == statistics.special_miss_streak.tolist()
+    assert rolling.ranked_numbers() == statistics.ranked_numbers()
+    assert rolling.ranked_specials() == statistics.ranked_specials()
+    assert rolling.hot_numbers(10) == statistics.hot_numbers(10) and rolling.cold_numbers(10) == statistics.cold_numbers(10)
+
+
+def test_rolling_statistics_month_window_and_state(tmp_path):
+    # Given draws across three months and a two month window
+    datas = [
+        {'期別': 1, '開獎日期': '2023-04-28T00:00:00', '獎號': [1, 2, 3, 4, 5, 6], '特別號': 7},
+        {'期別': 2, '開獎日期': '2023-05-02T00:00:00', '獎號': [1, 12, 13, 14, 15, 16], '特別號': 17},
+        {'期別': 3, '開獎日期': '2023-06-02T00:00:00', '獎號': [21, 22, 23, 24, 25, 26], '特別號': 27},
+    ]
+    rolling = RollingStatistics('lotto649', months=2)
+
+    # When the draws are added and the state is saved and loaded
+    assert rolling.extend(datas) == 3
+    assert rolling.append(datas[0]) is False
+    rolling.save(str(tmp_path / 'rolling.json'))
+    restored = RollingStatistics.load(str(tmp_path / 'rolling.json'))
+
+    # Then the April draw has expired and the restored state is identical
+    assert [data['期別'] for data in restored.draws] == [2, 3]
+    assert restored.number_counts[1 - 1] == 1
+    assert restored.miss_streak[1 - 1] == 1
+    assert restored.miss_streak[2 - 1] == 2
+    assert restored.to_dict() == rolling.to_dict()
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+from TaiwanLottery import TaiwanLotteryCrawler, utils
+from TaiwanLottery.store import DrawStore
+
+
+def lotto649_response(draws):
+    return {'content': {'totalSize': len(draws), 'lotto649Res': [
+        {'period': period, 'lotteryDate': date, 'drawNumberSize': numbers} for period, date, numbers in draws
+    ]}}
+
+
+def test_past_month_is_read_from_store(tmp_path):
+    # Given a crawler with a local store and a fake upstream
+    requested_urls = []
+    lottery = TaiwanLotteryCrawler(store=DrawStore(str(tmp_path / 'lottery.db')))
+
+    def fake_get_lottery_result(url):
+        requested_urls.append(url)
+        return lotto649_response([(112000064, '2023-06-30T00:00:00', [6, 22, 26, 29, 32, 43, 38])])
+
+    lottery.get_lottery_result = fake_get_lottery_result
+
+    # When user gets the closed month 2023-06 twice
+    first = lottery.lotto649(['2023', '06'])
+    second = lottery.lotto649(['2023', '06'])
+
+    # Then upstream is only queried once and both results are equal
+    assert len(requested_urls) == 1
+    assert first == second == [{'期別': 112000064, '開獎日期': '2023-06-30T00:00:00', '獎號': [6, 22, 26, 29, 32, 43], '特別號': 38}]
+
+
+def test_empty_past_month_is_not_closed(tmp_path):
+    # Given an upstream that answers the closed month 2023-06 with no draws once
+    responses = [lotto649_response([]), lotto649_response([(112000064, '2023-06-30T00:00:00', [6, 22, 26, 29, 32, 43, 38])])]
+    lottery = TaiwanLotteryCrawler(store=DrawStore(str(tmp_path / 'lottery.db')))
+    lottery.get_lottery_result = lambda url: responses.pop(0)
+
+    # When user gets the month twice
+    first = lottery.lotto649(['2023', '06'])
+    second = lottery.lotto649(['2023', '06'])
+
+    # Then the empty result is not stored as final and the second call queries upstream again
+    assert first == []
+    assert [data['期別'] for data in second] == [112000064]
+    assert lottery.store.is_closed('lotto649', '2023-06')
+
+
+def test_sync_only_returns_newer_periods(tmp_path):
+    # Given a store that already holds the draw 112000063 of the current month
+    current_month = utils.format_month([utils.get_current_year(), utils.get_current_month()])
+    store = DrawStore(str(tmp_path / 'lottery.db'))
+    store.save('lotto649', current_month, [{'期別': 112000063, '開獎日期': current_month + '-01T00:00:00', '獎號': [1, 2, 3, 4, 5, 6], '特別號': 7}])
+    lottery = TaiwanLotteryCrawler(store=store)
+    lottery.get_lottery_result = lambda url: lotto649_response([
+        (112000064, current_month + '-04T00:00:00', [6, 22, 26, 29, 32, 43, 38]),
+        (112000063, current_month + '-01T00:00:00', [1, 2, 3, 4, 5, 6, 7]),
+    ])
+
+    # When user syncs 大樂透
+    new_datas = lottery.sync('lotto649')
+
+    # Then only the newer period is returned and both periods are stored
+    assert [data['期別'] for data in new_datas] == [112000064]
+    assert store.latest('lotto649')[0] == 112000064
+    assert [data['期別'] for data in store.draws('lotto649')] == [112000064, 112000063]
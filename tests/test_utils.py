@@ -9,3 +9,21 @@ def test_convert_to_republic_era_month():
 
     # Then the republic_era_month_result should be equal to [112, 6]
     assert republic_era_month_result == [112, 6]
+
+
+def test_month_range():
+    # Given user wants the months between 2023-11 and 2024-02
+    # When user gets the month range
+    months = utils.month_range('2023-11', '2024-02')
+
+    # Then each calendar month appears exactly once
+    assert months == [['2023', '11'], ['2023', '12'], ['2024', '01'], ['2024', '02']]
+
+
+def test_add_months():
+    # Given user wants six months ending at 2024-02
+    # When user goes back five months
+    start_month = utils.add_months('2024-02', -5)
+
+    # Then the start month crosses the year boundary correctly
+    assert start_month == '2023-09'